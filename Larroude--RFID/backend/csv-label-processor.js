@@ -2,6 +2,7 @@ const { exec, spawn } = require('child_process');
 const path = require('path');
 const fs = require('fs');
 const os = require('os');
+const { runPythonJSON } = require('./zpl-processor');
 
 /**
  * Utilitários RFID para conversão hexadecimal (mesmo do server.js)
@@ -87,32 +88,24 @@ class CSVLabelProcessor {
     }
 
     /**
-     * Carrega dados do arquivo CSV
+     * Carrega dados do arquivo CSV (tokenizado no Python: aspas, BOM e codificação)
      */
-    loadCSVData() {
+    async loadCSVData() {
         try {
-            const csvContent = fs.readFileSync(this.csvPath, 'utf8');
-            const lines = csvContent.split('\n').filter(line => line.trim());
-            
-            if (lines.length < 2) {
-                return [];
-            }
-
-            const headers = lines[0].split(',');
+            const { rows } = await runPythonJSON('csv_reader.py', [this.csvPath], '');
             const labels = [];
 
-            for (let i = 1; i < lines.length; i++) {
-                const values = lines[i].split(',');
+            rows.forEach((values, i) => {
                 if (values.length >= 4) {
                     labels.push({
-                        index: i,
+                        index: i + 1,
                         style_name: values[0].trim(),
                         vpm: values[1].trim(),
                         color: values[2].trim(),
                         size: values[3].trim()
                     });
                 }
-            }
+            });
 
             return labels;
         } catch (error) {
@@ -324,7 +317,7 @@ if __name__ == "__main__":
      */
     async printSingleLabel(labelIndex, rfidData = null) {
         try {
-            const labels = this.loadCSVData();
+            const labels = await this.loadCSVData();
             
             if (labelIndex < 1 || labelIndex > labels.length) {
                 throw new Error(`Índice inválido. Use um número entre 1 e ${labels.length}`);
@@ -346,7 +339,7 @@ if __name__ == "__main__":
      */
     async printAllLabels(rfidData = null) {
         try {
-            const labels = this.loadCSVData();
+            const labels = await this.loadCSVData();
             
             if (labels.length === 0) {
                 throw new Error('Nenhuma etiqueta encontrada no CSV');
@@ -392,8 +385,8 @@ if __name__ == "__main__":
     /**
      * Obtém informações do processador
      */
-    getInfo() {
-        const labels = this.loadCSVData();
+    async getInfo() {
+        const labels = await this.loadCSVData();
         return {
             csvPath: this.csvPath,
             printerName: this.printerName,
@@ -0,0 +1,121 @@
+const { EventEmitter } = require('events');
+
+/**
+ * Eventos de progresso de um job de impressão
+ * Cada evento recebe um id crescente e fica num buffer circular de tamanho
+ * fixo: quem se inscreve atrasado (ou reconecta com Last-Event-ID) recebe os
+ * eventos guardados depois do último que viu e segue ao vivo. Se o buffer já
+ * descartou parte do que faltava, o primeiro evento entregue é um 'gap' com a
+ * quantidade perdida - o estado completo está no relatório do job.
+ */
+
+const EVENTS_BUFFER = parseInt(process.env.PRINT_EVENTS_BUFFER) || 4096;
+const HEARTBEAT_MS = parseInt(process.env.PRINT_EVENTS_HEARTBEAT_MS) || 15000;
+
+class EventRing {
+  constructor(jobId, capacity = EVENTS_BUFFER) {
+    this.jobId = jobId;
+    this.capacity = capacity;
+    this.buffer = new Array(capacity);
+    this.lastId = 0;
+    this.closed = false;
+    this.emitter = new EventEmitter();
+    this.emitter.setMaxListeners(0);
+  }
+
+  /**
+   * Menor id ainda no buffer
+   */
+  get firstId() {
+    return Math.max(1, this.lastId - this.capacity + 1);
+  }
+
+  publish(type, data = {}) {
+    const event = { id: ++this.lastId, type, jobId: this.jobId, ...data, at: new Date().toISOString() };
+    this.buffer[event.id % this.capacity] = event;
+    this.emitter.emit('event', event);
+    return event;
+  }
+
+  /**
+   * Eventos guardados com id maior que afterId (e o 'gap' se faltar algum)
+   */
+  since(afterId = 0) {
+    const events = [];
+    const first = Math.max(afterId + 1, this.firstId);
+    if (first > afterId + 1 && afterId < this.lastId) {
+      events.push({ id: afterId, type: 'gap', jobId: this.jobId, missed: first - afterId - 1 });
+    }
+    for (let id = first; id <= this.lastId; id++) {
+      events.push(this.buffer[id % this.capacity]);
+    }
+    return events;
+  }
+
+  /**
+   * Último evento do job: os inscritos recebem 'end' e o buffer fica só para consulta
+   */
+  close() {
+    this.closed = true;
+    this.emitter.emit('end');
+  }
+
+  /**
+   * Entrega os eventos depois de afterId e os próximos, até o fim do job.
+   * Devolve a função que cancela a inscrição
+   */
+  subscribe(afterId, onEvent, onEnd = () => {}) {
+    for (const event of this.since(afterId)) {
+      onEvent(event);
+    }
+    if (this.closed) {
+      onEnd();
+      return () => {};
+    }
+    const end = () => {
+      unsubscribe();
+      onEnd();
+    };
+    const unsubscribe = () => {
+      this.emitter.off('event', onEvent);
+      this.emitter.off('end', end);
+    };
+    this.emitter.on('event', onEvent);
+    this.emitter.on('end', end);
+    return unsubscribe;
+  }
+}
+
+/**
+ * Server-Sent Events de um job: retoma de ?after= ou do cabeçalho
+ * Last-Event-ID e fecha a resposta quando o job termina
+ */
+function streamEvents(ring, req, res) {
+  const afterId = parseInt(req.get('Last-Event-ID') || req.query.after) || 0;
+  res.set({
+    'Content-Type': 'text/event-stream',
+    'Cache-Control': 'no-cache',
+    Connection: 'keep-alive',
+    'X-Accel-Buffering': 'no'
+  });
+  res.flushHeaders();
+
+  const heartbeat = setInterval(() => res.write(': ping\n\n'), HEARTBEAT_MS);
+  let unsubscribe = () => {};
+  const stop = () => {
+    clearInterval(heartbeat);
+    unsubscribe();
+  };
+  unsubscribe = ring.subscribe(afterId, (event) => {
+    res.write(`id: ${event.id}\nevent: ${event.type}\ndata: ${JSON.stringify(event)}\n\n`);
+  }, () => {
+    stop();
+    res.end();
+  });
+  req.on('close', stop);
+}
+
+module.exports = {
+  EventRing,
+  streamEvents
+};
@@ -0,0 +1,64 @@
+/**
+ * Unidades de um lote de impressão sem um objeto por etiqueta
+ * O lote guarda só os itens e o fim acumulado de cada linha (Uint32Array):
+ * a unidade i ({ item, seq, itemQty }) é montada na hora por busca binária.
+ * Mesmo papel do label_store.py no lado Python - a memória por etiqueta na
+ * fila passa de um objeto para zero (4 bytes por linha do upload).
+ */
+
+function itemQuantity(item) {
+  // Mesma regra dos previews e exportações (_quantity no Python): QTY vazio,
+  // inválido ou menor que 1 vale 1 - o label_validator.py rejeita esses lotes
+  return Math.max(1, parseInt(item.QTY) || 1);
+}
+
+class LabelUnits {
+  constructor(items) {
+    this.items = items;
+    this.ends = new Uint32Array(items.length);
+    let total = 0;
+    items.forEach((item, row) => {
+      total += itemQuantity(item);
+      this.ends[row] = total;
+    });
+    this.length = total;
+  }
+
+  /**
+   * Linha da unidade: a primeira cujo fim acumulado passa do índice
+   */
+  row(index) {
+    let low = 0;
+    let high = this.ends.length - 1;
+    while (low < high) {
+      const middle = (low + high) >>> 1;
+      if (this.ends[middle] > index) {
+        high = middle;
+      } else {
+        low = middle + 1;
+      }
+    }
+    return low;
+  }
+
+  get(index) {
+    if (index < 0 || index >= this.length) {
+      return undefined;
+    }
+    const row = this.row(index);
+    const start = row > 0 ? this.ends[row - 1] : 0;
+    return { item: this.items[row], seq: index - start + 1, itemQty: this.ends[row] - start };
+  }
+}
+
+/**
+ * Unidade i de um lote (LabelUnits ou lista comum, ex.: jobs de reenvio)
+ */
+function unitAt(units, index) {
+  return typeof units.get === 'function' ? units.get(index) : units[index];
+}
+
+module.exports = {
+  LabelUnits,
+  unitAt
+};
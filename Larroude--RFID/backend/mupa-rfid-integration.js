@@ -2,11 +2,17 @@ const { exec } = require('child_process');
 const path = require('path');
 const fs = require('fs');
 const os = require('os');
+const { tagProfile, planRFIDEncode } = require('./rfid-encode-planner');
 
 class MupaRFIDIntegration {
-    constructor() {
+    /**
+     * @param {object} [profile] - Perfil do tag (epcBytes, factoryEpcBytes,
+     *   blockWrite, verify); ver rfid-encode-planner.js
+     */
+    constructor(profile = {}) {
         this.printerName = "ZDesigner ZD621R-203dpi ZPL";
         this.isConnected = false;
+        this.tagProfile = tagProfile(profile);
     }
 
     /**
@@ -94,10 +100,10 @@ class MupaRFIDIntegration {
         // Validar dados antes de processar
         this.validateRFIDData(data);
         
-        // Gerar ZPL com dados como string direta (igual ZebraDesigner)
+        // Gerar ZPL com dados como string direta (igual ZebraDesigner),
+        // só com as operações de RF que o perfil do tag exige
         const zpl = `^XA
-^RFR,H,0,12,2^FS
-^RFW,H,2,12,1^FD${data}^FS
+${planRFIDEncode(data, this.tagProfile).join('\n')}
 ^XZ`;
         
         console.log(`📡 ZPL RFID gerado:`);
@@ -124,8 +130,7 @@ class MupaRFIDIntegration {
         let zpl = `^XA
 ^PW${widthDots}
 ^LL${heightDots}
-^RFR,H,0,12,2^FS
-^RFW,H,2,12,1^FD${text}^FS
+${planRFIDEncode(text, this.tagProfile).join('\n')}
 ^FO${widthDots/2 - 150},50^A0N,50,50^FD${text}^FS
 ^FO${widthDots/2 - 100},120^A0N,30,30^FD${subtitle}^FS`;
         
@@ -349,6 +354,7 @@ class MupaRFIDIntegration {
         return {
             connected: this.isConnected,
             printerName: this.printerName,
+            tagProfile: this.tagProfile,
             timestamp: new Date().toISOString()
         };
     }
@@ -0,0 +1,135 @@
+const crypto = require('crypto');
+const fs = require('fs');
+const path = require('path');
+const { runPythonJSON } = require('./zpl-processor');
+
+/**
+ * Previews paginados e renderizados sob demanda
+ * Uma sessão guarda os dados do upload; cada página traz só metadados e as
+ * chaves dos PNGs (label_preview.py page). As imagens (miniatura e completa)
+ * são servidas como binário direto do cache de previews, renderizadas na
+ * primeira requisição (uma chamada Python por página, compartilhada entre as
+ * requisições simultâneas) e a página seguinte é pré-renderizada em segundo plano.
+ */
+
+const MAX_SESSIONS = parseInt(process.env.PREVIEW_SESSION_MAX) || 20;
+const DEFAULT_PAGE_SIZE = 24;
+const MAX_PAGE_SIZE = 200;
+const IMAGE_SIZES = ['thumb', 'full'];
+
+const sessions = new Map();
+
+function unitCount(data) {
+  return data.reduce((total, item) => total + Math.max(1, parseInt(item.QTY) || 1), 0);
+}
+
+function createSession(data) {
+  const id = crypto.randomBytes(8).toString('hex');
+  sessions.set(id, {
+    input: JSON.stringify({ data }),
+    units: new Map(),
+    renders: new Map(),
+    cacheDir: null
+  });
+  // Mantém só as sessões mais recentes (Map preserva a ordem de inserção)
+  while (sessions.size > MAX_SESSIONS) {
+    sessions.delete(sessions.keys().next().value);
+  }
+  return { sessionId: id, totalLabels: unitCount(data), pageSize: DEFAULT_PAGE_SIZE };
+}
+
+function getSession(id) {
+  const session = sessions.get(id);
+  if (!session) {
+    const error = new Error('Sessão de preview não encontrada');
+    error.status = 404;
+    throw error;
+  }
+  return session;
+}
+
+/**
+ * Renderiza no cache as unidades cursor..cursor+limit (uma vez por intervalo)
+ */
+function renderRange(session, cursor, limit) {
+  const key = `${cursor}:${limit}`;
+  if (!session.renders.has(key)) {
+    const render = runPythonJSON('label_preview.py', ['render', String(cursor), String(limit)], session.input)
+      .finally(() => session.renders.delete(key));
+    session.renders.set(key, render);
+  }
+  return session.renders.get(key);
+}
+
+function prefetch(session, cursor, limit) {
+  renderRange(session, cursor, limit).catch((error) => {
+    console.warn('⚠️ Falha ao pré-renderizar previews:', error.message);
+  });
+}
+
+/**
+ * Página de unidades (metadados + URLs das imagens); pré-renderiza esta
+ * página e a próxima em segundo plano
+ */
+async function getPage(id, cursor = 0, limit = DEFAULT_PAGE_SIZE) {
+  const session = getSession(id);
+  cursor = Math.max(0, parseInt(cursor) || 0);
+  limit = Math.min(MAX_PAGE_SIZE, Math.max(1, parseInt(limit) || DEFAULT_PAGE_SIZE));
+
+  const page = await runPythonJSON('label_preview.py', ['page', String(cursor), String(limit)], session.input);
+  session.cacheDir = page.cacheDir;
+
+  const units = page.units.map(({ full, thumb, ...unit }) => {
+    session.units.set(unit.unit, { full, thumb, cursor, limit });
+    return {
+      ...unit,
+      thumbUrl: `/api/preview-sessions/${id}/units/${unit.unit}/thumb.png`,
+      fullUrl: `/api/preview-sessions/${id}/units/${unit.unit}/full.png`
+    };
+  });
+
+  prefetch(session, cursor, limit);
+  if (page.nextCursor !== null) {
+    prefetch(session, page.nextCursor, limit);
+  }
+
+  return { units, cursor, nextCursor: page.nextCursor, totalLabels: page.totalLabels };
+}
+
+function getUnit(session, unitNumber, size) {
+  const unit = session.units.get(parseInt(unitNumber));
+  if (!unit || !IMAGE_SIZES.includes(size)) {
+    const error = new Error('Preview não encontrado (carregue a página antes)');
+    error.status = 404;
+    throw error;
+  }
+  return unit;
+}
+
+/**
+ * ETag da imagem = chave do cache (conteúdo), conhecida sem renderizar
+ */
+function imageETag(id, unitNumber, size) {
+  return `"${getUnit(getSession(id), unitNumber, size)[size]}"`;
+}
+
+/**
+ * Caminho do PNG de uma unidade (renderiza a página se faltar no cache)
+ */
+async function getImage(id, unitNumber, size) {
+  const session = getSession(id);
+  const unit = getUnit(session, unitNumber, size);
+  const key = unit[size];
+  const filePath = path.join(session.cacheDir, key.slice(0, 2), `${key}.png`);
+  if (!fs.existsSync(filePath)) {
+    await renderRange(session, unit.cursor, unit.limit);
+  }
+  return filePath;
+}
+
+module.exports = {
+  createSession,
+  getPage,
+  imageETag,
+  getImage
+};
@@ -0,0 +1,627 @@
+const crypto = require('crypto');
+const { EventRing } = require('./job-events');
+const { unitAt } = require('./label-units');
+
+/**
+ * Fila de impressão com prioridades
+ * Cada job é uma sequência de etiquetas (um formato ^XA...^XZ por unidade).
+ * Um único worker envia uma etiqueta por vez e, a cada fronteira de formato,
+ * escolhe de novo o job de maior prioridade: um reenvio urgente ou uma
+ * etiqueta avulsa passa na frente de um lote grande, que continua depois de
+ * onde parou com a mesma numeração sequencial (as unidades já vêm numeradas).
+ * Lotes (bulk) só são entregues ao spooler com menos de MAX_SPOOLED jobs na
+ * fila do Windows, para que o que passa na frente não fique atrás de
+ * etiquetas já entregues.
+ *
+ * Controle dos jobs: pausa e retomada param/voltam o envio na próxima
+ * fronteira de formato. O cancelamento segura o worker, remove do spooler as
+ * etiquetas que ainda não saíram, descarta o buffer da impressora (~JA) e
+ * classifica cada etiqueta (ack): printed, cancelled (descartada no buffer),
+ * purged (removida do spooler), failed, not_sent ou unconfirmed (entregue à
+ * impressora sem como contar o buffer). Só a cauda entregue que ainda pode
+ * estar no spooler ou no buffer da impressora entra no cancelamento. Etiquetas
+ * de outros jobs descartadas junto voltam para a fila deles ou, se o job já
+ * terminou, para um job de reenvio com a mesma prioridade.
+ *
+ * Cada etiqueta enviada, e cada desfecho conhecido depois (cancelamento),
+ * passa por onLabel(record) - o ledger é gravado daí, no ritmo da impressão.
+ *
+ * Janela de conciliação: quiesce(task) segura o worker, espera o spooler
+ * esvaziar e só então roda a leitura dos contadores; entre a leitura inicial
+ * e a final (job.tracking), tudo o que sai pela fila - do job ou de outros -
+ * vai para job.journal e as etiquetas dos outros jobs para job.interleaved.
+ *
+ * Cada job publica o progresso em job.events (rendered, sent, failed e os
+ * acks do cancelamento por etiqueta; queued, paused, resumed, done/cancelled
+ * para o job). Quem criou o job publica o resto e fecha o stream.
+ */
+
+const PRIORITIES = ['urgent', 'interactive', 'bulk'];
+const INTERACTIVE_MAX_UNITS = parseInt(process.env.PRINT_QUEUE_INTERACTIVE_MAX) || 5;
+const MAX_SPOOLED = parseInt(process.env.PRINT_QUEUE_MAX_SPOOLED) || 3;
+const POLL_MS = parseInt(process.env.PRINT_QUEUE_POLL_MS) || 250;
+const DRAIN_TIMEOUT_MS = parseInt(process.env.PRINT_QUEUE_DRAIN_TIMEOUT_MS) || 60000;
+const MAX_FINISHED_JOBS = 50;
+const MAX_DELIVERED = 1024;   // etiquetas recentes acompanhadas para o cancelamento
+// Formatos que cabem no buffer da impressora além do que está no spooler
+const PRINTER_BUFFER = parseInt(process.env.PRINT_QUEUE_PRINTER_BUFFER) || 8;
+const FINAL_STATES = ['done', 'cancelled'];
+const PRINTED_ACKS = ['printed'];
+const UNCERTAIN_ACKS = ['sent', 'unconfirmed'];
+
+function labelEvent(record) {
+  return { unit: record.index, sequence: record.sequence, barcode: record.barcode, rfid: record.rfid };
+}
+
+function controlError(message, status = 409) {
+  const error = new Error(message);
+  error.status = status;
+  return error;
+}
+
+/**
+ * Prioridade do job: a informada ou, sem ela, interactive para poucas unidades
+ */
+function resolvePriority(priority, unitCount) {
+  if (priority === undefined || priority === null || priority === '') {
+    return unitCount <= INTERACTIVE_MAX_UNITS ? 'interactive' : 'bulk';
+  }
+  if (!PRIORITIES.includes(priority)) {
+    throw controlError(`Prioridade inválida: ${priority} (use ${PRIORITIES.join(', ')})`, 400);
+  }
+  return priority;
+}
+
+class PrintJob {
+  constructor(id, priority, units, render, order, printer) {
+    this.id = id;
+    this.priority = priority;
+    this.units = units;
+    this.render = render;
+    this.order = order;
+    this.printer = printer;
+    this.cursor = 0;
+    this.startRequested = false;
+    this.sending = false;     // etiqueta deste job em envio
+    this.retries = [];
+    this.results = [];
+    this.interleaved = [];
+    this.tracking = false;    // dentro da janela de conciliação
+    this.journal = null;      // journal(record): registro de cada envio/desfecho na janela
+    this.preemptions = 0;
+    this.state = 'pending';
+    this.createdAt = process.hrtime.bigint();
+    this.eligibleAt = null;   // quando a próxima etiqueta passou a poder ser enviada
+    this.startedAt = null;
+    this.finishedAt = null;
+    this.cancellation = null;
+    this.events = new EventRing(id);
+    this.done = new Promise((resolve) => {
+      this._resolve = resolve;
+    });
+  }
+
+  get remaining() {
+    return this.units.length - this.cursor + this.retries.length;
+  }
+
+  get active() {
+    return this.state === 'queued' || this.state === 'printing';
+  }
+
+  finish(state) {
+    this.state = state;
+    this.finishedAt = new Date().toISOString();
+    this.events.publish(state, this.summary());
+    this._resolve(this);
+  }
+
+  summary() {
+    return {
+      jobId: this.id,
+      priority: this.priority,
+      state: this.state,
+      totalUnits: this.units.length,
+      sent: this.cursor,
+      successCount: this.results.filter(result => result.success).length,
+      preemptions: this.preemptions,
+      startedAt: this.startedAt,
+      finishedAt: this.finishedAt
+    };
+  }
+
+  /**
+   * Relatório por unidade: o último registro de cada uma (ou not_sent)
+   */
+  report() {
+    const latest = new Map();
+    for (const result of this.results) {
+      latest.set(result.index, result);
+    }
+    const entry = (index, ack, label) => ({
+      unit: index,
+      item: label.item,
+      po: label.po,
+      sequence: label.sequence,
+      barcode: label.barcode,
+      ack
+    });
+    const printed = [];
+    const notPrinted = [];
+    const unconfirmed = [];
+    for (let index = 0; index < this.units.length; index++) {
+      const result = latest.get(index);
+      let item;
+      if (result) {
+        item = entry(index, result.ack, result);
+      } else {
+        let label = {};
+        try {
+          label = this.render(unitAt(this.units, index)).label;
+        } catch (error) {
+          // Unidade que nem chegou a ser montada: fica só com o índice
+        }
+        item = entry(index, 'not_sent', label);
+      }
+      if (PRINTED_ACKS.includes(item.ack)) {
+        printed.push(item);
+      } else if (UNCERTAIN_ACKS.includes(item.ack)) {
+        unconfirmed.push(item);
+      } else {
+        notPrinted.push(item);
+      }
+    }
+    return {
+      ...this.summary(),
+      cancellation: this.cancellation,
+      counts: { printed: printed.length, notPrinted: notPrinted.length, unconfirmed: unconfirmed.length },
+      printed,
+      notPrinted,
+      unconfirmed
+    };
+  }
+}
+
+class PrintQueue {
+  /**
+   * send(zpl) -> { success, error, result: { job_id, jobs_in_queue, ... } }
+   * queueDepth() -> jobs na fila do spooler (opcional, para segurar os lotes)
+   * purge(spoolJobIds) -> ids removidos do spooler (cancelamento)
+   * cancelPrinter(job) -> { formatsCancelled } ou null sem canal de leitura (cancelamento)
+   * onLabel(record) -> registro da etiqueta a cada envio e a cada mudança de ack
+   */
+  constructor({ send, queueDepth = null, purge = null, cancelPrinter = null, onLabel = () => {}, printerName = '',
+                maxSpooled = MAX_SPOOLED, pollMs = POLL_MS, printerBuffer = PRINTER_BUFFER }) {
+    this.send = send;
+    this.queueDepth = queueDepth;
+    this.purge = purge;
+    this.cancelPrinter = cancelPrinter;
+    this.onLabel = onLabel;
+    this.printerName = printerName;
+    this.maxSpooled = maxSpooled;
+    this.pollMs = pollMs;
+    this.printerBuffer = printerBuffer;
+    this.jobs = new Map();
+    this.delivered = [];
+    this.spooled = 0;
+    this.running = false;
+    this.inflight = Promise.resolve();
+    this.holds = new Set();
+    this.quiesced = Promise.resolve();
+    this.lastJob = null;
+    this.order = 0;
+  }
+
+  /**
+   * Job ainda fora da fila (ex.: enquanto os contadores são lidos)
+   */
+  create({ priority, units, render, printer = null }) {
+    const job = new PrintJob(crypto.randomBytes(8).toString('hex'), priority, units, render, this.order++, printer);
+    this.jobs.set(job.id, job);
+    this._prune();
+    return job;
+  }
+
+  /**
+   * Coloca o job na fila; se estiver pausado antes de entrar, o pedido fica
+   * guardado e vale na retomada
+   */
+  start(job) {
+    job.startRequested = true;
+    if (job.state === 'pending') {
+      job.state = 'queued';
+      job.eligibleAt = process.hrtime.bigint();
+      job.events.publish('queued', { priority: job.priority, totalUnits: job.units.length });
+      if (job.units.length === 0) {
+        job.finish('done');
+      }
+      this._run();
+    }
+    return job;
+  }
+
+  submit(options) {
+    return this.start(this.create(options));
+  }
+
+  getJob(id) {
+    const job = this.jobs.get(id);
+    if (!job) {
+      throw controlError('Job de impressão não encontrado', 404);
+    }
+    return job;
+  }
+
+  status() {
+    return {
+      printer: this.printerName,
+      spooled: this.spooled,
+      jobs: [...this.jobs.values()].map(job => job.summary())
+    };
+  }
+
+  // --- Controle ---
+
+  /**
+   * Para de enviar o job na próxima fronteira de formato (as etiquetas já
+   * entregues ao spooler continuam saindo)
+   */
+  pause(id) {
+    const job = this.getJob(id);
+    if (!job.active && job.state !== 'pending') {
+      throw controlError(`Job ${job.state}: não pode ser pausado`);
+    }
+    job.pausedFrom = job.state;
+    job.state = 'paused';
+    job.events.publish('paused', { sent: job.cursor });
+    return job.summary();
+  }
+
+  resume(id) {
+    const job = this.getJob(id);
+    if (job.state !== 'paused') {
+      throw controlError(`Job ${job.state}: só um job pausado pode ser retomado`);
+    }
+    job.state = job.pausedFrom === 'pending' ? 'pending' : (job.cursor > 0 ? 'printing' : 'queued');
+    job.events.publish('resumed', { sent: job.cursor });
+    if (job.state !== 'pending' && job.remaining <= 0 && !job.sending) {
+      // Pausado depois da última etiqueta: não há mais o que retomar (com ela
+      // ainda em envio, o job termina quando o envio voltar)
+      job.finish('done');
+      return job.summary();
+    }
+    job.eligibleAt = process.hrtime.bigint();
+    if (job.state === 'pending' && job.startRequested) {
+      this.start(job);
+    }
+    this._run();
+    return job.summary();
+  }
+
+  /**
+   * Cancela o job: esvazia a fila do host, remove do spooler o que ainda não
+   * saiu, descarta o buffer da impressora (~JA) e devolve o relatório por unidade
+   */
+  async cancel(id) {
+    const job = this.getJob(id);
+    if (FINAL_STATES.includes(job.state)) {
+      return job.report();
+    }
+    if (job.state === 'cancelling') {
+      await job.done;
+      return job.report();
+    }
+    job.state = 'cancelling';
+
+    const release = this._hold();
+    const cancellation = { spooler: null, printer: null, requeued: 0, errors: [] };
+    try {
+      await this.inflight;
+      const affected = await this._bufferedTail();
+
+      // 1. Spooler: etiquetas entregues ao Windows que ainda não saíram
+      const pending = affected.filter(result => result.spoolJobId !== undefined);
+      if (this.purge && pending.length > 0) {
+        try {
+          const purged = new Set(await this.purge(pending.map(result => result.spoolJobId)));
+          for (const result of pending) {
+            if (purged.has(result.spoolJobId)) result.ack = 'purged';
+          }
+          cancellation.spooler = { purged: purged.size };
+        } catch (error) {
+          cancellation.errors.push(`spooler: ${error.message}`);
+        }
+      }
+
+      // 2. Impressora: o que está no buffer é descartado (~JA); com a contagem
+      // do buffer, as últimas etiquetas entregues são as descartadas
+      const inPrinter = affected.filter(result => result.ack === 'sent');
+      let printer = null;
+      if (this.cancelPrinter) {
+        try {
+          printer = await this.cancelPrinter(job);
+        } catch (error) {
+          cancellation.errors.push(`impressora: ${error.message}`);
+        }
+      }
+      cancellation.printer = printer;
+      if (printer && Number.isInteger(printer.formatsCancelled)) {
+        const firstCancelled = Math.max(0, inPrinter.length - printer.formatsCancelled);
+        inPrinter.forEach((result, position) => {
+          result.ack = position >= firstCancelled ? 'cancelled' : 'printed';
+        });
+      } else {
+        for (const result of inPrinter) {
+          result.ack = 'unconfirmed';
+        }
+      }
+      this.delivered = this.delivered.filter(result => result.ack === 'sent');
+      for (const result of affected) {
+        const owner = this.jobs.get(result.jobId);
+        if (owner) owner.events.publish(result.ack, labelEvent(result));
+        if (result.ack !== 'sent') {
+          this.onLabel(result);
+          this._journal(result);
+        }
+      }
+
+      // 3. Etiquetas de outros jobs descartadas junto voltam para a fila deles;
+      // as de um job já terminado vão para um job de reenvio
+      const lost = affected.filter(result => result.jobId !== job.id
+        && (result.ack === 'purged' || result.ack === 'cancelled'));
+      const followUps = new Map();
+      for (const result of lost) {
+        const owner = this.jobs.get(result.jobId);
+        if (!owner) continue;
+        if (!FINAL_STATES.includes(owner.state)) {
+          owner.retries.push(result.index);
+          result.requeued = owner.id;
+        } else {
+          if (!followUps.has(owner)) followUps.set(owner, []);
+          followUps.get(owner).push(result);
+        }
+        cancellation.requeued++;
+      }
+      cancellation.followUps = [];
+      for (const [owner, results] of followUps) {
+        const followUp = this.create({
+          priority: owner.priority,
+          units: results.map(result => unitAt(owner.units, result.index)),
+          render: owner.render,
+          printer: owner.printer
+        });
+        for (const result of results) {
+          result.requeued = followUp.id;
+        }
+        owner.events.publish('requeued', { followUpJobId: followUp.id, units: results.map(result => result.index) });
+        cancellation.followUps.push({ jobId: followUp.id, from: owner.id, units: results.length });
+        followUp.done.then(() => followUp.events.close());
+        this.start(followUp);
+      }
+
+      job.cancellation = cancellation;
+      job.finish('cancelled');
+    } finally {
+      release();
+    }
+    return job.report();
+  }
+
+  /**
+   * Roda task com a impressora parada: segura o worker, espera o envio em
+   * curso e o spooler esvaziar (a leitura dos contadores espera o buffer da
+   * impressora). Uma por vez - as leituras de conciliação não se cruzam
+   */
+  quiesce(task) {
+    const run = this.quiesced.then(async () => {
+      const release = this._hold();
+      try {
+        await this.inflight;
+        await this._drainSpooler();
+        return await task();
+      } finally {
+        release();
+      }
+    });
+    this.quiesced = run.catch(() => {});
+    return run;
+  }
+
+  _hold() {
+    let release;
+    const hold = new Promise((resolve) => {
+      release = resolve;
+    });
+    this.holds.add(hold);
+    return () => {
+      this.holds.delete(hold);
+      release();
+      this._run();
+    };
+  }
+
+  async _drainSpooler() {
+    if (!this.queueDepth) return;
+    const deadline = Date.now() + DRAIN_TIMEOUT_MS;
+    while (Date.now() < deadline) {
+      try {
+        this.spooled = await this.queueDepth();
+      } catch (error) {
+        return;
+      }
+      if (this.spooled === 0) return;
+      await new Promise(resolve => setTimeout(resolve, this.pollMs));
+    }
+  }
+
+  /**
+   * Etiquetas entregues que ainda podem não ter saído: as que estão no spooler
+   * e as que cabem no buffer da impressora. As mais antigas já foram impressas
+   */
+  async _bufferedTail() {
+    if (this.queueDepth) {
+      try {
+        this.spooled = await this.queueDepth();
+      } catch (error) {
+        // Sem leitura da fila: fica a última contagem conhecida
+      }
+    }
+    const sent = this.delivered.filter(result => result.ack === 'sent');
+    return sent.slice(Math.max(0, sent.length - this.spooled - this.printerBuffer));
+  }
+
+  // --- Worker ---
+
+  /**
+   * Job da vez: maior prioridade e, dentro dela, o mais antigo
+   */
+  _next() {
+    let next = null;
+    for (const job of this.jobs.values()) {
+      if (!job.active) continue;
+      const rank = PRIORITIES.indexOf(job.priority);
+      if (!next || rank < PRIORITIES.indexOf(next.priority)
+          || (rank === PRIORITIES.indexOf(next.priority) && job.order < next.order)) {
+        next = job;
+      }
+    }
+    return next;
+  }
+
+  async _waitForSpooler() {
+    await new Promise(resolve => setTimeout(resolve, this.pollMs));
+    try {
+      this.spooled = await this.queueDepth();
+    } catch (error) {
+      // Sem leitura da fila: libera o envio em vez de travar o lote
+      this.spooled = 0;
+    }
+  }
+
+  async _run() {
+    if (this.running) return;
+    this.running = true;
+    try {
+      while (true) {
+        while (this.holds.size > 0) {
+          await Promise.all(this.holds);
+        }
+        const job = this._next();
+        if (!job) break;
+        if (job.priority === 'bulk' && this.queueDepth && this.spooled >= this.maxSpooled) {
+          await this._waitForSpooler();
+          continue;
+        }
+        if (this.lastJob && this.lastJob !== job && this.lastJob.active) {
+          this.lastJob.preemptions++;
+        }
+        this.lastJob = job;
+        this.inflight = this._sendNext(job);
+        await this.inflight;
+      }
+    } finally {
+      this.running = false;
+    }
+  }
+
+  async _sendNext(job) {
+    if (job.retries.length === 0 && job.cursor >= job.units.length) {
+      this._finishIfDone(job);
+      return;
+    }
+    if (job.state === 'queued') {
+      job.state = 'printing';
+      job.startedAt = new Date().toISOString();
+    }
+    const index = job.retries.length > 0 ? job.retries.shift() : job.cursor++;
+    const unit = unitAt(job.units, index);
+    // Espera desta etiqueta: desde a entrada do job na fila (a primeira) ou
+    // desde o envio da anterior - não a idade do job
+    const queueWaitMs = Number(process.hrtime.bigint() - job.eligibleAt) / 1e6;
+    let record;
+    job.sending = true;
+    try {
+      const { zpl, label } = job.render(unit);
+      job.events.publish('rendered', labelEvent({ ...label, index }));
+      const spoolStart = process.hrtime.bigint();
+      const printResult = await this.send(zpl);
+      const details = printResult.result || {};
+      record = {
+        ...label,
+        index,
+        jobId: job.id,
+        success: printResult.success,
+        ack: printResult.success ? 'sent' : 'failed',
+        message: printResult.success ? null : printResult.error,
+        details: printResult.result,
+        spoolJobId: details.job_id,
+        queueWaitMs,
+        spoolMs: Number(process.hrtime.bigint() - spoolStart) / 1e6
+      };
+      if (Number.isInteger(details.jobs_in_queue)) {
+        this.spooled = details.jobs_in_queue;
+      }
+    } catch (error) {
+      record = { index, unit, jobId: job.id, success: false, ack: 'failed', message: error.message, queueWaitMs };
+    } finally {
+      job.sending = false;
+    }
+    job.results.push(record);
+    job.eligibleAt = process.hrtime.bigint();
+    this.onLabel(record);
+    job.events.publish(record.success ? 'sent' : 'failed', {
+      ...labelEvent(record),
+      spoolJobId: record.spoolJobId,
+      message: record.message
+    });
+
+    if (record.success) {
+      this.delivered.push(record);
+      if (this.delivered.length > MAX_DELIVERED) {
+        this.delivered.splice(0, this.delivered.length - MAX_DELIVERED);
+      }
+      for (const other of this.jobs.values()) {
+        if (other !== job && other.tracking) {
+          other.interleaved.push(record);
+        }
+      }
+    }
+    this._journal(record, job);
+    this._finishIfDone(job);
+  }
+
+  /**
+   * Fim do job quando não resta etiqueta - também se foi pausado com a última
+   * em envio (o cancelamento em curso fecha o job por conta própria)
+   */
+  _finishIfDone(job) {
+    if (job.remaining <= 0 && (job.active || job.state === 'paused')) {
+      job.finish('done');
+    }
+  }
+
+  /**
+   * Registro no journal das janelas de conciliação abertas (envios com falha
+   * só na do próprio job)
+   */
+  _journal(record, sender = null) {
+    for (const job of this.jobs.values()) {
+      if (job.tracking && job.journal && (record.success || job === sender)) {
+        job.journal(record);
+      }
+    }
+  }
+
+  _prune() {
+    const finished = [...this.jobs.values()].filter(job => FINAL_STATES.includes(job.state) && !job.tracking);
+    for (const job of finished.slice(0, Math.max(0, finished.length - MAX_FINISHED_JOBS))) {
+      this.jobs.delete(job.id);
+    }
+  }
+}
+
+module.exports = {
+  PRIORITIES,
+  PrintQueue,
+  resolvePriority
+};
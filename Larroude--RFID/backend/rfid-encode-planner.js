@@ -0,0 +1,79 @@
+/**
+ * Planejador da gravação RFID (^RFR/^RFW), espelho do rfid_encode.py
+ * Só emite as operações de RF que o perfil do tag exige: leitura prévia do TID
+ * apenas com verificação, PC apenas quando o tamanho do EPC muda e PC + EPC
+ * numa escrita só quando o inlay aceita BlockWrite.
+ */
+
+const EPC_BANK = 1;
+const TID_BANK = 2;
+const PC_WORD = 1; // palavra do PC no banco EPC (0 = CRC)
+const EPC_START_WORD = 2; // início do EPC no banco EPC
+
+// Padrões sobrescritos pelas variáveis RFID_* (mesmas do rfid_encode.py)
+const DEFAULT_TAG_PROFILE = Object.freeze({
+  epcBytes: parseInt(process.env.RFID_EPC_BYTES || '12', 10), // EPC gravado (12 bytes = 96 bits)
+  factoryEpcBytes: parseInt(process.env.RFID_FACTORY_EPC_BYTES || '12', 10), // tamanho que o PC do inlay já indica
+  blockWrite: process.env.RFID_BLOCK_WRITE === '1', // inlay aceita BlockWrite (PC + EPC numa operação)
+  verify: process.env.RFID_VERIFY === '1' // lê o TID antes de gravar (verificação)
+});
+
+const PRE_READ = `^RFR,H,0,12,${TID_BANK}^FS`;
+
+/**
+ * Perfil do tag com os valores padrão completados
+ * @param {object} [overrides] - { epcBytes, factoryEpcBytes, blockWrite, verify }
+ * @returns {object} - Perfil completo
+ */
+function tagProfile(overrides = {}) {
+  const profile = { ...DEFAULT_TAG_PROFILE };
+  for (const [key, value] of Object.entries(overrides)) {
+    if (value !== undefined && value !== null) {
+      profile[key] = value;
+    }
+  }
+  profile.epcBytes = parseInt(profile.epcBytes, 10);
+  profile.factoryEpcBytes = parseInt(profile.factoryEpcBytes, 10);
+  if (!(profile.epcBytes >= 2 && profile.epcBytes <= 62) || profile.epcBytes % 2) {
+    throw new Error(`Tamanho de EPC inválido: ${profile.epcBytes} bytes (par, de 2 a 62)`);
+  }
+  return profile;
+}
+
+/**
+ * PC com o tamanho do EPC em palavras nos bits 15-11 (12 bytes -> 3000)
+ */
+function pcWord(epcBytes) {
+  return ((epcBytes / 2) << 11).toString(16).toUpperCase().padStart(4, '0');
+}
+
+/**
+ * Lista mínima de comandos ZPL para gravar o EPC conforme o perfil
+ * @param {string} epc - Dados do EPC
+ * @param {object} [profile] - Perfil do tag (ver tagProfile)
+ * @returns {string[]} - Comandos ^RFR/^RFW, na ordem
+ */
+function planRFIDEncode(epc, profile = tagProfile()) {
+  const { epcBytes } = profile;
+  const commands = [];
+  if (profile.verify) {
+    commands.push(PRE_READ);
+  }
+
+  if (epcBytes === profile.factoryEpcBytes) {
+    commands.push(`^RFW,H,${EPC_START_WORD},${epcBytes},${EPC_BANK}^FD${epc}^FS`);
+  } else if (profile.blockWrite) {
+    commands.push(`^RFW,H,${PC_WORD},${epcBytes + 2},${EPC_BANK}^FD${pcWord(epcBytes)}${epc}^FS`);
+  } else {
+    commands.push(`^RFW,H,${PC_WORD},2,${EPC_BANK}^FD${pcWord(epcBytes)}^FS`);
+    commands.push(`^RFW,H,${EPC_START_WORD},${epcBytes},${EPC_BANK}^FD${epc}^FS`);
+  }
+  return commands;
+}
+
+module.exports = {
+  DEFAULT_TAG_PROFILE,
+  tagProfile,
+  pcWord,
+  planRFIDEncode
+};
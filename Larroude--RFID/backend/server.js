@@ -6,11 +6,34 @@ const fs = require('fs');
 const XLSX = require('xlsx');
 const QRCode = require('qrcode');
 const JsBarcode = require('jsbarcode');
-const { PDFDocument, rgb } = require('pdf-lib');
-const archiver = require('archiver');
 const sharp = require('sharp');
 const axios = require('axios');
 const { Label } = require('node-zpl');
+const {
+  generatePreviews,
+  validateBatch,
+  warmPreviewCache,
+  readUploadFile,
+  exportLabels,
+  streamLabelExport,
+  exportPDF,
+  reprintRange,
+  recordPrints,
+  appendPrint,
+  flushPrints,
+  lookupPrints,
+  searchLabels,
+  recordSpans,
+  readMetrics,
+  reconcileBegin,
+  reconcileEnd,
+  cancelPrinterFormats
+} = require('./zpl-processor');
+const { parseVPM } = require('./vpm-parser');
+const previewService = require('./preview-service');
+const { PrintQueue, resolvePriority } = require('./print-queue');
+const { streamEvents } = require('./job-events');
+const { LabelUnits } = require('./label-units');
 
 /**
  * Utilitários RFID para conversão hexadecimal
@@ -143,28 +166,38 @@ app.post('/api/upload-excel', upload.single('excel'), async (req, res) => {
     let data;
     const fileExt = path.extname(req.file.path).toLowerCase();
     
-    if (fileExt === '.csv') {
-      // Ler arquivo CSV
-      const csvContent = fs.readFileSync(req.file.path, 'utf8');
-      const lines = csvContent.split('\n').filter(line => line.trim());
-      
-      if (lines.length < 2) {
-        return res.status(400).json({ error: 'Arquivo CSV deve ter pelo menos cabeÃ§alho e uma linha de dados' });
+    if (fileExt === '.xlsx' || fileExt === '.csv') {
+      // XLSX (em streaming, sem abrir a Sheet1 - banco de dados) e CSV sÃ£o lidos pelo
+      // Python; o layout de cada aba/arquivo Ã© resolvido uma vez pelo cabeÃ§alho
+      // Sessão = planilha reenviada (campo 'session' ou o nome do arquivo)
+      const session = req.body.session || req.file.originalname;
+      let result;
+      try {
+        result = await readUploadFile(path.resolve(req.file.path), fileExt.slice(1), session);
+      } catch (error) {
+        return res.status(400).json({ error: error.message });
+      } finally {
+        fs.unlinkSync(req.file.path);
       }
-      
-      const headers = lines[0].split(',').map(h => h.trim());
-      data = [];
-      
-      for (let i = 1; i < lines.length; i++) {
-        const values = lines[i].split(',').map(v => v.trim());
-        const row = {};
-        headers.forEach((header, index) => {
-          row[header] = values[index] || '';
-        });
-        data.push(row);
+
+      const { diff } = result;
+      console.log(`📊 Upload ${fileExt.slice(1).toUpperCase()}: ${result.totalRecords} registro(s) em ${result.ingestMs} ms` +
+        (diff.firstUpload ? '' : ` (${diff.added} nova(s), ${diff.changed} alterada(s), ${diff.removed} removida(s))`));
+      res.json({
+        message: 'Arquivo processado com sucesso',
+        data: result.data,
+        totalRecords: result.totalRecords,
+        diff,
+        searchId: result.searchId
+      });
+
+      // Deixar prontos os previews das linhas novas/alteradas (as demais jÃ¡ estÃ£o no cache)
+      if (diff.rows.length > 0) {
+        warmPreviewCache(diff.rows.map(row => result.data[row]));
       }
+      return;
     } else {
-      // Ler arquivo Excel - processar apenas abas de etiquetas (excluir Sheet1 que Ã© banco de dados)
+      // Ler arquivo Excel (.xls) - processar apenas abas de etiquetas (excluir Sheet1 que Ã© banco de dados)
       const workbook = XLSX.readFile(req.file.path);
       data = [];
       
@@ -206,8 +239,7 @@ app.post('/api/upload-excel', upload.single('excel'), async (req, res) => {
       } else if (hasAlternativeColumns) {
         // Mapear formato alternativo para padrÃ£o
         const sku = row['Variant SKU'] || '';
-        const skuParts = sku.split('-');
-        const style = skuParts[1] || '';
+        const style = parseVPM(sku).styleCode;
         
         alternativeData.push({
           NAME: style,
@@ -233,9 +265,9 @@ app.post('/api/upload-excel', upload.single('excel'), async (req, res) => {
     data = data.map(row => {
       // Extrair cor e tamanho do SKU (formato: L264-HANA-5.0-WHIT-1120)
       const sku = row.SKU || '';
-      const skuParts = sku.split('-');
-      const size = skuParts.length >= 3 ? skuParts[2] : '';
-      const colorCode = skuParts.length >= 4 ? skuParts[3] : '';
+      const vpmInfo = parseVPM(sku);
+      const size = vpmInfo.size;
+      const colorCode = vpmInfo.colorCode;
       
       // Mapear cÃ³digos de cor para nomes
       const colorMap = {
@@ -252,14 +284,8 @@ app.post('/api/upload-excel', upload.single('excel'), async (req, res) => {
       const color = colorMap[colorCode] || row.DESCRIPTION?.split(' ').pop() || colorCode || 'N/A';
       
       // Extrair PO do VPM/SKU (exemplo: L264-HANA-5.0-WHIT-1120 -> PO264)
-      const vpm = row.SKU || '';
-      const vpmParts = vpm.split('-');
-      let poNumber = '';
-      if (vpmParts.length > 0) {
-        // Remover 'L' do início e extrair número do PO
-        const firstPart = vpmParts[0].replace(/^L/, '');
-        poNumber = firstPart || '0000';
-      }
+      const vpm = sku;
+      const poNumber = vpmInfo.po || '0000';
 
       return {
         STYLE_NAME: row.NAME || '',
@@ -283,6 +309,9 @@ app.post('/api/upload-excel', upload.single('excel'), async (req, res) => {
       totalRecords: data.length
     });
 
+    // Deixar os previews prontos enquanto o usuÃ¡rio revisa os dados
+    warmPreviewCache(data);
+
   } catch (error) {
     console.error('Erro ao processar arquivo:', error);
     res.status(500).json({ error: 'Erro interno do servidor' });
@@ -298,51 +327,282 @@ app.post('/api/generate-preview', async (req, res) => {
       return res.status(400).json({ error: 'Dados invÃ¡lidos' });
     }
 
-    const previews = [];
-    
-    // Expandir dados baseado no campo QTY para calcular total de etiquetas
-    let totalLabels = 0;
-    for (const item of data) {
-      const qty = parseInt(item.QTY) || 1;
-      totalLabels += qty;
-    }
+    // Renderizar todas as etiquetas (QTY) numa única chamada ao rasterizador Python
+    const result = await generatePreviews(data);
 
-    console.log(`Gerando previews para ${totalLabels} etiquetas de ${data.length} itens`);
+    console.log(`Previews gerados: ${result.previewCount} de ${data.length} itens, ${result.distinctFaces} faces distintas (${result.renderMs} ms)`);
 
-    // Gerar previews para TODAS as etiquetas (sem limitaÃ§Ã£o)
-    for (const item of data) {
-      const qty = parseInt(item.QTY) || 1;
-      
-      for (let i = 0; i < qty; i++) {
-        const preview = await generateLabelPreview(item);
-        previews.push({
-          ...preview,
-          itemIndex: data.indexOf(item),
-          copyNumber: i + 1,
-          totalCopies: qty
-        });
-      }
+    res.json({
+      faces: result.faces,
+      labelWidth: result.labelWidth,
+      labelHeight: result.labelHeight,
+      distinctFaces: result.distinctFaces,
+      previews: result.previews,
+      totalItems: result.totalItems,
+      totalLabels: result.totalLabels,
+      previewCount: result.previewCount
+    });
+
+  } catch (error) {
+    console.error('Erro ao gerar preview:', error);
+    res.status(500).json({ error: 'Erro ao gerar preview' });
+  }
+});
+
+// Previews paginados: cria a sessão (nada é renderizado aqui)
+app.post('/api/preview-sessions', (req, res) => {
+  const { data } = req.body;
+
+  if (!data || !Array.isArray(data)) {
+    return res.status(400).json({ error: 'Dados inválidos' });
+  }
+
+  res.json(previewService.createSession(data));
+});
+
+// Página de previews (cursor = primeira unidade, 0 = início)
+app.get('/api/preview-sessions/:id/pages', async (req, res) => {
+  try {
+    const page = await previewService.getPage(req.params.id, req.query.cursor, req.query.limit);
+    res.json(page);
+  } catch (error) {
+    console.error('Erro ao carregar página de previews:', error);
+    res.status(error.status || 500).json({ error: error.status ? error.message : 'Erro ao carregar previews' });
+  }
+});
+
+// Imagem de uma unidade (thumb.png ou full.png), renderizada na primeira requisição
+app.get('/api/preview-sessions/:id/units/:unit/:size.png', async (req, res) => {
+  try {
+    const { id, unit, size } = req.params;
+    const etag = previewService.imageETag(id, unit, size);
+    res.set({ 'ETag': etag, 'Cache-Control': 'private, max-age=86400, immutable' });
+    if (req.headers['if-none-match'] === etag) {
+      return res.status(304).end();
     }
 
-    console.log(`Previews gerados: ${previews.length}`);
+    const filePath = await previewService.getImage(id, unit, size);
+    res.type('png').sendFile(filePath, { etag: false, lastModified: false, cacheControl: false }, (err) => {
+      if (err && !res.headersSent) {
+        res.status(404).json({ error: 'Preview não encontrado' });
+      }
+    });
+  } catch (error) {
+    console.error('Erro ao servir preview:', error);
+    res.status(error.status || 500).json({ error: error.status ? error.message : 'Erro ao servir preview' });
+  }
+});
+
+// Pesquisa paginada nas linhas do upload (q = termos; STYLE_NAME, COLOR, SIZE... = filtros exatos)
+const SEARCH_FIELDS = ['STYLE_NAME', 'VPM', 'COLOR', 'SIZE', 'BARCODE', 'DESCRIPTION', 'PO'];
+
+app.get('/api/search', async (req, res) => {
+  try {
+    const { searchId, q, cursor, limit } = req.query;
+    if (!searchId) {
+      return res.status(400).json({ error: 'Informe o searchId retornado pelo upload' });
+    }
 
+    const filters = {};
+    for (const field of SEARCH_FIELDS) {
+      if (req.query[field]) {
+        filters[field] = req.query[field];
+      }
+    }
+    const result = await searchLabels(searchId, { q: q || '', filters, cursor, limit });
     res.json({
-      previews: previews,
-      totalItems: data.length,
-      totalLabels: totalLabels,
-      previewCount: previews.length
+      items: result.items,
+      total: result.total,
+      totalRows: result.totalRows,
+      cursor: result.cursor,
+      nextCursor: result.nextCursor,
+      searchMs: result.searchMs
     });
 
   } catch (error) {
-    console.error('Erro ao gerar preview:', error);
-    res.status(500).json({ error: 'Erro ao gerar preview' });
+    console.error('Erro na pesquisa:', error);
+    res.status(error.status || 500).json({ error: error.status ? error.message : 'Erro na pesquisa' });
   }
 });
 
+/**
+ * ZPL de uma unidade no template oficial: barcode sequencial (barcode + PO +
+ * sequencial) e RFID no formato ZebraDesigner (24 dígitos)
+ */
+function buildIndividualLabel(template, { item, seq, itemQty }) {
+  const styleName = String(item.STYLE_NAME || 'N/A');
+  const vpm = String(item.VPM || 'N/A');
+
+  // Usar PO já extraído do upload, ou extrair do VPM como fallback
+  const vpmInfo = parseVPM(vpm);
+  const poNumber = item.PO || vpmInfo.po || '0000';
+
+  const barcodeSource = String(item.BARCODE || vpmInfo.compact || '00000000');
+  const sequentialBarcode = `${barcodeSource.substring(0, 8)}${poNumber}${seq}`;
+  const rfidContent = RFIDUtils.generateZebraDesignerFormat(barcodeSource.substring(0, 12), poNumber, seq, 24);
+  RFIDUtils.validateRFIDData(rfidContent);
+
+  const zpl = template
+    .replace('{STYLE_NAME}', styleName)
+    .replace('{VPM}', vpm)
+    .replace('{COLOR}', String(item.COLOR || 'N/A'))
+    .replace('{SIZE}', String(item.SIZE || 'N/A'))
+    .replace('{QR_DATA}', vpm)
+    .replace('{PO_INFO}', `PO${poNumber}`)
+    .replace('{LOCAL_INFO}', `Local.${vpmInfo.localNumber}`)
+    .replace('{BARCODE}', sequentialBarcode)
+    .replace('{RFID_DATA_HEX}', rfidContent);
+
+  return {
+    zpl,
+    label: {
+      item: `${styleName} (${seq}/${itemQty})`,
+      po: String(poNumber),
+      sequence: seq,
+      barcode: sequentialBarcode,
+      rfid: rfidContent
+    }
+  };
+}
+
+/**
+ * Executa um job da impressão individual: conciliação antes/depois, fila,
+ * ledger e métricas. Publica o resultado no stream do job ('finished' ou
+ * 'aborted') e fecha o stream
+ */
+async function runIndividualJob(job, { data, reconcileAddress }) {
+  try {
+    // Conciliação: contadores da impressora antes do lote, com a fila parada;
+    // daí em diante cada etiqueta que sai vai para o journal do lote
+    const batchId = `lote-${job.id}`;
+    let reconcileStarted = false;
+    if (reconcileAddress) {
+      try {
+        await printQueue.quiesce(async () => {
+          const begin = await reconcileBegin(reconcileAddress, batchId);
+          job.journal = reconcileJournal(begin.journal);
+          job.tracking = true;
+        });
+        reconcileStarted = true;
+      } catch (error) {
+        console.warn('⚠️ Conciliação desativada neste lote:', error.message);
+      }
+    }
+
+    await printQueue.start(job).done;
+
+    const printerName = pythonUSBIntegration.printerName;
+    const results = job.results.map(result => ({
+      item: result.item || `${result.unit.item.STYLE_NAME || 'Desconhecido'} (${result.unit.seq}/${result.unit.itemQty})`,
+      barcode: result.barcode,
+      rfid: result.rfid,
+      success: result.success,
+      ack: result.ack,
+      message: result.success ? `Etiqueta ${result.sequence} impressa com sucesso` : result.message,
+      details: result.details
+    }));
+    // Etiquetas removidas do spooler ou descartadas no buffer não saíram
+    const delivered = job.results.filter(result => !['purged', 'cancelled'].includes(result.ack));
+    const spans = job.results.filter(result => result.spoolMs !== undefined).flatMap(result => [
+      { stage: 'queue_wait', printer: printerName, ms: result.queueWaitMs },
+      { stage: 'spool', printer: printerName, ms: result.spoolMs }
+    ]);
+    const totalEtiquetasProcessadas = job.units.length;
+    const successCount = results.filter(r => r.success).length;
+    console.log(`✅ Job ${job.id}: ${successCount}/${results.length} etiquetas enviadas (${job.preemptions} preempção(ões))`);
+
+    // O ledger foi gravado etiqueta a etiqueta (onLabel da fila); aqui só o último lote
+    try {
+      await flushPrints();
+    } catch (error) {
+      console.warn('⚠️ Falha ao registrar impressões no ledger:', error.message);
+    }
+    recordSpans(spans).catch((error) => {
+      console.warn('⚠️ Falha ao registrar métricas de latência:', error.message);
+    });
+
+    let reconciliation = null;
+    if (reconcileStarted) {
+      try {
+        // Os envios (deste job e dos que passaram na frente) já estão no
+        // journal; a leitura final também espera a fila parar
+        reconciliation = await printQueue.quiesce(() => {
+          job.tracking = false;
+          return reconcileEnd(reconcileAddress, batchId, []);
+        });
+        if (!reconciliation.ok) {
+          console.log(`🚩 Conciliação ${batchId}:`, reconciliation.flags.join('; '));
+        }
+        publishReconciliation(job, delivered, reconciliation);
+      } catch (error) {
+        console.warn('⚠️ Falha na conciliação do lote:', error.message);
+      }
+    }
+
+    const response = {
+      message: `${successCount}/${results.length} etiquetas sequenciais impressas com sucesso`,
+      results: results,
+      totalItems: data.length,
+      totalEtiquetas: totalEtiquetasProcessadas,
+      successCount: successCount,
+      jobId: job.id,
+      priority: job.priority,
+      preemptions: job.preemptions,
+      state: job.state,
+      cancellation: job.state === 'cancelled' ? job.report() : null,
+      reconciliation: reconciliation,
+      timestamp: new Date().toISOString(),
+      info: "Sistema com PO na RFID e barcode sequencial ativo"
+    };
+    job.events.publish('finished', response);
+    return response;
+  } catch (error) {
+    job.events.publish('aborted', { message: error.message });
+    throw error;
+  } finally {
+    job.tracking = false;
+    job.events.close();
+  }
+}
+
+/**
+ * Journal do lote de conciliação: uma linha por envio (ou desfecho) gravada
+ * na hora, para que uma queda no meio do lote não perca o registro do host
+ */
+function reconcileJournal(journalPath) {
+  return (record) => {
+    const send = { type: 'send', unit: record.index, barcode: record.barcode, epc: record.rfid, encode: true, status: record.ack };
+    try {
+      fs.appendFileSync(journalPath, JSON.stringify(send) + '\n');
+    } catch (error) {
+      console.warn('⚠️ Falha ao gravar envio no journal da conciliação:', error.message);
+    }
+  };
+}
+
+/**
+ * Confirmação por etiqueta a partir da conciliação: com os contadores batendo,
+ * cada etiqueta enviada foi impressa e gravada; tags anulados (VOID) só têm a
+ * contagem do lote
+ */
+function publishReconciliation(job, delivered, reconciliation) {
+  if (reconciliation.ok) {
+    for (const result of delivered.filter(result => result.success)) {
+      const label = { unit: result.index, sequence: result.sequence, barcode: result.barcode, rfid: result.rfid };
+      job.events.publish('printed', label);
+      job.events.publish('encoded', label);
+    }
+  }
+  if (reconciliation.delta && reconciliation.delta.rfidVoid) {
+    job.events.publish('void', { count: reconciliation.delta.rfidVoid });
+  }
+  job.events.publish('reconciled', reconciliation);
+}
+
 // Imprimir etiqueta individual via Python USB (SEM VOID)
 app.post('/api/print-individual', async (req, res) => {
   try {
-    const { data, quantity } = req.body;
+    const { data, quantity, printer } = req.body;
     
     if (!data || !Array.isArray(data) || data.length === 0) {
       return res.status(400).json({ error: 'Dados inválidos para impressão' });
@@ -350,125 +610,159 @@ app.post('/api/print-individual', async (req, res) => {
 
     const requestedQty = quantity || data.length;
     console.log(`🖨️ Imprimindo ${requestedQty} etiqueta(s) individual via Python USB...`);
-    
-    // Usar o módulo Python USB que funciona sem VOID
-    const results = [];
-    
-    // Processar cada item com numeração sequencial
-    let totalEtiquetasProcessadas = 0;
-    for (const item of data) {
-      const itemQty = parseInt(item.QTY) || 1;
-      
-      // Para cada item, gerar as etiquetas com numeração sequencial
-      for (let seq = 1; seq <= itemQty; seq++) {
-        totalEtiquetasProcessadas++;
-        
-        try {
-          // Dados básicos do item
-          const styleName = String(item.STYLE_NAME || 'N/A');
-          const vpm = String(item.VPM || 'N/A');
-          const color = String(item.COLOR || 'N/A');
-          const size = String(item.SIZE || 'N/A');
-          
-          // Usar PO já extraído do upload, ou extrair do VPM como fallback
-          const poNumber = item.PO || (vpm.split('-')[0] || '').replace('L', '') || '0000';
-          const poFormatted = `PO${poNumber}`;
-          
-          // Gerar barcode sequencial: barcode + PO(sem letras) + sequencial
-          const barcodeSource = String(item.BARCODE || vpm.replace(/-/g, '') || '00000000');
-          const baseBarcode = barcodeSource.substring(0, 12); // Usar barcode completo para RFID
-          const sequentialBarcode = `${barcodeSource.substring(0, 8)}${poNumber}${seq}`;
-          
-          // Dados para RFID: formato ZebraDesigner que funcionou (24 chars com zeros)
-          // Exemplo: 197416145132046412345678
-          const rfidContent = RFIDUtils.generateZebraDesignerFormat(baseBarcode, poNumber, seq, 24);
-          
-          // Extrair Local do VPM
-          const vpmParts = vpm.split('-');
-          const localNumber = vpmParts.length > 4 ? vpmParts[4].substring(0, 3) : '000';
-        
-        // Carregar template oficial da Larroud
-        const fs = require('fs');
-        const path = require('path');
-        const templatePath = path.join(__dirname, 'TEMPLATE_LARROUD_ORIGINAL.zpl');
-        let larroudTemplate;
-        
-        try {
-          larroudTemplate = fs.readFileSync(templatePath, 'utf8');
-        } catch (error) {
-          console.error('Erro ao carregar template:', error);
-          throw new Error('Template oficial não encontrado');
-        }
 
-          // Validar dados RFID (enviar como string direta, igual ZebraDesigner)
-          RFIDUtils.validateRFIDData(rfidContent);
-          
-          console.log(`📡 RFID formato ZebraDesigner (string direta): ${rfidContent}`);
-          
-          // Substituir variáveis no template com dados sequenciais
-          const workingZPL = larroudTemplate
-            .replace('{STYLE_NAME}', styleName)
-            .replace('{VPM}', vpm)
-            .replace('{COLOR}', color)
-            .replace('{SIZE}', size)
-            .replace('{QR_DATA}', vpm)
-            .replace('{PO_INFO}', poFormatted)
-            .replace('{LOCAL_INFO}', `Local.${localNumber}`)
-            .replace('{BARCODE}', sequentialBarcode) // Usar barcode sequencial
-            .replace('{RFID_DATA_HEX}', rfidContent); // Enviar dados RFID como string direta (igual ZebraDesigner)
-
-          // Imprimir cada etiqueta individual (1 cópia por vez para manter sequência)
-          const printResult = await pythonUSBIntegration.sendZPL(workingZPL, 'ascii', 1);
-          
-          results.push({
-            item: `${styleName} (${seq}/${itemQty})`,
-            barcode: sequentialBarcode,
-            rfid: rfidContent,
-            success: printResult.success,
-            message: printResult.success ? `Etiqueta ${seq} impressa com sucesso` : printResult.error,
-            details: printResult.result
-          });
-          
-          console.log(`✅ Etiqueta ${styleName} ${seq}/${itemQty} processada:`, printResult.success ? 'OK' : printResult.error);
-          console.log(`   📊 Barcode: ${sequentialBarcode}`);
-          console.log(`   📡 RFID String Direta: ${rfidContent}`);
-          
-        } catch (error) {
-          console.error(`❌ Erro ao processar ${item.STYLE_NAME} ${seq}/${itemQty}:`, error);
-          results.push({
-            item: `${item.STYLE_NAME || 'Desconhecido'} (${seq}/${itemQty})`,
-            success: false,
-            message: error.message
-          });
-        }
-      } // Fim do loop de sequência
-    } // Fim do loop de itens
-    
-    const successCount = results.filter(r => r.success).length;
+    // Pre-flight: validar o lote inteiro antes de a impressora consumir etiquetas
+    const validation = await validateBatch(data);
+    if (!validation.valid) {
+      console.log(`❌ Lote reprovado na validação: ${validation.errorCount} erro(s)`, validation.errorsByRule);
+      return res.status(400).json({
+        error: `Lote reprovado na validação: ${validation.errorCount} erro(s)`,
+        validation
+      });
+    }
+    if (validation.warningCount > 0) {
+      console.log(`⚠️ Validação: ${validation.warningCount} aviso(s)`, validation.warningsByRule);
+    }
     
-    res.json({
-      message: `${successCount}/${results.length} etiquetas sequenciais impressas com sucesso`,
-      results: results,
+    // Etiquetas numeradas (sequencial por item) entram na fila de impressão:
+    // um job de maior prioridade pode passar na frente entre duas etiquetas.
+    // O job é criado antes da leitura dos contadores e só entra na fila depois.
+    // As unidades ({ item, seq, itemQty }) são montadas na hora a partir dos itens
+    const units = new LabelUnits(data);
+    const priority = resolvePriority(req.body.priority, units.length);
+    const template = fs.readFileSync(path.join(__dirname, 'TEMPLATE_LARROUD_ORIGINAL.zpl'), 'utf8');
+    // Conciliação e cancelamento (~JA) usam o canal TCP da impressora
+    const reconcileAddress = printer || process.env.PRINTER_ADDRESS;
+    const job = printQueue.create({
+      priority,
+      units,
+      render: (unit) => buildIndividualLabel(template, unit),
+      printer: reconcileAddress
+    });
+    console.log(`📥 Job ${job.id} (${priority}): ${units.length} etiqueta(s) na fila`);
+
+    // Sem wait, responde já com o id do job: o progresso segue pelo stream de eventos
+    if (req.body.wait) {
+      return res.json(await runIndividualJob(job, { data, reconcileAddress }));
+    }
+    runIndividualJob(job, { data, reconcileAddress }).catch((error) => {
+      console.error(`Erro no job de impressão ${job.id}:`, error);
+    });
+    res.status(202).json({
+      message: `${units.length} etiqueta(s) na fila de impressão`,
+      jobId: job.id,
+      priority: job.priority,
       totalItems: data.length,
-      totalEtiquetas: totalEtiquetasProcessadas,
-      successCount: successCount,
-      timestamp: new Date().toISOString(),
-      info: "Sistema com PO na RFID e barcode sequencial ativo"
+      totalEtiquetas: units.length,
+      events: `/api/print-jobs/${job.id}/events`,
+      status: `/api/print-jobs/${job.id}`,
+      timestamp: new Date().toISOString()
     });
 
   } catch (error) {
     console.error('Erro na impressão individual:', error);
-    res.status(500).json({ error: 'Erro interno do servidor' });
+    res.status(error.status || 500).json({ error: error.status ? error.message : 'Erro interno do servidor' });
+  }
+});
+
+// Fila de impressão: jobs por prioridade, etiquetas enviadas e preempções
+app.get('/api/print-queue', (req, res) => {
+  res.json(printQueue.status());
+});
+
+// Controle de um job: situação com o relatório por etiqueta, pausa, retomada e cancelamento
+app.get('/api/print-jobs/:id', (req, res) => {
+  try {
+    res.json(printQueue.getJob(req.params.id).report());
+  } catch (error) {
+    res.status(error.status || 500).json({ error: error.message });
+  }
+});
+
+// Progresso do job (SSE): rendered, sent, failed, printed, encoded, void, finished...
+// Reconexão com Last-Event-ID (ou ?after=) recebe o que ficou no buffer
+app.get('/api/print-jobs/:id/events', (req, res) => {
+  try {
+    streamEvents(printQueue.getJob(req.params.id).events, req, res);
+  } catch (error) {
+    res.status(error.status || 500).json({ error: error.message });
+  }
+});
+
+app.post('/api/print-jobs/:id/pause', (req, res) => {
+  try {
+    res.json(printQueue.pause(req.params.id));
+  } catch (error) {
+    res.status(error.status || 500).json({ error: error.message });
+  }
+});
+
+app.post('/api/print-jobs/:id/resume', (req, res) => {
+  try {
+    res.json(printQueue.resume(req.params.id));
+  } catch (error) {
+    res.status(error.status || 500).json({ error: error.message });
+  }
+});
+
+app.post('/api/print-jobs/:id/cancel', async (req, res) => {
+  try {
+    const report = await printQueue.cancel(req.params.id);
+    console.log(`🛑 Job ${report.jobId} cancelado: ${report.counts.printed} impressa(s), ` +
+      `${report.counts.notPrinted} não impressa(s), ${report.counts.unconfirmed} sem confirmação`);
+    res.json(report);
+  } catch (error) {
+    console.error('Erro ao cancelar job de impressão:', error);
+    res.status(error.status || 500).json({ error: error.message });
+  }
+});
+
+// Reimpressão de um intervalo de unidades sem regravar tags já corretos
+app.post('/api/reprint', async (req, res) => {
+  try {
+    const { data, start, end, printer } = req.body;
+
+    if (!data || !Array.isArray(data)) {
+      return res.status(400).json({ error: 'Dados inválidos' });
+    }
+
+    const result = await reprintRange(data, { start, end, printer });
+    console.log(`🔁 Reimpressão: ${result.totalUnits} unidades (${result.faceOnly} só face, ${result.encoded} gravadas)`);
+
+    try {
+      await recordPrints(result.units.map(unit => ({
+        printer: printer || process.env.PRINTER_ADDRESS || '',
+        po: unit.po,
+        sequence: unit.sequence,
+        barcode: unit.barcode,
+        epc: unit.expectedEpc,
+        status: unit.action === 'face' ? 'face' : 'encoded'
+      })));
+    } catch (error) {
+      console.warn('⚠️ Falha ao registrar reimpressão no ledger:', error.message);
+    }
+
+    res.json({
+      message: 'Reimpressão concluída',
+      totalUnits: result.totalUnits,
+      faceOnly: result.faceOnly,
+      encoded: result.encoded,
+      units: result.units
+    });
+
+  } catch (error) {
+    console.error('Erro na reimpressão:', error);
+    res.status(500).json({ error: `Erro na reimpressão: ${error.message}` });
   }
 });
 
 // Gerar todas as etiquetas
 app.post('/api/generate-labels', async (req, res) => {
   try {
-    const { data } = req.body;
+    const { data, compression, mode, stream } = req.body;
     
     if (!data || !Array.isArray(data)) {
-      return res.status(400).json({ error: 'Dados invÃ¡lidos' });
+      return res.status(400).json({ error: 'Dados inválidos' });
     }
 
     const outputDir = 'output';
@@ -478,48 +772,115 @@ app.post('/api/generate-labels', async (req, res) => {
 
     const timestamp = Date.now();
     const zipFileName = `etiquetas-${timestamp}.zip`;
-    const zipPath = path.join(outputDir, zipFileName);
+    const options = { compression, mode };
+
+    // Download direto: o ZIP vai para a resposta enquanto é gerado
+    if (stream) {
+      res.setHeader('Content-Type', 'application/zip');
+      res.setHeader('Content-Disposition', `attachment; filename="${zipFileName}"`);
+      const exportProcess = streamLabelExport(data, options);
+      exportProcess.stdout.pipe(res);
+      exportProcess.on('error', (error) => {
+        console.error('Erro ao gerar etiquetas ZPL:', error);
+        res.destroy(error);
+      });
+      exportProcess.on('close', (code) => {
+        if (code !== 0) {
+          res.destroy(new Error(`Exportação terminou com código ${code}`));
+        }
+      });
+      req.on('close', () => exportProcess.kill());
+      return;
+    }
 
-    const output = fs.createWriteStream(zipPath);
-    const archive = archiver('zip', { zlib: { level: 9 } });
+    const zipPath = path.resolve(outputDir, zipFileName);
+    const result = await exportLabels(data, zipPath, options);
+    console.log(`📦 ZIP gerado: ${result.totalLabels} etiquetas em ${result.exportMs}ms`);
 
-    archive.pipe(output);
+    res.json({
+      message: 'Etiquetas ZPL geradas com sucesso',
+      downloadUrl: `/api/download/${zipFileName}`,
+      totalItems: result.totalItems,
+      totalLabels: result.totalLabels
+    });
 
-    let labelCounter = 1;
-    let totalLabelsGenerated = 0;
+  } catch (error) {
+    console.error('Erro ao gerar etiquetas ZPL:', error);
+    res.status(500).json({ error: 'Erro ao gerar etiquetas ZPL' });
+  }
+});
 
-    for (let i = 0; i < data.length; i++) {
-      const item = data[i];
-      const qty = parseInt(item.QTY) || 1;
-      
-      for (let copy = 1; copy <= qty; copy++) {
-        try {
-          const labelZPL = generateLabelZPL(item);
-          const fileName = `etiqueta-${labelCounter}-${item.VPM || 'sem-vpm'}-copia-${copy}.zpl`;
-          archive.append(Buffer.from(labelZPL, 'utf8'), { name: fileName });
-          labelCounter++;
-          totalLabelsGenerated++;
-        } catch (error) {
-          console.error(`Erro ao gerar etiqueta ${labelCounter}:`, error);
-          throw error;
-        }
-      }
+// Prova em PDF: um documento com uma página por unidade (PO inteiro)
+app.post('/api/generate-pdf', async (req, res) => {
+  try {
+    const { data } = req.body;
+
+    if (!data || !Array.isArray(data)) {
+      return res.status(400).json({ error: 'Dados inválidos' });
     }
 
-    await archive.finalize();
+    const outputDir = 'output';
+    if (!fs.existsSync(outputDir)) {
+      fs.mkdirSync(outputDir);
+    }
 
-    output.on('close', () => {
-      res.json({
-        message: 'Etiquetas ZPL geradas com sucesso',
-        downloadUrl: `/api/download/${zipFileName}`,
-        totalItems: data.length,
-        totalLabels: totalLabelsGenerated
-      });
+    const pdfFileName = `etiquetas-${Date.now()}.pdf`;
+    const result = await exportPDF(data, path.resolve(outputDir, pdfFileName));
+    console.log(`📄 PDF gerado: ${result.totalPages} páginas em ${result.renderMs}ms`);
+
+    res.json({
+      message: 'PDF das etiquetas gerado com sucesso',
+      downloadUrl: `/api/download/${pdfFileName}`,
+      totalItems: result.totalItems,
+      totalPages: result.totalPages
     });
 
   } catch (error) {
-    console.error('Erro ao gerar etiquetas ZPL:', error);
-    res.status(500).json({ error: 'Erro ao gerar etiquetas ZPL' });
+    console.error('Erro ao gerar PDF das etiquetas:', error);
+    res.status(500).json({ error: 'Erro ao gerar PDF das etiquetas' });
+  }
+});
+
+// Consulta ao ledger de impressões por EPC ou barcode
+app.get('/api/ledger', async (req, res) => {
+  try {
+    const { epc, barcode } = req.query;
+    if (!epc && !barcode) {
+      return res.status(400).json({ error: 'Informe epc ou barcode' });
+    }
+
+    const result = epc ? await lookupPrints('epc', epc) : await lookupPrints('barcode', barcode);
+    res.json({
+      records: result.records,
+      duplicate: result.duplicate,
+      lookupUs: result.lookupUs
+    });
+
+  } catch (error) {
+    console.error('Erro ao consultar ledger:', error);
+    res.status(500).json({ error: 'Erro ao consultar ledger de impressões' });
+  }
+});
+
+// Latência por etapa no formato texto do Prometheus
+app.get('/metrics', async (req, res) => {
+  try {
+    const result = await readMetrics('prometheus');
+    res.type('text/plain; version=0.0.4').send(result.text);
+  } catch (error) {
+    console.error('Erro ao exportar métricas:', error);
+    res.status(500).type('text/plain').send(`# erro: ${error.message}\n`);
+  }
+});
+
+// Latência por etapa (percentis por impressora e etapa que limita etiquetas/hora)
+app.get('/api/metrics', async (req, res) => {
+  try {
+    const result = await readMetrics('snapshot');
+    res.json({ stages: result.stages, bottleneck: result.bottleneck });
+  } catch (error) {
+    console.error('Erro ao ler métricas:', error);
+    res.status(500).json({ error: 'Erro ao ler métricas de latência' });
   }
 });
 
@@ -546,85 +907,6 @@ app.get('/api/download/:filename', (req, res) => {
   }
 });
 
-// FunÃ§Ã£o para gerar preview da etiqueta
-async function generateLabelPreview(item) {
-  try {
-    // Importar o processador ZPL local
-    const { processZPLToImage } = require("./zpl-processor");
-    const fs = require('fs');
-    const path = require('path');
-    
-    // Extrair dados do item
-    const styleName = String(item.STYLE_NAME || item.NAME || "N/A");
-    const vpm = String(item.VPM || item.SKU || "N/A");
-    const color = String(item.COLOR || "N/A");
-    const size = String(item.SIZE || "N/A");
-    const barcode = String(item.BARCODE || item.VPM || "N/A");
-    const ref = String(item.REF || "N/A");
-    const qty = String(item.QTY || "1");
-
-    // Gerar conteúdo dos QR codes conforme especificação
-    const qrLeft = `LA,ESQ-QR-CONTENT`;
-    const qrRightTop = `LA,DIR-QR-TOP`;
-    const qrRightBottom = `LA,DIR-QR-BOTTOM`;
-    const poLocal = `PO${ref}\\&Local.437`; // Formato: PO0656\&Local.437
-
-    // Ler o template ZPL do arquivo
-    const templatePath = path.join(__dirname, 'LAYOUT_LABEL.ZPL');
-    let zplTemplate;
-    
-    try {
-      zplTemplate = fs.readFileSync(templatePath, 'utf8');
-    } catch (fileError) {
-      console.error("Erro ao ler template ZPL:", fileError.message);
-      throw new Error("Template ZPL não encontrado");
-    }
-
-    // Extrair apenas a definição do formato (primeira seção ^XA...^XZ)
-    const templateMatch = zplTemplate.match(/\^XA[\s\S]*?\^XZ/);
-    if (!templateMatch) {
-      throw new Error("Template ZPL inválido");
-    }
-    
-    let baseTemplate = templateMatch[0];
-    
-    // Substituir os ^FN placeholders com os dados reais
-    baseTemplate = baseTemplate.replace(/\^FN1\^FS/g, `^FDSTYLE NAME: ${styleName}^FS`);
-    baseTemplate = baseTemplate.replace(/\^FN2\^FS/g, `^FDVPN: ${vpm}^FS`);
-    baseTemplate = baseTemplate.replace(/\^FN3\^FS/g, `^FDCOLOR: ${color}^FS`);
-    baseTemplate = baseTemplate.replace(/\^FN4\^FS/g, `^FD${size}^FS`);
-    baseTemplate = baseTemplate.replace(/\^FN5\^FS/g, `^FD${barcode}^FS`);
-    baseTemplate = baseTemplate.replace(/\^FN6\^FS/g, `^FD${poLocal}^FS`);
-    baseTemplate = baseTemplate.replace(/\^FN7\^FS/g, `^FD${qrLeft}^FS`);
-    baseTemplate = baseTemplate.replace(/\^FN8\^FS/g, `^FD${qrRightBottom}^FS`);
-    baseTemplate = baseTemplate.replace(/\^FN9\^FS/g, `^FD${qrRightTop}^FS`);
-
-    // O ZPL final é o template com os dados substituídos
-    const zplCode = baseTemplate;
-
-    console.log("ZPL gerado para preview usando template ^FN:", zplCode.substring(0, 200) + "...");
-
-    // Usar processador ZPL local
-    const base64Image = await processZPLToImage(zplCode);
-    
-    return {
-      id: item.VPM || item.SKU || Math.random().toString(36).substr(2, 9),
-      styleName: styleName,
-      vpm: vpm,
-      color: color,
-      size: size,
-      barcode: barcode,
-      ref: ref,
-      qty: item.QTY || 1,
-      preview: `data:image/png;base64,${base64Image}`
-    };
-
-  } catch (error) {
-    console.error("Erro ao gerar preview:", error.message);
-    throw error;
-  }
-}
-
 // FunÃ§Ã£o para gerar ZPL da etiqueta usando sistema de templates ^FN
 function generateLabelZPL(item) {
   // Gerar cÃ³digo ZPL inline (sem templates externos)
@@ -684,124 +966,6 @@ function generateLabelZPL(item) {
   return zplCode;
 }
 
-async function generateLabelPDF(item) {
-  const pdfDoc = await PDFDocument.create();
-  // Tamanho baseado na proporÃ§Ã£o da imagem (aproximadamente 4:1)
-  const page = pdfDoc.addPage([566, 142]); // 10cm x 2.5cm em pontos (72 DPI)
-  
-  const { width, height } = page.getSize();
-  
-  // Borda externa
-  page.drawRectangle({
-    x: 5,
-    y: 5,
-    width: width - 10,
-    height: height - 10,
-    borderColor: rgb(0, 0, 0),
-    borderWidth: 1
-  });
-  
-  // Ãrea principal da etiqueta
-  page.drawRectangle({
-    x: 10,
-    y: 10,
-    width: width - 120, // Deixa espaÃ§o para QR codes laterais
-    height: height - 20,
-    borderColor: rgb(0, 0, 0),
-    borderWidth: 1
-  });
-  
-  // QR Code removido - deixando espaÃ§o em branco conforme solicitado
-  
-  // InformaÃ§Ãµes do produto
-  page.drawText(`NAME: ${String(item.STYLE_NAME || 'N/A')}`, {
-    x: 65,
-    y: height - 25,
-    size: 10,
-    color: rgb(0, 0, 0)
-  });
-  
-  page.drawText(`SKU: ${String(item.VPM || 'N/A')}`, {
-    x: 65,
-    y: height - 40,
-    size: 10,
-    color: rgb(0, 0, 0)
-  });
-  
-  page.drawText(`COLOR: ${String(item.COLOR || 'N/A')}`, {
-    x: 65,
-    y: height - 55,
-    size: 10,
-    color: rgb(0, 0, 0)
-  });
-  
-  page.drawText(`SIZE: ${String(item.SIZE || 'N/A')}`, {
-    x: 65,
-    y: height - 70,
-    size: 10,
-    color: rgb(0, 0, 0)
-  });
-  
-  // CÃ³digo de barras
-  const barcodeWidth = 200;
-  const barcodeHeight = 25;
-  const barcodeX = 65;
-  const barcodeY = 25;
-  
-  // Simular cÃ³digo de barras CODE128 usando BARCODE
-  for (let i = 0; i < 50; i++) {
-    const barWidth = Math.random() > 0.5 ? 2 : 1;
-    const x = barcodeX + (i * 4);
-    if (x < barcodeX + barcodeWidth) {
-      page.drawRectangle({
-        x: x,
-        y: barcodeY,
-        width: barWidth,
-        height: barcodeHeight,
-        color: rgb(0, 0, 0)
-      });
-    }
-  }
-  
-  // Texto do cÃ³digo de barras usando BARCODE
-  page.drawText(String(item.BARCODE || item.VPM || 'N/A'), {
-    x: barcodeX + 50,
-    y: barcodeY - 15,
-    size: 8,
-    color: rgb(0, 0, 0)
-  });
-  
-  // QR Code grande removido - deixando espaÃ§o em branco conforme solicitado
-  
-  // CÃ³digo REF no canto inferior direito
-  page.drawRectangle({
-    x: width - 105,
-    y: 15,
-    width: 90,
-    height: 35,
-    borderColor: rgb(0, 0, 0),
-    borderWidth: 1
-  });
-  
-  page.drawText('REF:', {
-    x: width - 95,
-    y: 40,
-    size: 10,
-    color: rgb(0, 0, 0)
-  });
-  
-  page.drawText(String(item.REF || 'N/A'), {
-    x: width - 95,
-    y: 25,
-    size: 8,
-    color: rgb(0, 0, 0)
-  });
-  
-  // QR Code pequeno removido - deixando espaÃ§o em branco conforme solicitado
-  
-  return await pdfDoc.save();
-}
-
 // Importar módulo de teste de impressora RFID
 const RFIDPrinterTest = require('./rfid-printer-test');
 
@@ -832,6 +996,30 @@ const pythonZebraIntegration = new PythonZebraIntegration();
 // Instância global da integração Python USB
 const pythonUSBIntegration = new PythonUSBIntegration();
 
+// Fila de impressão com prioridades (urgent > interactive > bulk) na impressora USB
+const printQueue = new PrintQueue({
+  send: (zpl) => pythonUSBIntegration.sendZPL(zpl, 'ascii', 1),
+  queueDepth: () => pythonUSBIntegration.queueDepth(),
+  purge: (jobIds) => pythonUSBIntegration.purgeJobs(jobIds),
+  // Ledger no ritmo da impressão: cada envio e cada desfecho vira um registro
+  onLabel: (record) => {
+    if (!record.barcode) return;
+    appendPrint({
+      printer: pythonUSBIntegration.printerName,
+      po: record.po,
+      sequence: record.sequence,
+      barcode: record.barcode,
+      epc: record.rfid,
+      status: record.ack
+    });
+  },
+  // Sem canal TCP o ~JA vai pelo spooler e o buffer não pode ser contado
+  cancelPrinter: (job) => job.printer
+    ? cancelPrinterFormats(job.printer)
+    : pythonUSBIntegration.sendZPL('~JA', 'ascii', 1).then(() => null),
+  printerName: pythonUSBIntegration.printerName
+});
+
 // Instância global da integração MUPA RFID
 const mupaRFIDIntegration = new MupaRFIDIntegration();
 
@@ -2829,9 +3017,9 @@ const CSVLabelProcessor = require('./csv-label-processor');
 const csvLabelProcessor = new CSVLabelProcessor();
 
 // Listar etiquetas do CSV
-app.get('/api/csv/labels', (req, res) => {
+app.get('/api/csv/labels', async (req, res) => {
   try {
-    const info = csvLabelProcessor.getInfo();
+    const info = await csvLabelProcessor.getInfo();
     
     res.json({
       success: true,
@@ -2908,9 +3096,9 @@ app.post('/api/csv/print-all', async (req, res) => {
 });
 
 // Obter informações do processador CSV
-app.get('/api/csv/info', (req, res) => {
+app.get('/api/csv/info', async (req, res) => {
   try {
-    const info = csvLabelProcessor.getInfo();
+    const info = await csvLabelProcessor.getInfo();
     
     res.json({
       success: true,
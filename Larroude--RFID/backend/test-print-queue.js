@@ -0,0 +1,120 @@
+#!/usr/bin/env node
+
+/**
+ * Testes da fila de impressão (sem impressora): node test-print-queue.js
+ * O envio é simulado; cada caso controla quando a etiqueta "sai".
+ */
+
+const assert = require('assert');
+const { PrintQueue } = require('./print-queue');
+
+function render(unit) {
+  return { zpl: `^XA^FD${unit.seq}^FS^XZ`, label: { item: unit.item.VPM, sequence: unit.seq } };
+}
+
+function units(count) {
+  return Array.from({ length: count }, (_, index) => ({ item: { VPM: 'L001-TESTE' }, seq: index + 1 }));
+}
+
+/**
+ * Envio que só termina quando o teste chama release()
+ */
+function gatedSend() {
+  const gate = { sent: 0, waiting: null };
+  gate.send = () => new Promise((resolve) => {
+    gate.sent++;
+    gate.waiting = () => resolve({ success: true, result: { job_id: gate.sent } });
+  });
+  gate.release = () => {
+    const waiting = gate.waiting;
+    gate.waiting = null;
+    waiting();
+  };
+  return gate;
+}
+
+function tick() {
+  return new Promise(resolve => setImmediate(resolve));
+}
+
+function withTimeout(promise, ms = 2000) {
+  let timer;
+  return Promise.race([
+    promise.finally(() => clearTimeout(timer)),
+    new Promise((_, reject) => {
+      timer = setTimeout(() => reject(new Error(`sem resposta em ${ms} ms`)), ms);
+    })
+  ]);
+}
+
+const cases = {
+  async 'envia todas as unidades e termina'() {
+    const queue = new PrintQueue({ send: async () => ({ success: true, result: {} }) });
+    const job = queue.submit({ priority: 'bulk', units: units(3), render });
+    await withTimeout(job.done);
+    assert.strictEqual(job.state, 'done');
+    assert.strictEqual(job.results.length, 3);
+  },
+
+  async 'pausa com a última etiqueta em envio termina o job'() {
+    const gate = gatedSend();
+    const queue = new PrintQueue({ send: gate.send });
+    const job = queue.submit({ priority: 'bulk', units: units(2), render });
+    await tick();
+    gate.release();
+    await tick();
+    assert.strictEqual(gate.sent, 2);
+
+    queue.pause(job.id);
+    gate.release();
+    await withTimeout(job.done);
+    assert.strictEqual(job.state, 'done');
+    assert.strictEqual(job.remaining, 0);
+    assert.strictEqual(job.results.length, 2);
+    assert.throws(() => queue.resume(job.id), /só um job pausado/);
+  },
+
+  async 'retomada com a última etiqueta em envio não passa do fim'() {
+    const gate = gatedSend();
+    const queue = new PrintQueue({ send: gate.send });
+    const job = queue.submit({ priority: 'bulk', units: units(1), render });
+    await tick();
+    queue.pause(job.id);
+    queue.resume(job.id);
+    await tick();
+    assert.strictEqual(gate.sent, 1);
+    gate.release();
+    await withTimeout(job.done);
+    assert.strictEqual(job.state, 'done');
+    assert.strictEqual(job.results.length, 1);
+    assert.strictEqual(job.remaining, 0);
+  },
+
+  async 'pausa antes de entrar na fila vale na retomada'() {
+    const queue = new PrintQueue({ send: async () => ({ success: true, result: {} }) });
+    const job = queue.create({ priority: 'bulk', units: units(2), render });
+    queue.pause(job.id);
+    queue.start(job);
+    assert.strictEqual(job.state, 'paused');
+    queue.resume(job.id);
+    await withTimeout(job.done);
+    assert.strictEqual(job.state, 'done');
+    assert.strictEqual(job.results.length, 2);
+  }
+};
+
+async function main() {
+  let failed = 0;
+  for (const [name, run] of Object.entries(cases)) {
+    try {
+      await run();
+      console.log(`✅ ${name}`);
+    } catch (error) {
+      failed++;
+      console.log(`❌ ${name}: ${error.message}`);
+    }
+  }
+  process.exit(failed ? 1 : 0);
+}
+
+main();
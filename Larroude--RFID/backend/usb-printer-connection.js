@@ -1,5 +1,6 @@
 const { SerialPort } = require('serialport');
 const { ReadlineParser } = require('@serialport/parser-readline');
+const { probeSerialBaud } = require('./zpl-processor');
 
 class USBPrinterConnection {
     constructor() {
@@ -56,7 +57,7 @@ class USBPrinterConnection {
     async connect(portPath, options = {}) {
         try {
             const defaultOptions = {
-                baudRate: 9600,
+                baudRate: options.baudRate || await probeSerialBaud(portPath).catch(() => 9600),
                 dataBits: 8,
                 stopBits: 1,
                 parity: 'none',
@@ -0,0 +1,47 @@
+/**
+ * Parser do VPM (ex.: L458-JASM-11.0-SILV-1885), espelho do vpm_parser.py
+ * Cada VPM distinto é interpretado uma única vez e o registro congelado é
+ * reutilizado por todas as unidades do lote.
+ */
+
+const VPM_PARTS = 5; // PO-ESTILO-TAMANHO-COR-LOCAL
+const VPM_CACHE_LIMIT = 65536;
+const vpmCache = new Map();
+
+/**
+ * Interpreta o VPM (memoizado)
+ * @param {string} vpm - VPM/SKU completo
+ * @returns {object} - { raw, po, styleCode, size, colorCode, local, localNumber, compact, partsCount }
+ */
+function parseVPM(vpm) {
+  const raw = String(vpm || '');
+  let record = vpmCache.get(raw);
+  if (record) {
+    return record;
+  }
+
+  const parts = raw.split('-');
+  const local = parts[4] || '';
+  record = Object.freeze({
+    raw,
+    po: parts[0].replace('L', ''), // L264 -> 264
+    styleCode: parts[1] || '',
+    size: parts[2] || '',
+    colorCode: parts[3] || '',
+    local,
+    localNumber: local ? local.substring(0, 3) : '000',
+    compact: raw.replace(/-/g, ''), // fallback do barcode
+    partsCount: parts.length,
+    isComplete: parts.length >= VPM_PARTS
+  });
+
+  if (vpmCache.size >= VPM_CACHE_LIMIT) {
+    vpmCache.delete(vpmCache.keys().next().value);
+  }
+  vpmCache.set(raw, record);
+  return record;
+}
+
+module.exports = {
+  parseVPM
+};
@@ -2,6 +2,7 @@ const { SerialPort } = require('serialport');
 const { exec } = require('child_process');
 const fs = require('fs');
 const path = require('path');
+const { probeSerialBaud } = require('./zpl-processor');
 
 class ZebraUSBConnection {
     constructor() {
@@ -142,7 +143,7 @@ class ZebraUSBConnection {
      */
     async connectSerial(portPath, options = {}) {
         const defaultOptions = {
-            baudRate: 9600,
+            baudRate: options.baudRate || await probeSerialBaud(portPath).catch(() => 9600),
             dataBits: 8,
             stopBits: 1,
             parity: 'none',
@@ -230,17 +231,14 @@ class ZebraUSBConnection {
     async tryAlternativeConnections() {
         console.log('🔄 Tentando conexões alternativas...');
         
-        // Tentar diferentes baud rates
-        const baudRates = [9600, 19200, 38400, 57600, 115200];
-        
-        for (const baudRate of baudRates) {
-            try {
-                console.log(`📡 Tentando baud rate: ${baudRate}`);
-                await this.connectSerial('COM1', { baudRate });
-                return true;
-            } catch (error) {
-                console.log(`❌ Baud rate ${baudRate} falhou: ${error.message}`);
-            }
+        // A velocidade vem da própria impressora (comm.baud), sem tentar uma a uma
+        try {
+            const baudRate = await probeSerialBaud('COM1');
+            console.log(`📡 COM1 responde a ${baudRate} baud`);
+            await this.connectSerial('COM1', { baudRate });
+            return true;
+        } catch (error) {
+            console.log(`❌ COM1 falhou: ${error.message}`);
         }
         
         throw new Error('Nenhuma conexão alternativa funcionou');
@@ -1,133 +1,358 @@
-const sharp = require('sharp');
+const { spawn } = require('child_process');
+const path = require('path');
+
+const PYTHON_DIR = path.join(__dirname, '..');
+const LEDGER_GROUP = parseInt(process.env.PRINT_LEDGER_GROUP) || 256;
+const LEDGER_GROUP_MS = (parseFloat(process.env.PRINT_LEDGER_GROUP_SECONDS) || 0.05) * 1000;
+// O Node escreve UTF-8 no stdin; sem isso o Python lê o pipe na code page do
+// Windows (cp1252) e "SANDÁLIA" chega quebrado nos scripts
+const PYTHON_ENV = { ...process.env, PYTHONIOENCODING: 'utf-8' };
+
+/**
+ * Executa um módulo Python passando JSON/texto via stdin e retorna o JSON de saída
+ * @param {string} scriptName - Script Python (na raiz do projeto)
+ * @param {string[]} args - Argumentos de linha de comando
+ * @param {string} input - Conteúdo enviado ao stdin
+ * @returns {Promise<object>} - Resultado JSON do script
+ */
+function runPythonJSON(scriptName, args, input) {
+  return new Promise((resolve, reject) => {
+    const scriptPath = path.join(PYTHON_DIR, scriptName);
+    const pythonProcess = spawn('python', [scriptPath, ...args], {
+      cwd: PYTHON_DIR,
+      env: PYTHON_ENV,
+      stdio: ['pipe', 'pipe', 'pipe']
+    });
+
+    const stdout = [];
+    let stderr = '';
+
+    pythonProcess.stdout.on('data', (data) => stdout.push(data));
+    pythonProcess.stderr.on('data', (data) => {
+      stderr += data.toString();
+    });
+
+    pythonProcess.on('error', (error) => reject(error));
+
+    pythonProcess.on('close', (code) => {
+      if (stderr) {
+        console.warn('⚠️ Aviso Python:', stderr);
+      }
+
+      try {
+        const result = JSON.parse(Buffer.concat(stdout).toString('utf8').trim());
+        if (!result.success) {
+          const error = new Error(result.error || `Python terminou com código ${code}`);
+          if (result.errorStatus) {
+            // Falha de entrada reconhecida pelo script (ex.: 400, 404)
+            error.status = result.errorStatus;
+          }
+          reject(error);
+          return;
+        }
+        resolve(result);
+      } catch (parseError) {
+        reject(new Error('Resposta inválida do Python'));
+      }
+    });
+
+    pythonProcess.stdin.end(input, 'utf8');
+  });
+}
 
 /**
- * Processa código ZPL e converte para imagem PNG usando Sharp
+ * Renderiza código ZPL em PNG usando o rasterizador Python nativo
  * @param {string} zplCode - Código ZPL para processar
  * @returns {Promise<string>} - Base64 da imagem PNG gerada
  */
 async function processZPLToImage(zplCode) {
-  try {
-    console.log('Processando ZPL usando template definido pelo usuário...');
-    
-    // Extrair dados do ZPL (já processado com ^FD)
-    const styleName = extractZPLField(zplCode, 1) || 'N/A';
-    const vpn = extractZPLField(zplCode, 2) || 'N/A';
-    const color = extractZPLField(zplCode, 3) || 'N/A';
-    const size = extractZPLField(zplCode, 4) || 'N/A';
-    const barcode = extractZPLField(zplCode, 5) || 'N/A';
-    const poLocal = extractZPLField(zplCode, 6) || 'N/A';
-    
-    // Criar SVG baseado no layout ZPL definido pelo usuário
-    const svg = createLabelSVG({
-      styleName,
-      vpn,
-      color,
-      size,
-      barcode,
-      poLocal
+  const result = await runPythonJSON('zpl_rasterizer.py', ['render', '-'], zplCode);
+  return result.png_base64;
+}
+
+/**
+ * Gera os previews de todas as unidades em uma única chamada Python
+ * @param {object[]} data - Itens vindos do upload (com QTY)
+ * @returns {Promise<object>} - { faces, previews, distinctFaces, totalItems, totalLabels, previewCount }
+ */
+async function generatePreviews(data) {
+  return runPythonJSON('label_preview.py', ['generate'], JSON.stringify({ data }));
+}
+
+/**
+ * Valida o lote inteiro antes da impressão (pre-flight)
+ * @param {object[]} data - Itens a imprimir (com QTY)
+ * @returns {Promise<object>} - Relatório { valid, errorCount, errorsByRule, errors, ... }
+ */
+async function validateBatch(data) {
+  return runPythonJSON('label_validator.py', ['validate'], JSON.stringify({ data }));
+}
+
+/**
+ * Lê um upload de etiquetas no Python: XLSX em streaming (Sheet1 não é aberta)
+ * ou CSV (aspas RFC 4180, BOM e UTF-8/Windows-1252)
+ * @param {string} filePath - Caminho absoluto do arquivo enviado
+ * @param {string} format - 'xlsx' ou 'csv'
+ * @param {string} [session] - Sessão de upload; com ela o resultado traz o diff
+ *   contra o upload anterior (linhas novas/alteradas/removidas)
+ * @returns {Promise<object>} - { data, totalRecords, sheets, diff, ingestMs }
+ */
+async function readUploadFile(filePath, format, session) {
+  const args = session ? [format, filePath, '--session', session] : [format, filePath];
+  return runPythonJSON('upload_ingest.py', args, '');
+}
+
+/**
+ * Aquece o cache de previews em segundo plano (não bloqueia a resposta): PNG
+ * completo e miniatura da primeira página, como o preview paginado vai pedir
+ * @param {object[]} data - Itens vindos do upload (com QTY)
+ */
+function warmPreviewCache(data) {
+  const scriptPath = path.join(PYTHON_DIR, 'label_preview.py');
+  const pythonProcess = spawn('python', [scriptPath, 'warm'], {
+    cwd: PYTHON_DIR,
+    env: PYTHON_ENV,
+    stdio: ['pipe', 'ignore', 'ignore'],
+    detached: true,
+    windowsHide: true
+  });
+
+  pythonProcess.on('error', (error) => {
+    console.warn('⚠️ Falha ao aquecer cache de previews:', error.message);
+  });
+  pythonProcess.stdin.on('error', () => {});
+  pythonProcess.stdin.end(JSON.stringify({ data }), 'utf8');
+  pythonProcess.unref();
+}
+
+/**
+ * Argumentos de exportação a partir das opções da API
+ * @param {object} options - { compression: 'stored' | 0-9, mode: 'label' | 'po' | 'single' }
+ */
+function exportArgs(options = {}) {
+  const args = [];
+  if (options.compression !== undefined && options.compression !== null) {
+    args.push('--level', String(options.compression));
+  }
+  if (options.mode) {
+    args.push('--mode', String(options.mode));
+  }
+  return args;
+}
+
+/**
+ * Gera o ZIP das etiquetas ZPL no Python (escrito em streaming no disco)
+ * @param {object[]} data - Itens a exportar (com QTY)
+ * @param {string} zipPath - Caminho absoluto do ZIP de saída
+ * @param {object} [options] - { compression, mode } (ver label_export.py)
+ * @returns {Promise<object>} - { zipPath, totalItems, totalLabels, entries, bytes, exportMs }
+ */
+async function exportLabels(data, zipPath, options) {
+  return runPythonJSON('label_export.py', ['zip', zipPath, ...exportArgs(options)],
+    JSON.stringify({ data }));
+}
+
+/**
+ * Exporta o ZIP das etiquetas direto no stdout do processo Python, para ser
+ * repassado à resposta HTTP enquanto é gerado
+ * @param {object[]} data - Itens a exportar (com QTY)
+ * @param {object} [options] - { compression, mode }
+ * @returns {ChildProcess} - Processo com o ZIP em stdout
+ */
+function streamLabelExport(data, options) {
+  const scriptPath = path.join(PYTHON_DIR, 'label_export.py');
+  const pythonProcess = spawn('python', [scriptPath, 'zip', '-', ...exportArgs(options)], {
+    cwd: PYTHON_DIR,
+    env: PYTHON_ENV,
+    stdio: ['pipe', 'pipe', 'pipe'],
+    windowsHide: true
+  });
+
+  pythonProcess.stderr.on('data', (chunk) => {
+    console.warn('⚠️ Aviso Python:', chunk.toString());
+  });
+  pythonProcess.stdin.on('error', () => {});
+  pythonProcess.stdin.end(JSON.stringify({ data }), 'utf8');
+  return pythonProcess;
+}
+
+/**
+ * Gera a prova em PDF (uma página por unidade) no Python, gravada em streaming
+ * @param {object[]} data - Itens (com QTY)
+ * @param {string} pdfPath - Caminho absoluto do PDF de saída
+ * @returns {Promise<object>} - { pdfPath, totalItems, totalPages, bytes, renderMs }
+ */
+async function exportPDF(data, pdfPath) {
+  return runPythonJSON('label_pdf.py', ['generate', pdfPath], JSON.stringify({ data }));
+}
+
+/**
+ * Reimprime as unidades start..end lendo o tag antes de cada etiqueta:
+ * EPC já correto -> só a face; senão etiqueta completa (rfid_reprint.py)
+ */
+async function reprintRange(data, options = {}) {
+  const printer = options.printer || process.env.PRINTER_ADDRESS || '';
+  const start = parseInt(options.start) || 1;
+  const end = parseInt(options.end) || start;
+  return runPythonJSON('rfid_reprint.py', [printer, String(start), String(end)], JSON.stringify({ data }));
+}
+
+// O ledger aceita um gravador por vez: as chamadas são encadeadas
+let ledgerQueue = Promise.resolve();
+
+function withLedger(task) {
+  const run = ledgerQueue.then(task, task);
+  ledgerQueue = run.catch(() => {});
+  return run;
+}
+
+/**
+ * Registra no ledger as etiquetas enviadas (um group commit por chamada)
+ * records: [{ printer, po, sequence, barcode, epc, status }]
+ */
+async function recordPrints(records) {
+  if (!records || records.length === 0) {
+    return { appended: 0 };
+  }
+  return withLedger(() => runPythonJSON('print_ledger.py', ['append'], JSON.stringify({ records })));
+}
+
+// Registros por etiqueta aguardando o próximo group commit
+let pendingPrints = [];
+let pendingFlush = null;
+let flushTimer = null;
+
+/**
+ * Grava no ledger os registros acumulados: a gravação entra na fila do ledger
+ * e leva tudo o que tiver chegado até começar (um group commit)
+ */
+function flushPrints() {
+  clearTimeout(flushTimer);
+  flushTimer = null;
+  if (!pendingFlush) {
+    pendingFlush = withLedger(() => {
+      pendingFlush = null;
+      const records = pendingPrints;
+      pendingPrints = [];
+      if (records.length === 0) {
+        return { appended: 0 };
+      }
+      return runPythonJSON('print_ledger.py', ['append'], JSON.stringify({ records }));
     });
-    
-    // Converter SVG para PNG usando Sharp
-    const pngBuffer = await sharp(Buffer.from(svg))
-      .png()
-      .resize(812, 406)
-      .toBuffer();
-    
-    const base64Image = pngBuffer.toString('base64');
-    console.log('ZPL processado com sucesso usando template definido');
-    
-    return base64Image;
-    
-  } catch (error) {
-    console.log('Erro ao processar ZPL:', error.message);
-    throw error;
   }
+  return pendingFlush;
 }
 
 /**
- * Extrai campo do ZPL baseado no ^FD (dados já processados)
- */
-function extractZPLField(zplCode, fieldNumber) {
-  // Mapear os campos baseado na ordem esperada
-  const fieldPatterns = {
-    1: /\^FDSTYLE NAME:\s*([^\^]+)\^FS/i,
-    2: /\^FDVPN:\s*([^\^]+)\^FS/i,
-    3: /\^FDCOLOR:\s*([^\^]+)\^FS/i,
-    4: /\^FD([^\^]+)\^FS.*SIZE/i, // Campo SIZE (sem prefixo)
-    5: /\^FD(\d+)\^FS.*BC/i, // Barcode (números)
-    6: /\^FD(PO[^\^]+)\^FS/i // PO/Local
-  };
-  
-  const pattern = fieldPatterns[fieldNumber];
-  if (!pattern) return null;
-  
-  const match = zplCode.match(pattern);
-  return match ? match[1].trim() : null;
-}
-
-/**
- * Cria SVG baseado no layout ZPL definido pelo usuário
- */
-function createLabelSVG(data) {
-  // Escapar caracteres especiais XML
-  const escapeXML = (str) => {
-    return str.replace(/&/g, '&amp;')
-              .replace(/</g, '&lt;')
-              .replace(/>/g, '&gt;')
-              .replace(/"/g, '&quot;')
-              .replace(/'/g, '&#39;');
-  };
-
-  return `<svg width="812" height="406" xmlns="http://www.w3.org/2000/svg">
-    <!-- Fundo branco -->
-    <rect width="812" height="406" fill="white"/>
-    
-    <!-- Moldura externa arredondada -->
-    <rect x="12" y="12" width="788" height="382" fill="none" stroke="black" stroke-width="2" rx="24"/>
-    
-    <!-- Moldura interna -->
-    <rect x="36" y="48" width="580" height="290" fill="none" stroke="black" stroke-width="2" rx="14"/>
-    
-    <!-- Ícone do produto (canto superior esquerdo) -->
-    <rect x="60" y="86" width="80" height="80" fill="none" stroke="black" stroke-width="2" rx="8"/>
-    <text x="100" y="135" text-anchor="middle" font-family="Arial" font-size="32" fill="black">👟</text>
-    
-    <!-- Divisor vertical entre ícone e textos -->
-    <line x1="170" y1="66" x2="170" y2="306" stroke="black" stroke-width="2"/>
-    
-    <!-- Informações principais -->
-    <text x="190" y="100" font-family="Arial" font-size="18" font-weight="bold" fill="black">${escapeXML(data.styleName)}</text>
-    <text x="190" y="130" font-family="Arial" font-size="16" fill="black">VPN: ${escapeXML(data.vpn)}</text>
-    <text x="190" y="160" font-family="Arial" font-size="16" fill="black">COLOR: ${escapeXML(data.color)}</text>
-    
-    <!-- SIZE em destaque -->
-    <text x="190" y="190" font-family="Arial" font-size="16" fill="black">SIZE:</text>
-    <text x="260" y="190" font-family="Arial" font-size="20" font-weight="bold" fill="black">${escapeXML(data.size)}</text>
-    
-    <!-- Código de barras -->
-    <rect x="190" y="220" width="300" height="40" fill="white" stroke="black" stroke-width="1"/>
-    <text x="340" y="245" text-anchor="middle" font-family="monospace" font-size="12" fill="black">${escapeXML(data.barcode)}</text>
-    
-    <!-- QR Code esquerdo -->
-    <rect x="60" y="235" width="80" height="80" fill="white" stroke="black" stroke-width="2"/>
-    <text x="100" y="280" text-anchor="middle" font-family="Arial" font-size="12" fill="black">QR</text>
-    
-    <!-- Coluna direita: QR TOP -->
-    <rect x="654" y="60" width="80" height="80" fill="white" stroke="black" stroke-width="2"/>
-    <text x="694" y="105" text-anchor="middle" font-family="Arial" font-size="12" fill="black">QR</text>
-    
-    <!-- Cápsula PO/Local -->
-    <rect x="642" y="184" width="150" height="66" fill="none" stroke="black" stroke-width="2" rx="16"/>
-    <text x="717" y="210" text-anchor="middle" font-family="Arial" font-size="14" font-weight="bold" fill="black">PO/Local</text>
-    <text x="717" y="230" text-anchor="middle" font-family="Arial" font-size="12" fill="black">${escapeXML(data.poLocal)}</text>
-    
-    <!-- QR BOTTOM -->
-    <rect x="654" y="285" width="80" height="80" fill="white" stroke="black" stroke-width="2"/>
-    <text x="694" y="330" text-anchor="middle" font-family="Arial" font-size="12" fill="black">QR</text>
-    
-  </svg>`;
+ * Acrescenta uma etiqueta ao ledger no ritmo da impressão: o registro é
+ * gravado quando o lote chega a PRINT_LEDGER_GROUP registros ou após
+ * PRINT_LEDGER_GROUP_SECONDS. Desfechos (printed, cancelled, purged,
+ * unconfirmed) entram como novo registro da mesma etiqueta
+ */
+function appendPrint(record) {
+  pendingPrints.push(record);
+  if (pendingPrints.length >= LEDGER_GROUP) {
+    flushPrints().catch((error) => {
+      console.warn('⚠️ Falha ao registrar impressões no ledger:', error.message);
+    });
+  } else if (!flushTimer) {
+    flushTimer = setTimeout(() => {
+      flushPrints().catch((error) => {
+        console.warn('⚠️ Falha ao registrar impressões no ledger:', error.message);
+      });
+    }, LEDGER_GROUP_MS);
+  }
+}
+
+/**
+ * Registros do ledger por EPC ou barcode (mais de um = duplicidade)
+ */
+async function lookupPrints(field, value) {
+  return withLedger(() => runPythonJSON('print_ledger.py', ['lookup', field, String(value)]));
+}
+
+/**
+ * Página da pesquisa nas linhas do upload (índice montado na ingestão)
+ * query: { q, filters: { CAMPO: valor }, cursor, limit }
+ * @returns {Promise<object>} - { items, total, totalRows, cursor, nextCursor, searchMs }
+ */
+async function searchLabels(searchId, query) {
+  return runPythonJSON('label_search.py', ['query', String(searchId)], JSON.stringify(query));
+}
+
+/**
+ * Registra medições de etapas feitas no Node (ex.: queue_wait, spool)
+ * spans: [{ stage, printer, ms }]
+ */
+async function recordSpans(spans) {
+  if (!spans || spans.length === 0) {
+    return { recorded: 0 };
+  }
+  return runPythonJSON('print_metrics.py', ['record'], JSON.stringify({ spans }));
+}
+
+/**
+ * Latência por etapa: resumo JSON (percentis, etapa limitante) ou texto Prometheus
+ * @param {'snapshot'|'prometheus'} format
+ */
+async function readMetrics(format = 'snapshot') {
+  return runPythonJSON('print_metrics.py', [format]);
+}
+
+/**
+ * Descarta o buffer da impressora (~PP, ~HS, ~JA, ~PS pelo canal TCP/serial)
+ * @returns {Promise<{formatsCancelled: number, paused: boolean}>}
+ */
+async function cancelPrinterFormats(printer) {
+  return runPythonJSON('printer_link.py', ['cancel', printer]);
+}
+
+/**
+ * Velocidade configurada na impressora serial (comm.baud), descoberta uma vez
+ * e guardada por porta pelo printer_link.py
+ * @returns {Promise<number>} - baud
+ */
+async function probeSerialBaud(portPath) {
+  const result = await runPythonJSON('printer_link.py', ['probe', `serial://${portPath}`]);
+  return result.baud;
+}
+
+/**
+ * Conciliação de lote: lê os contadores da impressora antes de imprimir
+ */
+async function reconcileBegin(printer, batchId) {
+  return runPythonJSON('print_reconcile.py', ['begin', printer, batchId]);
+}
+
+/**
+ * Fim do lote: registra os envios, relê os contadores e compara
+ * sends: [{ barcode, epc, encode, status }]
+ */
+async function reconcileEnd(printer, batchId, sends) {
+  const result = await runPythonJSON('print_reconcile.py', ['end', printer, batchId], JSON.stringify({ sends }));
+  return result.report;
 }
 
 module.exports = {
-  processZPLToImage
+  runPythonJSON,
+  processZPLToImage,
+  generatePreviews,
+  validateBatch,
+  warmPreviewCache,
+  readUploadFile,
+  exportLabels,
+  streamLabelExport,
+  exportPDF,
+  reprintRange,
+  recordPrints,
+  appendPrint,
+  flushPrints,
+  lookupPrints,
+  searchLabels,
+  probeSerialBaud,
+  cancelPrinterFormats,
+  recordSpans,
+  readMetrics,
+  reconcileBegin,
+  reconcileEnd
 };
@@ -0,0 +1,566 @@
+#!/usr/bin/env python3
+"""
+Codificadores de código de barras usados nas etiquetas Larroudé
+Code128 (^BC), EAN-13 (^BE) e QR Code (^BQ) em Python puro, com cache
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+# Tabela Code128: larguras barra/espaço de cada símbolo (0-106)
+CODE128_PATTERNS = (
+    "212222", "222122", "222221", "121223", "121322", "131222", "122213", "122312",
+    "132212", "221213", "221312", "231212", "112232", "122132", "122231", "113222",
+    "123122", "123221", "223211", "221132", "221231", "213212", "223112", "312131",
+    "311222", "321122", "321221", "312212", "322112", "322211", "212123", "212321",
+    "232121", "111323", "131123", "131321", "112313", "132113", "132311", "211313",
+    "231113", "231311", "112133", "112331", "132131", "113123", "113321", "133121",
+    "313121", "211331", "231131", "213113", "213311", "213131", "311123", "311321",
+    "331121", "312113", "312311", "332111", "314111", "221411", "431111", "111224",
+    "111422", "121124", "121421", "141122", "141221", "112214", "112412", "122114",
+    "122411", "142112", "142211", "241211", "221114", "413111", "241112", "134111",
+    "111242", "121142", "121241", "114212", "124112", "124211", "411212", "421112",
+    "421211", "212141", "214121", "412121", "111143", "111341", "131141", "114113",
+    "114311", "411113", "411311", "113141", "114131", "311141", "411131", "211412",
+    "211214", "211232", "2331112",
+)
+
+CODE128_START = {'A': 103, 'B': 104, 'C': 105}
+CODE128_SWITCH = {'A': 101, 'B': 100, 'C': 99}
+CODE128_FNC1 = 102
+CODE128_STOP = 106
+
+# Códigos de invocação ZPL dentro do ^FD de um ^BC
+ZPL_CODE128_INVOCATIONS = {
+    '9': ('start', 'A'), ':': ('start', 'B'), ';': ('start', 'C'),
+    '7': ('switch', 'A'), '6': ('switch', 'B'), '5': ('switch', 'C'),
+    '8': ('fnc1', None),
+}
+
+EAN_L = ("0001101", "0011001", "0010011", "0111101", "0100011",
+         "0110001", "0101111", "0111011", "0110111", "0001011")
+EAN_G = ("0100111", "0110011", "0011011", "0100001", "0011101",
+         "0111001", "0000101", "0010001", "0001001", "0010111")
+EAN_R = ("1110010", "1100110", "1101100", "1000010", "1011100",
+         "1001110", "1010000", "1000100", "1001000", "1110100")
+EAN_PARITY = ("LLLLLL", "LLGLGG", "LLGGLG", "LLGGGL", "LGLLGG",
+              "LGGLLG", "LGGGLL", "LGLGLG", "LGLGGL", "LGGLGL")
+
+
+def _widths_to_modules(widths):
+    """Converte larguras alternadas barra/espaço em string de módulos '1'/'0'"""
+    modules = []
+    for index, width in enumerate(widths):
+        modules.append(('1' if index % 2 == 0 else '0') * int(width))
+    return ''.join(modules)
+
+
+def _code128_value(char, code_set):
+    """Valor Code128 de um caractere no subconjunto A ou B"""
+    code = ord(char)
+    if code_set == 'A':
+        if 32 <= code <= 95:
+            return code - 32
+        if 0 <= code < 32:
+            return code + 64
+    elif 32 <= code <= 127:
+        return code - 32
+    raise ValueError(f"Caractere inválido para Code128 {code_set}: {char!r}")
+
+
+def _parse_zpl_code128(data):
+    """Separa o ^FD em tokens (texto ou invocações >X do ZPL)"""
+    tokens = []
+    index = 0
+    while index < len(data):
+        char = data[index]
+        if char == '>' and index + 1 < len(data):
+            nxt = data[index + 1]
+            if nxt in ZPL_CODE128_INVOCATIONS:
+                tokens.append(ZPL_CODE128_INVOCATIONS[nxt])
+                index += 2
+                continue
+            if nxt == '<':
+                tokens.append(('char', '<'))
+                index += 2
+                continue
+            if nxt == '0':
+                tokens.append(('char', '>'))
+                index += 2
+                continue
+        tokens.append(('char', char))
+        index += 1
+    return tokens
+
+
+@lru_cache(maxsize=4096)
+def encode_code128(data):
+    """
+    Codifica dados Code128 no estilo ZPL (^BC modo N)
+    Aceita as invocações >9 >: >; (start) e >7 >6 >5 (troca de subconjunto).
+    Retorna (módulos, texto legível)
+    """
+    tokens = _parse_zpl_code128(data)
+
+    code_set = 'B'
+    values = []
+    if tokens and tokens[0][0] == 'start':
+        code_set = tokens.pop(0)[1]
+    values.append(CODE128_START[code_set])
+
+    readable = []
+    pending_digit = None
+    for kind, value in tokens:
+        if kind == 'start' or kind == 'switch':
+            if pending_digit is not None:
+                values.extend((CODE128_SWITCH['B'], _code128_value(pending_digit, 'B')))
+                code_set = 'B'
+                pending_digit = None
+            if value != code_set:
+                values.append(CODE128_SWITCH[value])
+                code_set = value
+            continue
+        if kind == 'fnc1':
+            values.append(CODE128_FNC1)
+            continue
+
+        readable.append(value)
+        if code_set == 'C':
+            if not value.isdigit():
+                # Subconjunto C só aceita pares de dígitos: volta para B
+                values.append(CODE128_SWITCH['B'])
+                code_set = 'B'
+                if pending_digit is not None:
+                    values.append(_code128_value(pending_digit, 'B'))
+                    pending_digit = None
+                values.append(_code128_value(value, 'B'))
+            elif pending_digit is None:
+                pending_digit = value
+            else:
+                values.append(int(pending_digit + value))
+                pending_digit = None
+        else:
+            values.append(_code128_value(value, code_set))
+
+    if pending_digit is not None:
+        values.extend((CODE128_SWITCH['B'], _code128_value(pending_digit, 'B')))
+
+    checksum = values[0]
+    for position, value in enumerate(values[1:], 1):
+        checksum += position * value
+    values.append(checksum % 103)
+    values.append(CODE128_STOP)
+
+    modules = ''.join(_widths_to_modules(CODE128_PATTERNS[v]) for v in values)
+    return modules, ''.join(readable)
+
+
+def ean13_check_digit(digits12):
+    """Calcula o dígito verificador EAN-13"""
+    total = 0
+    for index, digit in enumerate(digits12):
+        total += int(digit) * (3 if index % 2 else 1)
+    return str((10 - total % 10) % 10)
+
+
+@lru_cache(maxsize=4096)
+def encode_ean13(data):
+    """
+    Codifica EAN-13 como a impressora faz no ^BE
+    Dados com menos de 12 dígitos são completados com zeros à esquerda.
+    Retorna (módulos, texto legível com 13 dígitos)
+    """
+    digits = ''.join(filter(str.isdigit, str(data)))[:12].zfill(12)
+    digits += ean13_check_digit(digits)
+
+    parity = EAN_PARITY[int(digits[0])]
+    parts = ['101']
+    for index, digit in enumerate(digits[1:7]):
+        table = EAN_L if parity[index] == 'L' else EAN_G
+        parts.append(table[int(digit)])
+    parts.append('01010')
+    for digit in digits[7:]:
+        parts.append(EAN_R[int(digit)])
+    parts.append('101')
+    return ''.join(parts), digits
+
+
+# --- QR Code (modelo 2) ---
+
+QR_ECC_ORDINAL = {'L': 0, 'M': 1, 'Q': 2, 'H': 3}
+QR_ECC_FORMAT_BITS = {'L': 1, 'M': 0, 'Q': 3, 'H': 2}
+
+QR_ECC_CODEWORDS_PER_BLOCK = (
+    (-1, 7, 10, 15, 20, 26, 18, 20, 24, 30, 18, 20, 24, 26, 30, 22, 24, 28, 30, 28, 28,
+     28, 28, 30, 30, 26, 28, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30),
+    (-1, 10, 16, 26, 18, 24, 16, 18, 22, 22, 26, 30, 22, 22, 24, 24, 28, 28, 26, 26, 26,
+     26, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28),
+    (-1, 13, 22, 18, 26, 18, 24, 18, 22, 20, 24, 28, 26, 24, 20, 30, 24, 28, 28, 26, 30,
+     28, 30, 30, 30, 30, 28, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30),
+    (-1, 17, 28, 22, 16, 22, 28, 26, 26, 24, 28, 24, 28, 22, 24, 24, 30, 28, 28, 26, 28,
+     30, 24, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30),
+)
+
+QR_NUM_ERROR_CORRECTION_BLOCKS = (
+    (-1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 4, 4, 4, 4, 4, 6, 6, 6, 6, 7, 8,
+     8, 9, 9, 10, 12, 12, 12, 13, 14, 15, 16, 17, 18, 19, 19, 20, 21, 22, 24, 25),
+    (-1, 1, 1, 1, 2, 2, 4, 4, 4, 5, 5, 5, 8, 9, 9, 10, 10, 11, 13, 14, 16,
+     17, 17, 18, 20, 21, 23, 25, 26, 28, 29, 31, 33, 35, 37, 38, 40, 43, 45, 47, 49),
+    (-1, 1, 1, 2, 2, 4, 4, 6, 6, 8, 8, 8, 10, 12, 16, 12, 17, 16, 18, 21, 20,
+     23, 23, 25, 27, 29, 34, 34, 35, 38, 40, 43, 45, 48, 51, 53, 56, 59, 62, 65, 68),
+    (-1, 1, 1, 2, 4, 4, 4, 5, 6, 8, 8, 11, 11, 16, 16, 18, 16, 19, 21, 25, 25,
+     25, 34, 30, 32, 35, 37, 40, 42, 45, 48, 51, 54, 57, 60, 63, 66, 70, 74, 77, 80),
+)
+
+QR_ALPHANUMERIC = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:"
+
+# Tabelas GF(256) com polinômio 0x11D
+_GF_EXP = [0] * 512
+_GF_LOG = [0] * 256
+_value = 1
+for _index in range(255):
+    _GF_EXP[_index] = _value
+    _GF_LOG[_value] = _index
+    _value <<= 1
+    if _value & 0x100:
+        _value ^= 0x11D
+for _index in range(255, 512):
+    _GF_EXP[_index] = _GF_EXP[_index - 255]
+del _value, _index
+
+
+def _gf_multiply(x, y):
+    if x == 0 or y == 0:
+        return 0
+    return _GF_EXP[_GF_LOG[x] + _GF_LOG[y]]
+
+
+@lru_cache(maxsize=64)
+def _rs_divisor(degree):
+    """Polinômio gerador Reed-Solomon para `degree` codewords de correção"""
+    result = [0] * (degree - 1) + [1]
+    root = 1
+    for _ in range(degree):
+        for j in range(degree):
+            result[j] = _gf_multiply(result[j], root)
+            if j + 1 < degree:
+                result[j] ^= result[j + 1]
+        root = _gf_multiply(root, 0x02)
+    return tuple(result)
+
+
+def _rs_remainder(data, divisor):
+    result = [0] * len(divisor)
+    for byte in data:
+        factor = byte ^ result.pop(0)
+        result.append(0)
+        if factor:
+            log_factor = _GF_LOG[factor]
+            for index, coef in enumerate(divisor):
+                if coef:
+                    result[index] ^= _GF_EXP[_GF_LOG[coef] + log_factor]
+    return result
+
+
+def _qr_raw_data_modules(version):
+    result = (16 * version + 128) * version + 64
+    if version >= 2:
+        num_align = version // 7 + 2
+        result -= (25 * num_align - 10) * num_align - 55
+        if version >= 7:
+            result -= 36
+    return result
+
+
+def _qr_data_codewords(version, ecc):
+    ordinal = QR_ECC_ORDINAL[ecc]
+    return (_qr_raw_data_modules(version) // 8
+            - QR_ECC_CODEWORDS_PER_BLOCK[ordinal][version]
+            * QR_NUM_ERROR_CORRECTION_BLOCKS[ordinal][version])
+
+
+def _qr_alignment_positions(version):
+    if version == 1:
+        return []
+    size = version * 4 + 17
+    num_align = version // 7 + 2
+    step = (version * 8 + num_align * 3 + 5) // (num_align * 4 - 4) * 2
+    result = [size - 7 - i * step for i in range(num_align - 1)] + [6]
+    return list(reversed(result))
+
+
+def _qr_segment(text):
+    """Escolhe o modo mais compacto (numérico, alfanumérico ou byte)"""
+    if text.isdigit():
+        bits = []
+        for index in range(0, len(text), 3):
+            chunk = text[index:index + 3]
+            bits.append((int(chunk), len(chunk) * 3 + 1))
+        return 0x1, len(text), bits, (10, 12, 14)
+    if all(char in QR_ALPHANUMERIC for char in text):
+        bits = []
+        for index in range(0, len(text) - 1, 2):
+            pair = QR_ALPHANUMERIC.index(text[index]) * 45 + QR_ALPHANUMERIC.index(text[index + 1])
+            bits.append((pair, 11))
+        if len(text) % 2:
+            bits.append((QR_ALPHANUMERIC.index(text[-1]), 6))
+        return 0x2, len(text), bits, (9, 11, 13)
+    raw = text.encode('utf-8')
+    return 0x4, len(raw), [(byte, 8) for byte in raw], (8, 16, 16)
+
+
+def _count_bits(version, widths):
+    if version <= 9:
+        return widths[0]
+    if version <= 26:
+        return widths[1]
+    return widths[2]
+
+
+# Padrões 1:1:3:1:1 com 4 módulos claros (regra N3) como inteiros de 11 bits
+_FINDER_LIKE = (0b10111010000, 0b00001011101)
+
+
+def _qr_run_penalty(lines):
+    """Regra N1: sequências de 5+ módulos da mesma cor, por máscara"""
+    equal = lines[..., 1:] == lines[..., :-1]
+    runs5 = equal[..., :-3] & equal[..., 1:-2] & equal[..., 2:-1] & equal[..., 3:]
+    starts = runs5[..., 0].sum(axis=-1) + (runs5[..., 1:] & ~runs5[..., :-1]).sum(axis=(-1, -2))
+    # Cada sequência de tamanho L vale 3 + (L - 5) = (janelas de 5) + 2
+    return runs5.sum(axis=(-1, -2)) + 2 * starts
+
+
+def _qr_finder_penalty(lines):
+    """Regra N3: padrões parecidos com o localizador, por máscara"""
+    width = lines.shape[-1] - 10
+    windows = np.zeros(lines.shape[:-1] + (width,), dtype=np.int32)
+    for offset in range(11):
+        windows = (windows << 1) | lines[..., offset:offset + width]
+    return sum((windows == pattern).sum(axis=(-1, -2)) for pattern in _FINDER_LIKE)
+
+
+def _qr_penalties(stack):
+    """Pontuação de penalidade (regras N1 a N4) para as 8 máscaras de uma vez"""
+    transposed = stack.transpose(0, 2, 1)
+    penalty = _qr_run_penalty(stack) + _qr_run_penalty(transposed)
+
+    top_left = stack[:, :-1, :-1]
+    same = ((top_left == stack[:, 1:, :-1]) & (top_left == stack[:, :-1, 1:])
+            & (top_left == stack[:, 1:, 1:]))
+    penalty = penalty + 3 * same.sum(axis=(1, 2))
+
+    penalty = penalty + 40 * (_qr_finder_penalty(stack) + _qr_finder_penalty(transposed))
+
+    total = stack.shape[1] * stack.shape[2]
+    dark = stack.sum(axis=(1, 2))
+    k = (np.abs(dark * 20 - total * 10) + total - 1) // total - 1
+    return penalty + k * 10
+
+
+@lru_cache(maxsize=64)
+def _qr_mask_patterns(size):
+    """As 8 máscaras da especificação como matrizes 0/1"""
+    y, x = np.indices((size, size))
+    patterns = (
+        (x + y) % 2 == 0,
+        y % 2 == 0,
+        x % 3 == 0,
+        (x + y) % 3 == 0,
+        (x // 3 + y // 2) % 2 == 0,
+        x * y % 2 + x * y % 3 == 0,
+        (x * y % 2 + x * y % 3) % 2 == 0,
+        ((x + y) % 2 + x * y % 3) % 2 == 0,
+    )
+    return tuple(pattern.astype(np.int32) for pattern in patterns)
+
+
+@lru_cache(maxsize=4096)
+def encode_qr(text, ecc='M'):
+    """
+    Gera a matriz QR Code (modelo 2) para o texto informado
+    Retorna tupla de linhas, cada linha uma tupla de 0/1 (1 = módulo escuro)
+    """
+    ecc = ecc if ecc in QR_ECC_ORDINAL else 'M'
+    mode, char_count, data_bits, count_widths = _qr_segment(text)
+
+    for version in range(1, 41):
+        capacity_bits = _qr_data_codewords(version, ecc) * 8
+        used = 4 + _count_bits(version, count_widths) + sum(n for _, n in data_bits)
+        if used <= capacity_bits:
+            break
+    else:
+        raise ValueError("Dados longos demais para QR Code")
+
+    bits = []
+
+    def append_bits(value, length):
+        for shift in range(length - 1, -1, -1):
+            bits.append((value >> shift) & 1)
+
+    append_bits(mode, 4)
+    append_bits(char_count, _count_bits(version, count_widths))
+    for value, length in data_bits:
+        append_bits(value, length)
+    append_bits(0, min(4, capacity_bits - len(bits)))
+    append_bits(0, (8 - len(bits) % 8) % 8)
+    pad = 0xEC
+    while len(bits) < capacity_bits:
+        append_bits(pad, 8)
+        pad ^= 0xEC ^ 0x11
+
+    data = [int(''.join(map(str, bits[i:i + 8])), 2) for i in range(0, len(bits), 8)]
+
+    # Blocos Reed-Solomon intercalados
+    ordinal = QR_ECC_ORDINAL[ecc]
+    num_blocks = QR_NUM_ERROR_CORRECTION_BLOCKS[ordinal][version]
+    block_ecc_len = QR_ECC_CODEWORDS_PER_BLOCK[ordinal][version]
+    raw_codewords = _qr_raw_data_modules(version) // 8
+    num_short_blocks = num_blocks - raw_codewords % num_blocks
+    short_block_len = raw_codewords // num_blocks
+    divisor = _rs_divisor(block_ecc_len)
+
+    blocks = []
+    offset = 0
+    for index in range(num_blocks):
+        length = short_block_len - block_ecc_len + (0 if index < num_short_blocks else 1)
+        block = data[offset:offset + length]
+        offset += length
+        ecc_bytes = _rs_remainder(block, divisor)
+        if index < num_short_blocks:
+            block.append(0)
+        blocks.append(block + ecc_bytes)
+
+    codewords = []
+    for i in range(len(blocks[0])):
+        for j, block in enumerate(blocks):
+            if i != short_block_len - block_ecc_len or j >= num_short_blocks:
+                codewords.append(block[i])
+
+    layout = _qr_layout(version)
+    bits = np.unpackbits(np.array(codewords, dtype=np.uint8))
+    modules = layout.modules.copy()
+    # Bits restantes (remainder bits) ficam claros
+    placed = np.zeros(layout.data_y.size, dtype=np.int32)
+    placed[:bits.size] = bits
+    modules[layout.data_y, layout.data_x] = placed
+
+    # Escolha da máscara com menor penalidade (as 8 avaliadas em lote)
+    stack = modules[None, :, :] ^ (np.stack(_qr_mask_patterns(layout.size)) & layout.data_area)
+    format_values = np.array([_qr_format_bits(ecc, mask) for mask in range(8)])
+    stack[:, layout.format_y, layout.format_x] = (
+        (format_values[:, None] >> layout.format_bit[None, :]) & 1)
+    best = int(np.argmin(_qr_penalties(stack)))
+
+    return tuple(map(tuple, stack[best].tolist()))
+
+
+class _QRLayout:
+    """Padrões de função e ordem de posicionamento dos dados de uma versão"""
+
+    __slots__ = ('size', 'modules', 'data_area', 'data_y', 'data_x',
+                 'format_y', 'format_x', 'format_bit')
+
+
+@lru_cache(maxsize=40)
+def _qr_layout(version):
+    size = version * 4 + 17
+    modules = np.zeros((size, size), dtype=np.int32)
+    is_function = np.zeros((size, size), dtype=bool)
+
+    def set_function(x, y, dark):
+        modules[y, x] = 1 if dark else 0
+        is_function[y, x] = True
+
+    for i in range(size):
+        set_function(6, i, i % 2 == 0)
+        set_function(i, 6, i % 2 == 0)
+
+    for cx, cy in ((3, 3), (size - 4, 3), (3, size - 4)):
+        for dy in range(-4, 5):
+            for dx in range(-4, 5):
+                x, y = cx + dx, cy + dy
+                if 0 <= x < size and 0 <= y < size:
+                    set_function(x, y, max(abs(dx), abs(dy)) not in (2, 4))
+
+    positions = _qr_alignment_positions(version)
+    last = len(positions) - 1
+    for i, cy in enumerate(positions):
+        for j, cx in enumerate(positions):
+            if (i == 0 and j == 0) or (i == 0 and j == last) or (i == last and j == 0):
+                continue
+            for dy in range(-2, 3):
+                for dx in range(-2, 3):
+                    set_function(cx + dx, cy + dy, max(abs(dx), abs(dy)) != 1)
+
+    format_cells = [(8, i, i) for i in range(6)]
+    format_cells.extend(((8, 7, 6), (8, 8, 7), (7, 8, 8)))
+    format_cells.extend((14 - i, 8, i) for i in range(9, 15))
+    format_cells.extend((size - 1 - i, 8, i) for i in range(8))
+    format_cells.extend((8, size - 15 + i, i) for i in range(8, 15))
+    for x, y, _ in format_cells:
+        set_function(x, y, False)
+    set_function(8, size - 8, True)
+
+    if version >= 7:
+        rem = version
+        for _ in range(12):
+            rem = (rem << 1) ^ ((rem >> 11) * 0x1F25)
+        value = version << 12 | rem
+        for i in range(18):
+            dark = (value >> i) & 1
+            a, b = size - 11 + i % 3, i // 3
+            set_function(a, b, dark)
+            set_function(b, a, dark)
+
+    # Posicionamento em zigue-zague
+    data_y, data_x = [], []
+    right = size - 1
+    while right >= 1:
+        if right == 6:
+            right = 5
+        upward = ((right + 1) & 2) == 0
+        for vert in range(size):
+            y = size - 1 - vert if upward else vert
+            for x in (right, right - 1):
+                if not is_function[y, x]:
+                    data_y.append(y)
+                    data_x.append(x)
+        right -= 2
+
+    layout = _QRLayout()
+    layout.size = size
+    layout.modules = modules
+    layout.data_area = (~is_function).astype(np.int32)
+    layout.data_y = np.array(data_y)
+    layout.data_x = np.array(data_x)
+    layout.format_y = np.array([cell[1] for cell in format_cells])
+    layout.format_x = np.array([cell[0] for cell in format_cells])
+    layout.format_bit = np.array([cell[2] for cell in format_cells])
+    return layout
+
+
+def _qr_format_bits(ecc, mask):
+    """Bits de formato (nível de correção + máscara) com BCH"""
+    data = QR_ECC_FORMAT_BITS[ecc] << 3 | mask
+    rem = data
+    for _ in range(10):
+        rem = (rem << 1) ^ ((rem >> 9) * 0x537)
+    return (data << 10 | rem) ^ 0x5412
+
+
+def parse_zpl_qr_data(field_data):
+    """
+    Interpreta o ^FD de um ^BQ ("LA,dados", "MM,Adados")
+    Retorna (nível de correção, texto)
+    """
+    if len(field_data) >= 3 and field_data[2] == ',':
+        ecc = field_data[0].upper()
+        input_mode = field_data[1].upper()
+        text = field_data[3:]
+        if input_mode == 'M' and text[:1].upper() in ('N', 'A'):
+            text = text[1:]
+        elif input_mode == 'M' and text[:1].upper() == 'B' and len(text) >= 5:
+            text = text[5:]
+        return (ecc if ecc in QR_ECC_ORDINAL else 'Q'), text
+    return 'Q', field_data
@@ -5,10 +5,10 @@ Verificação e ajuste de configurações do driver da impressora Zebra ZD621R
 
 import os
 import subprocess
-import win32print
-import win32api
 import tempfile
 
+from windows_spooler import win32print
+
 def check_printer_settings():
     """Verifica configurações detalhadas da impressora"""
     print("🔍 Verificando configurações da impressora...")
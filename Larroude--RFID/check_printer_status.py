@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 
-import win32print
+from windows_spooler import win32print
 
 def check_printer_status():
     printer_name = "ZDesigner ZD621R-203dpi ZPL"
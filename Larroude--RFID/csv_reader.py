@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Leitor CSV para os uploads de etiquetas
+Tokenização RFC 4180 (campos entre aspas com vírgulas, aspas duplicadas e
+quebras de linha) pelo módulo csv em C, em blocos de linhas. Detecta BOM,
+codificação (UTF-8 ou Windows-1252, comum em CSV salvo pelo Excel) e
+separador (',' ou ';' do Excel em português).
+"""
+
+import sys
+import csv
+import json
+import time
+import codecs
+from itertools import islice
+
+CHUNK_ROWS = 65536
+DELIMITERS = (',', ';', '\t')
+
+
+def detect_encoding(path, block_size=1 << 20):
+    """'utf-8-sig' (com BOM), 'utf-8' ou 'cp1252' se o arquivo não for UTF-8 válido"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    with open(path, 'rb') as file:
+        block = file.read(block_size)
+        if block.startswith(codecs.BOM_UTF8):
+            return 'utf-8-sig'
+        try:
+            while block:
+                decoder.decode(block)
+                block = file.read(block_size)
+            decoder.decode(b'', final=True)
+        except UnicodeDecodeError:
+            return 'cp1252'
+    return 'utf-8'
+
+
+def sniff_delimiter(line):
+    """Separador mais frequente fora de aspas na linha do cabeçalho"""
+    unquoted = line.split('"')[::2]
+    counts = {delimiter: sum(part.count(delimiter) for part in unquoted)
+              for delimiter in DELIMITERS}
+    best = max(DELIMITERS, key=lambda delimiter: counts[delimiter])
+    return best if counts[best] else ','
+
+
+class CSVFile:
+    """Arquivo CSV aberto para leitura em blocos, com o cabeçalho já lido"""
+
+    def __init__(self, path, chunk_rows=CHUNK_ROWS):
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self.encoding = detect_encoding(path)
+        self._file = open(path, 'r', encoding=self.encoding, newline='')
+        first_line = self._file.readline()
+        self.delimiter = sniff_delimiter(first_line)
+        self._file.seek(0)
+        self._reader = csv.reader(self._file, delimiter=self.delimiter, skipinitialspace=True)
+        self.header = next((row for row in self._reader if any(cell.strip() for cell in row)), None)
+        if self.header is not None:
+            self.header = [name.strip() for name in self.header]
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def iter_chunks(self):
+        """
+        Blocos de até chunk_rows linhas não vazias. Os valores vêm como lidos
+        (sem espaço após o separador); o trim fica com quem usa a coluna
+        """
+        reader = self._reader
+        while True:
+            rows = list(islice(reader, self.chunk_rows))
+            if not rows:
+                return
+            yield [row for row in rows if any(row)]
+
+    def iter_rows(self):
+        for chunk in self.iter_chunks():
+            yield from chunk
+
+    def iter_records(self):
+        """Linhas como dict {coluna do cabeçalho: valor sem espaços nas pontas}"""
+        header = self.header or []
+        for values in self.iter_rows():
+            yield {name: values[position].strip() if position < len(values) else ''
+                   for position, name in enumerate(header)}
+
+
+def main():
+    """Função principal - lê um CSV e devolve cabeçalho e linhas em JSON"""
+    if len(sys.argv) < 2:
+        print(json.dumps({
+            'success': False,
+            'error': 'Uso: python csv_reader.py <arquivo.csv>'
+        }))
+        return
+
+    try:
+        with CSVFile(sys.argv[1]) as table:
+            rows = list(table.iter_rows())
+            print(json.dumps({
+                'success': True,
+                'header': table.header or [],
+                'rows': rows,
+                'totalRows': len(rows),
+                'encoding': table.encoding,
+                'delimiter': table.delimiter,
+                'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+            }))
+    except Exception as e:
+        print(json.dumps({
+            'success': False,
+            'error': str(e),
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        }))
+
+
+if __name__ == "__main__":
+    main()
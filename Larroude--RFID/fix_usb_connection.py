@@ -8,11 +8,10 @@ import os
 import subprocess
 import tempfile
 import time
-import win32print
-import win32api
-import serial.tools.list_ports
 import sys
 
+from windows_spooler import list_ports, win32print
+
 def fix_printer_driver():
     """Corrige configurações do driver da impressora"""
     print("🔧 Verificando e corrigindo configurações do driver...")
@@ -139,7 +138,7 @@ def check_usb_ports():
     print("\n🔍 Verificando portas USB/Serial disponíveis...")
     
     try:
-        ports = serial.tools.list_ports.comports()
+        ports = list_ports.comports()
         
         print(f"📋 Portas encontradas: {len(ports)}")
         for port in ports:
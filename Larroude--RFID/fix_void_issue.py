@@ -3,9 +3,10 @@
 Script para resolver o problema VOID na impressora Zebra
 """
 
-import win32print
 import time
 
+from windows_spooler import win32print
+
 def check_printer_status():
     """Verifica status detalhado da impressora"""
     print("🔍 Verificando status da impressora...")
@@ -15,14 +15,16 @@ import './components/components.css';
 
 function App() {
   const [excelData, setExcelData] = useState(null);
+  const [searchId, setSearchId] = useState(null);
   const [previews, setPreviews] = useState([]);
   const [isGenerating, setIsGenerating] = useState(false);
   const [currentStep, setCurrentStep] = useState(1);
   const [activeTab, setActiveTab] = useState('home');
   const [sidebarOpen, setSidebarOpen] = useState(false);
 
-  const handleFileUpload = (data) => {
+  const handleFileUpload = (data, uploadSearchId) => {
     setExcelData(data);
+    setSearchId(uploadSearchId || null);
     setPreviews([]);
     setCurrentStep(2);
     toast.success(`Arquivo processado com sucesso! ${data.length} registros encontrados.`);
@@ -41,6 +43,7 @@ function App() {
 
   const resetApp = () => {
     setExcelData(null);
+    setSearchId(null);
     setPreviews([]);
     setCurrentStep(1);
     setIsGenerating(false);
@@ -91,6 +94,7 @@ function App() {
                   </div>
                   <PreviewSection 
                     data={excelData} 
+                    searchId={searchId}
                     onPreviewGenerated={handlePreviewGenerated}
                   />
                   <div className="actions">
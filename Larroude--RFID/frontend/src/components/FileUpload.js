@@ -29,7 +29,7 @@ const FileUpload = ({ onFileUpload }) => {
       });
 
       if (response.data && response.data.data) {
-        onFileUpload(response.data.data);
+        onFileUpload(response.data.data, response.data.searchId);
       } else {
         throw new Error('Resposta inválida do servidor');
       }
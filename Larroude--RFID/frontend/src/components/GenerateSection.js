@@ -98,9 +98,10 @@ const GenerateSection = ({
               <div key={index} className="label-preview-vertical">
                 <div className="preview-image-container-large">
                   <img
-                    src={preview.preview}
+                    src={preview.thumbUrl}
                     alt={`Preview da etiqueta ${index + 1}`}
-                    className="preview-image-large"
+                    loading="lazy"
+                    className="preview-image-thumb"
                   />
                 </div>
               </div>
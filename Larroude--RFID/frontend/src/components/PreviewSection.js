@@ -1,4 +1,4 @@
-import React, { useState, useMemo } from 'react';
+import React, { useState, useMemo, useEffect, useRef } from 'react';
 import axios from 'axios';
 import { Eye, AlertCircle, ZoomIn, Download, Info, Printer, List, Search, X, Grid3X3, LayoutList, Barcode, Package, Palette, Ruler, Hash, FileText, Calendar, User, MapPin } from 'lucide-react';
 import { toast } from 'react-toastify';
@@ -6,23 +6,53 @@ import './PrintList.css';
 
 // Componente atualizado para exibir todas as etiquetas em tamanho real
 
-const PreviewSection = ({ data, onPreviewGenerated }) => {
+const SEARCH_PAGE_SIZE = 50;
+
+// Acompanha um job de impressão pelo stream de eventos até o resultado final
+const waitForPrintJob = (jobId, onProgress) => new Promise((resolve, reject) => {
+  const source = new EventSource(`/api/print-jobs/${jobId}/events`);
+  let sent = 0;
+  source.addEventListener('sent', () => onProgress(++sent));
+  source.addEventListener('finished', (event) => {
+    source.close();
+    resolve(JSON.parse(event.data));
+  });
+  source.addEventListener('aborted', (event) => {
+    source.close();
+    reject(new Error(JSON.parse(event.data).message));
+  });
+  source.addEventListener('gap', () => {
+    // Eventos perdidos no buffer: a contagem passa a vir do relatório
+    axios.get(`/api/print-jobs/${jobId}`).then(response => {
+      sent = response.data.sent;
+      onProgress(sent);
+    }).catch(() => {});
+  });
+});
+
+const PreviewSection = ({ data, searchId, onPreviewGenerated }) => {
   const [previews, setPreviews] = useState([]);
   const [isGenerating, setIsGenerating] = useState(false);
   const [error, setError] = useState(null);
   const [selectedPreview, setSelectedPreview] = useState(null);
   const [showModal, setShowModal] = useState(false);
   const [totalLabels, setTotalLabels] = useState(0);
+  const [previewSession, setPreviewSession] = useState(null); // { sessionId, nextCursor }
+  const [isLoadingPage, setIsLoadingPage] = useState(false);
+  const loadMoreRef = useRef(null);
   const [viewMode, setViewMode] = useState('preview'); // 'preview' ou 'list'
   const [listLayout, setListLayout] = useState('list'); // 'list' ou 'grid'
   const [printingItems, setPrintingItems] = useState(new Set());
   const [searchTerm, setSearchTerm] = useState('');
+  const [searchPage, setSearchPage] = useState(null); // { items, total, cursor, nextCursor }
+  const [previousCursors, setPreviousCursors] = useState([]);
+  const [isSearching, setIsSearching] = useState(false);
   const [selectedItem, setSelectedItem] = useState(null);
   const [showDetailsModal, setShowDetailsModal] = useState(false);
 
-  // Filtrar dados baseado no termo de pesquisa
+  // Filtrar dados baseado no termo de pesquisa (só sem índice no servidor, ex.: .xls)
   const filteredData = useMemo(() => {
-    if (!data || !searchTerm.trim()) {
+    if (searchId || !data || !searchTerm.trim()) {
       return data || [];
     }
 
@@ -45,7 +75,58 @@ const PreviewSection = ({ data, onPreviewGenerated }) => {
         field && field.toString().toLowerCase().includes(search)
       );
     });
-  }, [data, searchTerm]);
+  }, [data, searchId, searchTerm]);
+
+  // Pesquisa no índice do servidor: o navegador guarda só a página atual
+  const loadSearchPage = async (cursor, cursors) => {
+    setIsSearching(true);
+    try {
+      const response = await axios.get('/api/search', {
+        params: { searchId, q: searchTerm.trim(), cursor, limit: SEARCH_PAGE_SIZE }
+      });
+      setSearchPage(response.data);
+      setPreviousCursors(cursors);
+    } catch (error) {
+      const errorMessage = error.response?.data?.error || 'Erro ao pesquisar itens';
+      toast.error(errorMessage);
+    } finally {
+      setIsSearching(false);
+    }
+  };
+
+  useEffect(() => {
+    if (!searchId || viewMode !== 'list') {
+      return undefined;
+    }
+    const timer = setTimeout(() => loadSearchPage(0, []), 200);
+    return () => clearTimeout(timer);
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [searchId, searchTerm, viewMode]);
+
+  const nextSearchPage = () => {
+    if (searchPage && searchPage.nextCursor !== null) {
+      loadSearchPage(searchPage.nextCursor, [...previousCursors, searchPage.cursor]);
+    }
+  };
+
+  const previousSearchPage = () => {
+    if (previousCursors.length > 0) {
+      loadSearchPage(previousCursors[previousCursors.length - 1], previousCursors.slice(0, -1));
+    }
+  };
+
+  const listItems = searchId ? (searchPage?.items || []) : filteredData;
+  const matchCount = searchId ? (searchPage?.total || 0) : filteredData.length;
+  const firstItemNumber = searchId ? previousCursors.length * SEARCH_PAGE_SIZE : 0;
+  // Índice do item no upload (o servidor devolve a linha de cada resultado)
+  const itemIndex = (item) => (searchId ? item.row : data.findIndex(originalItem => originalItem === item));
+  // O resultado da pesquisa já traz todos os campos da linha: imprime ele mesmo,
+  // sem cruzar o número da linha do servidor com o array local
+  const printableItem = (item) => {
+    if (!searchId) return item;
+    const { row, ...fields } = item;
+    return fields;
+  };
 
   // Limpar pesquisa
   const clearSearch = () => {
@@ -69,6 +150,45 @@ const PreviewSection = ({ data, onPreviewGenerated }) => {
     return item.BARCODE || item.VPM?.replace(/-/g, '')?.substring(0, 12) || 'N/A';
   };
 
+  const loadPreviewPage = async (sessionId, cursor) => {
+    const response = await axios.get(`/api/preview-sessions/${sessionId}/pages`, {
+      params: { cursor }
+    });
+    return response.data;
+  };
+
+  const loadMorePreviews = async () => {
+    if (!previewSession || previewSession.nextCursor === null || isLoadingPage) {
+      return;
+    }
+    setIsLoadingPage(true);
+    try {
+      const page = await loadPreviewPage(previewSession.sessionId, previewSession.nextCursor);
+      setPreviews(prev => [...prev, ...page.units]);
+      setPreviewSession({ ...previewSession, nextCursor: page.nextCursor });
+    } catch (error) {
+      const errorMessage = error.response?.data?.error || 'Erro ao carregar mais previews';
+      toast.error(errorMessage);
+    } finally {
+      setIsLoadingPage(false);
+    }
+  };
+
+  // Carregar a próxima página quando o fim da lista aparecer na tela
+  useEffect(() => {
+    const sentinel = loadMoreRef.current;
+    if (!sentinel || !previewSession || previewSession.nextCursor === null) {
+      return undefined;
+    }
+    const observer = new IntersectionObserver((entries) => {
+      if (entries[0].isIntersecting) {
+        loadMorePreviews();
+      }
+    }, { rootMargin: '600px' });
+    observer.observe(sentinel);
+    return () => observer.disconnect();
+  });
+
   const generatePreviews = async () => {
     setIsGenerating(true);
     setError(null);
@@ -77,22 +197,18 @@ const PreviewSection = ({ data, onPreviewGenerated }) => {
     console.log('DEBUG: Dados recebidos:', data);
 
     try {
-      const response = await axios.post('/api/generate-preview', {
-        data: data
-      });
-
-      console.log('DEBUG: Resposta do servidor:', response.data);
-
-      if (response.data && response.data.previews) {
-        console.log('DEBUG: Previews encontrados:', response.data.previews.length);
-        setPreviews(response.data.previews);
-        setTotalLabels(response.data.totalLabels || 0);
-        onPreviewGenerated(response.data.previews);
-        toast.success(`${response.data.previews.length} previews gerados com sucesso!`);
-      } else {
-        console.log('DEBUG: Resposta inválida:', response.data);
-        throw new Error('Resposta inválida do servidor');
-      }
+      // Sessão paginada: só a primeira página é carregada; as imagens são
+      // binárias e renderizadas quando o navegador as pede
+      const session = await axios.post('/api/preview-sessions', { data });
+      const { sessionId } = session.data;
+      const page = await loadPreviewPage(sessionId, 0);
+
+      console.log('DEBUG: Primeira página de previews:', page.units.length, 'de', page.totalLabels);
+      setPreviews(page.units);
+      setTotalLabels(page.totalLabels || 0);
+      setPreviewSession({ sessionId, nextCursor: page.nextCursor });
+      onPreviewGenerated(page.units);
+      toast.success(`${page.totalLabels} previews disponíveis!`);
     } catch (error) {
       console.error('DEBUG: Erro ao gerar preview:', error);
       console.error('DEBUG: Resposta de erro:', error.response?.data);
@@ -106,9 +222,8 @@ const PreviewSection = ({ data, onPreviewGenerated }) => {
 
   const openModal = (preview, index) => {
     console.log('DEBUG: openModal chamado', { preview, index });
-    console.log('DEBUG: preview.preview:', preview.preview);
     console.log('DEBUG: data[index]:', data[index]);
-    setSelectedPreview({ preview: preview.preview, index, data: data[index] });
+    setSelectedPreview({ preview, index, data: data[index] });
     setShowModal(true);
     console.log('DEBUG: showModal definido como true');
   };
@@ -120,7 +235,7 @@ const PreviewSection = ({ data, onPreviewGenerated }) => {
 
   const downloadPreview = (preview, index) => {
     const link = document.createElement('a');
-    link.href = preview.preview;
+    link.href = preview.fullUrl;
     link.download = `preview-etiqueta-${index + 1}.png`;
     document.body.appendChild(link);
     link.click();
@@ -170,14 +285,23 @@ const PreviewSection = ({ data, onPreviewGenerated }) => {
       // Criar array com o item repetido pela quantidade solicitada
       const printData = Array(qty).fill(itemData);
       
-      const response = await axios.post('/api/print-individual', {
+      const accepted = await axios.post('/api/print-individual', {
         data: printData,
         quantity: qty
       });
+      const progressToast = toast.info(`Enviando 0/${accepted.data.totalEtiquetas} etiqueta(s)...`, { autoClose: false });
+      let result;
+      try {
+        result = await waitForPrintJob(accepted.data.jobId, (sent) => {
+          toast.update(progressToast, { render: `Enviando ${sent}/${accepted.data.totalEtiquetas} etiqueta(s)...` });
+        });
+      } finally {
+        toast.dismiss(progressToast);
+      }
 
-      if (response.data && response.data.results) {
-        const successCount = response.data.successCount || 0;
-        const totalCount = response.data.totalItems || qty;
+      if (result && result.results) {
+        const successCount = result.successCount || 0;
+        const totalCount = result.totalItems || qty;
         
         if (successCount === totalCount) {
           toast.success(
@@ -297,7 +421,7 @@ const PreviewSection = ({ data, onPreviewGenerated }) => {
             <div className="header-top">
               <h3>
                 <List size={20} />
-                Lista para Impressão ({filteredData.length} {filteredData.length === 1 ? 'item' : 'itens'})
+                Lista para Impressão ({matchCount} {matchCount === 1 ? 'item' : 'itens'})
               </h3>
               
               {/* Layout toggle */}
@@ -345,7 +469,7 @@ const PreviewSection = ({ data, onPreviewGenerated }) => {
               <div className="search-results-count">
                 {searchTerm ? (
                   <>
-                    <span className="results-found">{filteredData.length}</span>
+                    <span className="results-found">{matchCount}</span>
                     <span className="results-text">de {data.length} itens</span>
                   </>
                 ) : (
@@ -370,15 +494,15 @@ const PreviewSection = ({ data, onPreviewGenerated }) => {
                 <div className="header-cell">Qtd</div>
                 <div className="header-cell">Ações</div>
               </div>
-              {filteredData.map((item, index) => {
-                const originalIndex = data.findIndex(originalItem => originalItem === item);
+              {listItems.map((item, index) => {
+                const originalIndex = itemIndex(item);
                 const itemId = `${originalIndex}`;
                 const isPrinting = printingItems.has(itemId);
                 const barcode = generateBarcode(item);
                 
                 return (
                   <div key={index} className="table-row">
-                    <div className="table-cell">{index + 1}</div>
+                    <div className="table-cell">{firstItemNumber + index + 1}</div>
                     <div className="table-cell">
                       <div className="item-info">
                         <strong>{item.STYLE_NAME || 'N/A'}</strong>
@@ -418,7 +542,7 @@ const PreviewSection = ({ data, onPreviewGenerated }) => {
                         </button>
                         <button
                           className="btn btn-print"
-                          onClick={() => printIndividualLabel(item, originalIndex)}
+                          onClick={() => printIndividualLabel(printableItem(item), originalIndex)}
                           disabled={isPrinting}
                           title={`Imprimir ${item.QTY || 1} etiqueta(s) de ${item.STYLE_NAME}`}
                         >
@@ -443,8 +567,8 @@ const PreviewSection = ({ data, onPreviewGenerated }) => {
           ) : (
             // Layout em Grid
             <div className="items-grid">
-              {filteredData.map((item, index) => {
-                const originalIndex = data.findIndex(originalItem => originalItem === item);
+              {listItems.map((item, index) => {
+                const originalIndex = itemIndex(item);
                 const itemId = `${originalIndex}`;
                 const isPrinting = printingItems.has(itemId);
                 const barcode = generateBarcode(item);
@@ -503,7 +627,7 @@ const PreviewSection = ({ data, onPreviewGenerated }) => {
                     <div className="grid-item-footer">
                       <button
                         className="btn btn-print btn-block"
-                        onClick={() => printIndividualLabel(item, originalIndex)}
+                        onClick={() => printIndividualLabel(printableItem(item), originalIndex)}
                         disabled={isPrinting}
                         title={`Imprimir ${item.QTY || 1} etiqueta(s) de ${item.STYLE_NAME}`}
                       >
@@ -525,11 +649,32 @@ const PreviewSection = ({ data, onPreviewGenerated }) => {
               })}
             </div>
           )}
+          {searchId && searchPage && (previousCursors.length > 0 || searchPage.nextCursor !== null) && (
+            <div className="search-pagination">
+              <button
+                className="btn btn-secondary btn-sm"
+                onClick={previousSearchPage}
+                disabled={isSearching || previousCursors.length === 0}
+              >
+                Anterior
+              </button>
+              <span>
+                {firstItemNumber + 1}–{firstItemNumber + listItems.length} de {matchCount}
+              </span>
+              <button
+                className="btn btn-secondary btn-sm"
+                onClick={nextSearchPage}
+                disabled={isSearching || searchPage.nextCursor === null}
+              >
+                Próxima
+              </button>
+            </div>
+          )}
           <div className="list-summary">
             <p>
-              <strong>Exibindo:</strong> {filteredData.length} itens 
-              {searchTerm && <span> (filtrados de {data.length} totais)</span>} • 
-              <strong> Etiquetas:</strong> {filteredData.reduce((sum, item) => sum + (parseInt(item.QTY) || 1), 0)}
+              <strong>Exibindo:</strong> {listItems.length} itens 
+              {searchTerm && <span> (de {matchCount} encontrados em {data.length} totais)</span>} • 
+              <strong> Etiquetas{searchId ? ' nesta página' : ''}:</strong> {listItems.reduce((sum, item) => sum + (parseInt(item.QTY) || 1), 0)}
               {searchTerm && (
                 <span className="search-info">
                   {' • '}
@@ -546,10 +691,10 @@ const PreviewSection = ({ data, onPreviewGenerated }) => {
           <h3>Preview das Etiquetas</h3>
           <div className="preview-vertical-list">
             {previews.map((preview, index) => (
-              <div key={index} className="label-preview-vertical">
+              <div key={preview.unit} className="label-preview-vertical">
                 <div className="preview-image-container-large">
                   <img
-                    src={preview.preview}
+                    src={preview.fullUrl}
                     alt={`Preview da etiqueta ${index + 1}`}
                     loading="lazy"
                     className="preview-image-large"
@@ -584,6 +729,13 @@ const PreviewSection = ({ data, onPreviewGenerated }) => {
               </div>
             ))}
           </div>
+          {previewSession && previewSession.nextCursor !== null && (
+            <div ref={loadMoreRef} className="preview-load-more">
+              <button className="btn btn-secondary" onClick={loadMorePreviews} disabled={isLoadingPage}>
+                {isLoadingPage ? 'Carregando...' : `Carregar mais (${previews.length} de ${totalLabels})`}
+              </button>
+            </div>
+          )}
         </div>
       )}
 
@@ -601,7 +753,7 @@ const PreviewSection = ({ data, onPreviewGenerated }) => {
             <div className="modal-body">
               <div className="modal-image">
                 <img
-                  src={selectedPreview.preview}
+                  src={selectedPreview.preview.fullUrl}
                   alt={`Preview ampliado da etiqueta ${selectedPreview.index + 1}`}
                 />
               </div>
@@ -639,7 +791,7 @@ const PreviewSection = ({ data, onPreviewGenerated }) => {
                 <div className="modal-actions">
                   <button
                     className="btn btn-primary"
-                    onClick={() => downloadPreview({ preview: selectedPreview.preview }, selectedPreview.index)}
+                    onClick={() => downloadPreview(selectedPreview.preview, selectedPreview.index)}
                   >
                     <Download size={16} />
                     Baixar Preview
@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+Benchmarks do fluxo de etiquetas com baseline e bloqueio de regressão
+Mede, sobre POs sintéticos de 1k/100k/1M unidades, a vazão de cada etapa:
+ingestão de CSV e XLSX (linhas/s), ZPL preenchido a partir do template
+(etiquetas/s), preview rasterizado (etiquetas/s, numa amostra), plano de
+gravação RFID (gravações/s), validação prévia do lote (MB/s do JSON enviado
+ao validador) e o fluxo completo até um destino TCP ou arquivo (etiquetas/min).
+Cada medição é a melhor de N execuções (as curtas repetem até somar 1 s),
+sem contar a geração dos dados.
+Os resultados podem ser gravados como baseline (JSON); `check` roda de novo e
+falha (código de saída 1) quando alguma vazão cai mais que o limite.
+Nenhuma impressora é usada: o destino padrão é um arquivo temporário.
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import tempfile
+import zipfile
+import threading
+import socketserver
+
+from label_preview import TEMPLATE_PATH, render_units, template_values
+from label_validator import validate_batch
+from preview_cache import PreviewCache
+from print_metrics import discard
+from printer_link import open_link
+from rfid_encode import label_epc, plan_encode
+from rfid_reprint import fill_template, iter_units, unit_epc
+from upload_ingest import read_csv, read_workbook
+from vpm_parser import parse_vpm
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BENCH_DIR = os.environ.get('BENCH_DIR', os.path.join(BASE_DIR, 'backend', 'output', 'bench'))
+DEFAULT_THRESHOLD = float(os.environ.get('BENCH_THRESHOLD', '0.10'))
+DEFAULT_REPEAT = int(os.environ.get('BENCH_REPEAT', '3'))
+DEFAULT_SIZES = ('1k', '100k')
+SIZE_SUFFIXES = {'k': 1000, 'm': 1000000}
+
+UNITS_PER_ROW = 4          # QTY de cada linha do PO sintético (tamanhos de um estilo)
+STYLE_COUNT = 300          # estilos distintos (um lote real tem poucas centenas de SKUs)
+RENDER_SAMPLE = 200        # unidades rasterizadas por medição de preview
+LARGE_RUN_UNITS = 1000000  # a partir daqui, uma execução só por benchmark
+MIN_BENCH_SECONDS = 1.0    # benchmarks curtos repetem até somar esse tempo
+MAX_RUNS = 50
+
+HEADER = ('NAME', 'DESCRIPTION', 'SKU', 'BARCODE', 'REF', 'QTY')
+SIZES = ('05.0', '06.0', '07.0', '08.0', '09.0', '10.0', '11.0')
+COLORS = (('SILV', 'SILVER'), ('BLCK', 'BLACK'), ('NUDE', 'NUDE'), ('BRWN', 'BROWN'), ('GOLD', 'GOLD'))
+
+
+def parse_size(text):
+    """'1k' -> 1000, '1m' -> 1000000, '2500' -> 2500"""
+    text = str(text).strip().lower()
+    factor = SIZE_SUFFIXES.get(text[-1:], 1)
+    number = text[:-1] if factor > 1 else text
+    try:
+        units = int(float(number) * factor)
+    except ValueError:
+        raise ValueError(f'Tamanho inválido: {text} (use ex.: 1k, 100k, 1m)') from None
+    if units < 1:
+        raise ValueError(f'Tamanho inválido: {text}')
+    return units
+
+
+def _xml_text(value):
+    return value.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+class SyntheticPO:
+    """
+    PO sintético com `units` unidades: linhas no layout padrão do upload
+    (NAME/DESCRIPTION/SKU/BARCODE/REF/QTY), gravadas sob demanda em CSV e XLSX
+    """
+
+    def __init__(self, units, workdir):
+        self.units = units
+        self.workdir = workdir
+        self.rows = []
+        remaining = units
+        row = 0
+        while remaining > 0:
+            qty = min(UNITS_PER_ROW, remaining)
+            style = row % STYLE_COUNT
+            color_code, color = COLORS[style % len(COLORS)]
+            name = f'STYLE {style:03d}'
+            sku = f'L{264 + style % 40}-S{style:03d}-{SIZES[row % len(SIZES)]}-{color_code}-{1800 + style}'
+            self.rows.append((name, f'{name} {color}', sku, f'{789000000000 + row:012d}',
+                              f'REF{style:03d}', str(qty)))
+            remaining -= qty
+            row += 1
+        self._data = None
+        self._paths = {}
+
+    @property
+    def data(self):
+        """Itens no formato da API (o que o frontend manda para impressão)"""
+        if self._data is None:
+            self._data = [{'STYLE_NAME': name, 'VPM': sku, 'COLOR': description.split(' ')[-1],
+                           'SIZE': sku.split('-')[2], 'BARCODE': barcode, 'DESCRIPTION': description,
+                           'REF': ref, 'QTY': int(qty)}
+                          for name, description, sku, barcode, ref, qty in self.rows]
+        return self._data
+
+    def csv_path(self):
+        if 'csv' not in self._paths:
+            path = os.path.join(self.workdir, f'po-{self.units}.csv')
+            with open(path, 'w', encoding='utf-8', newline='') as file:
+                file.write(','.join(HEADER) + '\n')
+                file.writelines(','.join(row) + '\n' for row in self.rows)
+            self._paths['csv'] = path
+        return self._paths['csv']
+
+    def xlsx_path(self):
+        """XLSX mínimo (strings inline, uma aba de etiquetas, sem Sheet1)"""
+        if 'xlsx' not in self._paths:
+            path = os.path.join(self.workdir, f'po-{self.units}.xlsx')
+            main_ns = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+            rel_ns = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+            pkg_ns = 'http://schemas.openxmlformats.org/package/2006/relationships'
+            columns = 'ABCDEF'
+
+            def sheet_rows():
+                for number, row in enumerate([HEADER] + self.rows, start=1):
+                    cells = ''.join(
+                        f'<c r="{column}{number}" t="inlineStr"><is><t>{_xml_text(value)}</t></is></c>'
+                        for column, value in zip(columns, row))
+                    yield f'<row r="{number}">{cells}</row>'
+
+            with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+                archive.writestr('[Content_Types].xml', (
+                    '<?xml version="1.0" encoding="UTF-8"?>'
+                    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                    '<Default Extension="xml" ContentType="application/xml"/>'
+                    '<Override PartName="/xl/workbook.xml" ContentType="application/'
+                    'vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+                    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/'
+                    'vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/></Types>'))
+                archive.writestr('_rels/.rels', (
+                    f'<?xml version="1.0" encoding="UTF-8"?><Relationships xmlns="{pkg_ns}">'
+                    f'<Relationship Id="rId1" Type="{rel_ns}/officeDocument" Target="xl/workbook.xml"/>'
+                    '</Relationships>'))
+                archive.writestr('xl/workbook.xml', (
+                    f'<?xml version="1.0" encoding="UTF-8"?><workbook xmlns="{main_ns}" xmlns:r="{rel_ns}">'
+                    '<sheets><sheet name="Etiquetas" sheetId="1" r:id="rId1"/></sheets></workbook>'))
+                archive.writestr('xl/_rels/workbook.xml.rels', (
+                    f'<?xml version="1.0" encoding="UTF-8"?><Relationships xmlns="{pkg_ns}">'
+                    f'<Relationship Id="rId1" Type="{rel_ns}/worksheet" Target="worksheets/sheet1.xml"/>'
+                    '</Relationships>'))
+                with archive.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+                    sheet.write(f'<?xml version="1.0" encoding="UTF-8"?><worksheet xmlns="{main_ns}">'
+                                '<sheetData>'.encode('utf-8'))
+                    for text in sheet_rows():
+                        sheet.write(text.encode('utf-8'))
+                    sheet.write(b'</sheetData></worksheet>')
+            self._paths['xlsx'] = path
+        return self._paths['xlsx']
+
+
+# --- Destinos do fluxo completo ---
+
+class FileSink:
+    """Destino em arquivo (mesma interface de envio do printer_link)"""
+
+    name = 'file'
+
+    def __init__(self, path):
+        self._file = open(path, 'wb', buffering=1 << 20)
+
+    def send(self, zpl):
+        self._file.write(zpl.encode('utf-8') if isinstance(zpl, str) else zpl)
+
+    def close(self):
+        self._file.close()
+
+
+class _DrainHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while self.request.recv(1 << 20):
+            pass
+
+
+class DrainServer(socketserver.ThreadingTCPServer):
+    """Servidor local que só consome os bytes (faz o papel da porta 9100)"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _DrainHandler)
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def address(self):
+        return f'127.0.0.1:{self.server_address[1]}'
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+
+# --- Benchmarks: cada um devolve (quantidade, segundos) sem contar a preparação ---
+
+def bench_ingest_csv(po, options):
+    path = po.csv_path()
+    started = time.perf_counter()
+    items, _ = read_csv(path)
+    return len(items), time.perf_counter() - started
+
+
+def bench_ingest_xlsx(po, options):
+    path = po.xlsx_path()
+    started = time.perf_counter()
+    items, _ = read_workbook(path)
+    return len(items), time.perf_counter() - started
+
+
+def bench_render_zpl(po, options):
+    with open(TEMPLATE_PATH, 'r', encoding='utf-8') as file:
+        template_text = file.read()
+    data = po.data
+    started = time.perf_counter()
+    count = 0
+    for _, _, item, sequence in iter_units(data):
+        fill_template(template_text, dict(template_values(item, sequence), RFID_DATA_HEX=unit_epc(item, sequence)))
+        count += 1
+    return count, time.perf_counter() - started
+
+
+def bench_render_preview(po, options):
+    limit = min(RENDER_SAMPLE, po.units)
+    with tempfile.TemporaryDirectory(dir=options['workdir']) as cache_dir:
+        cache = PreviewCache(cache_dir)
+        started = time.perf_counter()
+        count = render_units(po.data, 0, limit, cache=cache)
+        return count, time.perf_counter() - started
+
+
+def bench_rfid_encode(po, options):
+    data = po.data
+    started = time.perf_counter()
+    count = 0
+    for item in data:
+        barcode, po_number = item['BARCODE'][:12], parse_vpm(item['VPM']).po
+        for sequence in range(1, item['QTY'] + 1):
+            plan_encode(label_epc(barcode, po_number, sequence))
+            count += 1
+    return count, time.perf_counter() - started
+
+
+def bench_validate(po, options):
+    payload = json.dumps({'data': po.data}).encode('utf-8')
+    started = time.perf_counter()
+    validate_batch(json.loads(payload)['data'])
+    return len(payload) / 1e6, time.perf_counter() - started
+
+
+def bench_end_to_end(po, options):
+    """Validação do lote, ZPL por unidade com EPC e envio ao destino"""
+    with open(TEMPLATE_PATH, 'r', encoding='utf-8') as file:
+        template_text = file.read()
+    data = po.data
+    sink = options['sink']
+    server = None
+    if sink == 'tcp':
+        server = DrainServer()
+        sink = server.address
+    try:
+        started = time.perf_counter()
+        if sink == 'file':
+            link = FileSink(os.path.join(options['workdir'], f'sink-{po.units}.zpl'))
+        else:
+            link = open_link(sink)
+        try:
+            validate_batch(data)
+            count = 0
+            for _, _, item, sequence in iter_units(data):
+                values = dict(template_values(item, sequence), RFID_DATA_HEX=unit_epc(item, sequence))
+                link.send(fill_template(template_text, values))
+                count += 1
+        finally:
+            link.close()
+        return count * 60, time.perf_counter() - started
+    finally:
+        if server is not None:
+            server.close()
+
+
+BENCHMARKS = {
+    'ingest_csv': ('rows/s', bench_ingest_csv),
+    'ingest_xlsx': ('rows/s', bench_ingest_xlsx),
+    'render_zpl': ('labels/s', bench_render_zpl),
+    'render_preview': ('labels/s', bench_render_preview),
+    'rfid_encode': ('encodes/s', bench_rfid_encode),
+    'validate': ('MB/s', bench_validate),
+    'end_to_end': ('labels/min', bench_end_to_end),
+}
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, only=None, sink='file', repeat=DEFAULT_REPEAT):
+    """
+    {tamanho: {benchmark: {value, unit, seconds}}}; value = melhor vazão
+    entre as execuções (a preparação dos dados fica fora do tempo)
+    """
+    names = list(only or BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        raise ValueError(f'Benchmark desconhecido: {", ".join(unknown)} (use {", ".join(BENCHMARKS)})')
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='label-bench-') as workdir:
+        options = {'workdir': workdir, 'sink': sink}
+        for size in sizes:
+            po = SyntheticPO(parse_size(size), workdir)
+            runs = 1 if po.units >= LARGE_RUN_UNITS else max(1, repeat)
+            results[size] = {}
+            for name in names:
+                unit, bench = BENCHMARKS[name]
+                best, elapsed, count = None, 0.0, 0
+                while count < runs or (elapsed < MIN_BENCH_SECONDS and count < MAX_RUNS):
+                    amount, seconds = bench(po, options)
+                    if best is None or amount / seconds > best[0] / best[1]:
+                        best = (amount, seconds)
+                    elapsed += seconds
+                    count += 1
+                results[size][name] = {'value': round(best[0] / best[1], 2), 'unit': unit,
+                                       'seconds': round(best[1], 4)}
+    # As medições das etapas (print_metrics) aqui são sintéticas
+    discard()
+    return results
+
+
+def machine_info():
+    return {'python': platform.python_version(), 'machine': platform.machine(),
+            'system': platform.system(), 'cpus': os.cpu_count()}
+
+
+def baseline_path(bench_dir=DEFAULT_BENCH_DIR):
+    return os.path.join(bench_dir, 'baseline.json')
+
+
+def save_baseline(results, path):
+    """Grava (mescla) os resultados como baseline"""
+    baseline = load_baseline(path) or {'results': {}}
+    for size, benchmarks in results.items():
+        baseline['results'].setdefault(size, {}).update(benchmarks)
+    baseline.update(machine=machine_info(), updatedAt=time.strftime('%Y-%m-%d %H:%M:%S'))
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(baseline, file, indent=2)
+    os.replace(tmp_path, path)
+    return baseline
+
+
+def load_baseline(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Regressões: vazões abaixo de baseline * (1 - threshold)"""
+    regressions, compared = [], 0
+    for size, benchmarks in results.items():
+        for name, result in benchmarks.items():
+            reference = baseline.get('results', {}).get(size, {}).get(name)
+            if not reference or not reference.get('value'):
+                continue
+            compared += 1
+            change = result['value'] / reference['value'] - 1
+            if change < -threshold:
+                regressions.append({'size': size, 'benchmark': name, 'unit': result['unit'],
+                                    'baseline': reference['value'], 'value': result['value'],
+                                    'changePct': round(change * 100, 1)})
+    return regressions, compared
+
+
+def main():
+    """Função principal - run | baseline | check"""
+    args = sys.argv[1:]
+    if not args or args[0] not in ('run', 'baseline', 'check'):
+        print(json.dumps({
+            'success': False,
+            'error': 'Uso: python label_bench.py run|baseline|check [--sizes 1k,100k,1m] '
+                     '[--only ingest_csv,...] [--sink file|tcp|<host:porta>] [--repeat N] '
+                     '[--threshold 0.10] [--baseline <arquivo>]',
+            'benchmarks': list(BENCHMARKS)
+        }))
+        sys.exit(2)
+
+    command = args[0]
+    options = dict(zip(args[1::2], args[2::2]))
+    try:
+        sizes = [size for size in (options.get('--sizes') or ','.join(DEFAULT_SIZES)).split(',') if size]
+        only = [name for name in options.get('--only', '').split(',') if name] or None
+        threshold = float(options.get('--threshold', DEFAULT_THRESHOLD))
+        path = options.get('--baseline') or baseline_path()
+        baseline = load_baseline(path) if command == 'check' else None
+        if command == 'check' and baseline is None:
+            raise ValueError(f'Baseline não encontrado em {path} (rode: python label_bench.py baseline)')
+
+        results = run_benchmarks(sizes, only, options.get('--sink', 'file'),
+                                 int(options.get('--repeat', DEFAULT_REPEAT)))
+        output = {'success': True, 'results': results, 'machine': machine_info()}
+        if command == 'baseline':
+            save_baseline(results, path)
+            output['baseline'] = path
+        elif command == 'check':
+            regressions, compared = compare(results, baseline, threshold)
+            output.update(success=not regressions, threshold=threshold, compared=compared,
+                          regressions=regressions, baseline=path)
+            if regressions:
+                output['error'] = f'{len(regressions)} benchmark(s) abaixo do baseline em mais de {threshold:.0%}'
+            if baseline.get('machine') != machine_info():
+                output['warning'] = 'Baseline gravado em outra máquina/versão do Python'
+        output['timestamp'] = time.strftime('%Y-%m-%d %H:%M:%S')
+        print(json.dumps(output, indent=2))
+        if not output['success']:
+            sys.exit(1)
+    except (ValueError, OSError) as e:
+        print(json.dumps({
+            'success': False,
+            'error': str(e),
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        }))
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Exportação das etiquetas ZPL em ZIP (download do /api/generate-labels)
+O arquivo é escrito em streaming enquanto as etiquetas são geradas, sem
+montar o ZIP em memória. Compressão deflate com nível configurável (padrão
+rápido) ou sem compressão (stored). Cópias de um mesmo item geram o mesmo
+ZPL, então ele é comprimido uma vez só e reaproveitado em todas as entradas.
+Também gera um .zpl único por PO ou um lote só (para mandar direto à
+impressora), comprimido em blocos paralelos nas threads (o zlib libera o GIL).
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import struct
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from vpm_parser import parse_vpm
+
+DEFAULT_LEVEL = int(os.environ.get('EXPORT_ZIP_LEVEL', '1'))
+EXPORT_MODES = ('label', 'po', 'single')
+
+BLOCK_SIZE = 1 << 20     # bloco de compressão paralela dos lotes .zpl
+BATCH_ENTRIES = 256      # ZPLs distintos por tarefa de compressão
+
+# Mesmo layout do generateLabelZPL do backend Node (4.0" x 2.0", 203 DPI).
+# O marcador do canto superior esquerdo é o texto exato que o Node envia
+# (bytes UTF-8 do emoji lidos como Windows-1252 no server.js).
+LABEL_TEMPLATE = (
+    "^XA\n^CI28\n^LH0,0\n^MD30\n^PR5\n^PW812\n^LL406\n\n"
+    "^FO10,10^GB792,386,2,B,0^FS\n\n"
+    "^FO20,20^GB50,50,2,B,0^FS\n"
+    "^FO25,25^A0N,16,16^FD\u00f0\u0178\u2018\u00a0^FS\n\n"
+    "^FO720,20^GB70,50,2,B,0^FS\n"
+    "^FO725,25^A0N,12,12^FDPO: ^FS\n"
+    "^FO725,40^A0N,12,12^FD{ref}^FS\n\n"
+    "^FO20,80^A0N,18,18^FD{style_name}^FS\n\n"
+    "^FO20,105^A0N,14,14^FDVPM:^FS\n"
+    "^FO70,105^A0N,14,14^FD{vpm}^FS\n\n"
+    "^FO20,125^A0N,14,14^FDCOLOR:^FS\n"
+    "^FO90,125^A0N,14,14^FD{color}^FS\n"
+    "^FO400,125^A0N,14,14^FDSIZE:^FS\n"
+    "^FO450,125^A0N,14,14^FD{size}^FS\n\n"
+    "^FO200,160^BY2,2,40^BCN,40,Y,N,N^FD{barcode}^FS\n\n"
+    "^FO20,220^BQN,2,3^FDLA,ESQ-{vpm}-QTY:{qty}^FS\n\n"
+    "^FO650,220^BQN,2,3^FDLA,DIR-QR-TOP-{vpm}^FS\n\n"
+    "^FO720,370^A0N,12,12^FD{ref}^FS\n"
+    "^XZ"
+)
+
+# Registros do formato ZIP (APPNOTE), com data descriptor para streaming
+LOCAL_HEADER = struct.Struct('<IHHHHHIIIHH')
+DATA_DESCRIPTOR = struct.Struct('<IIII')
+CENTRAL_HEADER = struct.Struct('<IHHHHHHIIIHHHHHII')
+END_RECORD = struct.Struct('<IHHHHIIH')
+ZIP64_END_RECORD = struct.Struct('<IQHHIIQQQQ')
+ZIP64_LOCATOR = struct.Struct('<IIQI')
+
+FLAG_DESCRIPTOR = 0x08
+FLAG_UTF8 = 0x800
+STORED, DEFLATED = 0, 8
+LIMIT_32 = 0xFFFFFFFF
+LIMIT_16 = 0xFFFF
+# Bloco deflate final vazio: fecha a sequência de blocos com sync flush
+FINAL_BLOCK = b'\x03\x00'
+
+
+def generate_label_zpl(item):
+    """ZPL de uma unidade (mesmas regras de campo do backend Node)"""
+    vpm = str(item.get('VPM') or item.get('SKU') or 'N/A')
+    return LABEL_TEMPLATE.format(
+        style_name=str(item.get('STYLE_NAME') or item.get('NAME') or 'N/A'),
+        vpm=vpm,
+        color=str(item.get('COLOR') or 'N/A'),
+        size=str(item.get('SIZE') or 'N/A'),
+        barcode=str(item.get('BARCODE') or item.get('VPM') or 'N/A'),
+        ref=str(item.get('REF') or 'N/A'),
+        qty=str(item.get('QTY') or '1'),
+    )
+
+
+def parse_level(value):
+    """'stored' ou 0 = sem compressão; 1-9 = nível do deflate"""
+    if value is None or value == '':
+        return DEFAULT_LEVEL
+    if str(value).lower() == 'stored':
+        return 0
+    level = int(value)
+    if not 0 <= level <= 9:
+        raise ValueError(f'Nível de compressão inválido: {value} (use stored ou 0-9)')
+    return level
+
+
+def _quantity(item):
+    try:
+        return max(1, int(item.get('QTY') or 1))
+    except (TypeError, ValueError):
+        return 1
+
+
+def _deflate(data, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _deflate_block(block, level):
+    """Bloco independente terminado em sync flush (concatenável, como o pigz)"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(block) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+def _dos_datetime(timestamp):
+    t = time.localtime(timestamp)
+    return (((t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)),
+            (((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday))
+
+
+class ZipStreamWriter:
+    """
+    ZIP escrito sequencialmente em qualquer objeto com write() (arquivo ou
+    stdout) - nunca volta no arquivo. ZIP64 só no registro final, quando há
+    mais de 65535 entradas.
+    """
+
+    def __init__(self, out, level=DEFAULT_LEVEL, workers=None):
+        self.out = out
+        self.level = level
+        self.method = DEFLATED if level else STORED
+        self.workers = workers or os.cpu_count() or 1
+        self.offset = 0
+        self.entries = []
+        self._time, self._date = _dos_datetime(time.time())
+        self._executor = ThreadPoolExecutor(self.workers) if self.workers > 1 else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        elif self._executor:
+            self._executor.shutdown(cancel_futures=True)
+
+    def _write(self, data):
+        self.out.write(data)
+        self.offset += len(data)
+
+    def _check_offset(self):
+        if self.offset > LIMIT_32:
+            raise ValueError('ZIP maior que 4 GB não é suportado')
+
+    def compress(self, data):
+        """Dados da entrada conforme o método do arquivo"""
+        return _deflate(data, self.level) if self.level else data
+
+    def compress_many(self, payloads):
+        """compress() de vários ZPLs, em lotes distribuídos entre as threads"""
+        if self._executor is None or not self.level or len(payloads) < 2 * BATCH_ENTRIES:
+            return [self.compress(data) for data in payloads]
+        batches = [payloads[i:i + BATCH_ENTRIES] for i in range(0, len(payloads), BATCH_ENTRIES)]
+        results = []
+        for batch in self._executor.map(lambda batch: [self.compress(data) for data in batch], batches):
+            results.extend(batch)
+        return results
+
+    def write_compressed(self, name, data, crc, size):
+        """Entrada com dados já comprimidos (tamanhos conhecidos, sem descriptor)"""
+        self._check_offset()
+        encoded = name.encode('utf-8')
+        entry = (encoded, FLAG_UTF8, crc, len(data), size, self.offset)
+        self._write(LOCAL_HEADER.pack(0x04034b50, 20, FLAG_UTF8, self.method,
+                                      self._time, self._date, crc, len(data), size,
+                                      len(encoded), 0))
+        self._write(encoded)
+        self._write(data)
+        self.entries.append(entry)
+
+    def add(self, name, data):
+        self.write_compressed(name, self.compress(data), zlib.crc32(data), len(data))
+
+    def add_blocks(self, name, blocks):
+        """
+        Entrada grande escrita conforme os blocos (bytes) chegam: cada bloco é
+        comprimido em paralelo e gravado na ordem; CRC e tamanhos vão no data
+        descriptor no fim da entrada
+        """
+        self._check_offset()
+        encoded = name.encode('utf-8')
+        flags = FLAG_UTF8 | FLAG_DESCRIPTOR
+        header_offset = self.offset
+        self._write(LOCAL_HEADER.pack(0x04034b50, 20, flags, self.method,
+                                      self._time, self._date, 0, 0, 0, len(encoded), 0))
+        self._write(encoded)
+        start = self.offset
+        crc = size = 0
+
+        def emit(block, compressed):
+            nonlocal crc, size
+            crc = zlib.crc32(block, crc)
+            size += len(block)
+            self._write(compressed)
+
+        if not self.level:
+            for block in blocks:
+                emit(block, block)
+        elif self._executor is None:
+            for block in blocks:
+                emit(block, _deflate_block(block, self.level))
+        else:
+            pending = deque()
+            for block in blocks:
+                pending.append((block, self._executor.submit(_deflate_block, block, self.level)))
+                if len(pending) > 2 * self.workers:
+                    block, future = pending.popleft()
+                    emit(block, future.result())
+            while pending:
+                block, future = pending.popleft()
+                emit(block, future.result())
+        if self.level:
+            self._write(FINAL_BLOCK)
+
+        compressed_size = self.offset - start
+        if size > LIMIT_32 or compressed_size > LIMIT_32:
+            raise ValueError(f'Entrada maior que 4 GB não é suportada: {name}')
+        self._write(DATA_DESCRIPTOR.pack(0x08074b50, crc, compressed_size, size))
+        self.entries.append((encoded, flags, crc, compressed_size, size, header_offset))
+
+    def close(self):
+        """Diretório central e registro final"""
+        if self._executor:
+            self._executor.shutdown()
+            self._executor = None
+        self._check_offset()
+        directory_offset = self.offset
+        for encoded, flags, crc, compressed_size, size, header_offset in self.entries:
+            self._write(CENTRAL_HEADER.pack(0x02014b50, 20, 20, flags, self.method,
+                                            self._time, self._date, crc, compressed_size,
+                                            size, len(encoded), 0, 0, 0, 0, 0, header_offset))
+            self._write(encoded)
+        directory_size = self.offset - directory_offset
+        count = len(self.entries)
+
+        if count > LIMIT_16:
+            zip64_offset = self.offset
+            self._write(ZIP64_END_RECORD.pack(0x06064b50, ZIP64_END_RECORD.size - 12, 45, 45,
+                                              0, 0, count, count, directory_size,
+                                              directory_offset))
+            self._write(ZIP64_LOCATOR.pack(0x07064b50, 0, zip64_offset, 1))
+            count = LIMIT_16
+        self._write(END_RECORD.pack(0x06054b50, 0, 0, count, count,
+                                    directory_size, directory_offset, 0))
+
+
+def _batch_blocks(items, block_size=BLOCK_SIZE):
+    """ZPL de todas as unidades dos itens, concatenado em blocos de ~block_size bytes"""
+    parts = []
+    pending = 0
+    for item in items:
+        label = (generate_label_zpl(item) + '\n').encode('utf-8')
+        qty = _quantity(item)
+        parts.append(label * qty)
+        pending += len(label) * qty
+        if pending >= block_size:
+            yield b''.join(parts)
+            parts = []
+            pending = 0
+    if parts:
+        yield b''.join(parts)
+
+
+def _po_number(item):
+    return str(item.get('PO') or parse_vpm(str(item.get('VPM') or item.get('SKU') or '')).po or '0000')
+
+
+def export_labels(data, out, level=DEFAULT_LEVEL, mode='label', workers=None):
+    """
+    Escreve o ZIP das etiquetas em `out` e retorna {totalItems, totalLabels, entries}.
+    mode: 'label' (um .zpl por unidade, nomes do backend Node), 'po' (um .zpl
+    por PO) ou 'single' (um .zpl com o lote inteiro)
+    """
+    if mode not in EXPORT_MODES:
+        raise ValueError(f'Modo de exportação inválido: {mode} (use {", ".join(EXPORT_MODES)})')
+
+    total_labels = sum(_quantity(item) for item in data)
+    with ZipStreamWriter(out, level, workers) as archive:
+        if mode == 'label':
+            for start in range(0, len(data), BATCH_ENTRIES * archive.workers):
+                chunk = data[start:start + BATCH_ENTRIES * archive.workers]
+                labels = [generate_label_zpl(item).encode('utf-8') for item in chunk]
+                for item, label, compressed in zip(chunk, labels, archive.compress_many(labels)):
+                    crc = zlib.crc32(label)
+                    vpm = item.get('VPM') or 'sem-vpm'
+                    for copy in range(1, _quantity(item) + 1):
+                        counter = len(archive.entries) + 1
+                        archive.write_compressed(f"etiqueta-{counter}-{vpm}-copia-{copy}.zpl",
+                                                 compressed, crc, len(label))
+        elif mode == 'po':
+            groups = {}
+            for item in data:
+                groups.setdefault(_po_number(item), []).append(item)
+            for po_number, items in groups.items():
+                archive.add_blocks(f"etiquetas-PO{po_number}.zpl", _batch_blocks(items))
+        else:
+            archive.add_blocks('etiquetas.zpl', _batch_blocks(data))
+        entries = len(archive.entries)
+
+    return {'totalItems': len(data), 'totalLabels': total_labels, 'entries': entries}
+
+
+def main():
+    """Função principal - ZIP das etiquetas a partir de JSON via stdin"""
+    args = sys.argv[1:]
+    if len(args) < 2 or args[0] != 'zip':
+        print(json.dumps({
+            'success': False,
+            'error': 'Uso: python label_export.py zip <saida.zip|-> [--level stored|0-9] '
+                     '[--mode label|po|single] < {"data": [...]}'
+        }))
+        return
+
+    options = dict(zip(args[2::2], args[3::2]))
+    output_path = args[1]
+    try:
+        level = parse_level(options.get('--level'))
+        mode = options.get('--mode') or 'label'
+        payload = json.load(sys.stdin)
+        data = payload.get('data') or []
+        start = time.perf_counter()
+
+        if output_path == '-':
+            # Streaming para o stdout (Node repassa direto para a resposta HTTP)
+            export_labels(data, sys.stdout.buffer, level, mode)
+            sys.stdout.buffer.flush()
+            return
+
+        tmp_path = f"{output_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb', buffering=1 << 20) as file:
+                result = export_labels(data, file, level, mode)
+            os.replace(tmp_path, output_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        print(json.dumps({
+            'success': True,
+            'zipPath': output_path,
+            **result,
+            'mode': mode,
+            'level': level,
+            'bytes': os.path.getsize(output_path),
+            'exportMs': round((time.perf_counter() - start) * 1000, 1),
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        }))
+    except Exception as e:
+        if output_path == '-':
+            print(f'Erro na exportação: {e}', file=sys.stderr)
+            sys.exit(1)
+        print(json.dumps({
+            'success': False,
+            'error': str(e),
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Provas em PDF das etiquetas (um documento com uma página por unidade)
+Desenha em vetor o mesmo template ZPL do preview/impressão: os campos fixos
+viram um form XObject definido uma vez e reaproveitado em todas as páginas,
+com uma única fonte (Helvetica, sem embutir); por página só entram os campos
+variáveis. Code128/EAN-13 e QR Code são caminhos vetoriais gerados a partir
+do codificador em cache. As páginas são gravadas no arquivo conforme são
+geradas - o documento nunca fica inteiro em memória.
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+from collections import Counter
+from functools import lru_cache
+
+from barcode_encoder import encode_code128, encode_ean13, encode_qr, parse_zpl_qr_data
+from zpl_rasterizer import DPI, decode_field_hex
+from label_preview import read_template, template_values
+
+SCALE = 72 / DPI    # pontos por dot
+
+# Larguras Helvetica (1/1000 em) para ASCII 32-126, na ordem dos códigos
+_HELVETICA_WIDTHS = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+)
+_DEFAULT_WIDTH = 556
+
+
+def _quantity(item):
+    try:
+        return max(1, int(item.get('QTY') or 1))
+    except (TypeError, ValueError):
+        return 1
+
+
+def _num(value):
+    """Número PDF compacto (sem zeros à direita)"""
+    if value == int(value):
+        return str(int(value))
+    return f"{value:.3f}".rstrip('0').rstrip('.')
+
+
+def text_width(text, size):
+    """Largura do texto em Helvetica no tamanho dado"""
+    total = 0
+    for char in text:
+        code = ord(char)
+        total += _HELVETICA_WIDTHS[code - 32] if 32 <= code <= 126 else _DEFAULT_WIDTH
+    return total * size / 1000
+
+
+def _pdf_string(text):
+    """String PDF literal em WinAnsi (caracteres fora do cp1252 viram '?')"""
+    data = text.encode('cp1252', 'replace')
+    return b'(' + data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+@lru_cache(maxsize=4096)
+def _bars_path(modules, module_width, height):
+    """Barras como retângulos (uma por sequência de módulos escuros), origem no topo"""
+    ops = []
+    run_start = None
+    for index, module in enumerate(modules + '0'):
+        if module == '1' and run_start is None:
+            run_start = index
+        elif module != '1' and run_start is not None:
+            ops.append(f"{run_start * module_width} 0 {(index - run_start) * module_width} {height} re")
+            run_start = None
+    ops.append('f')
+    return '\n'.join(ops).encode('ascii')
+
+
+@lru_cache(maxsize=4096)
+def _qr_path(field_data, magnification):
+    """Módulos escuros do QR como retângulos (sequências por linha)"""
+    ecc, text = parse_zpl_qr_data(field_data)
+    matrix = encode_qr(text, ecc)
+    ops = []
+    for y, row in enumerate(matrix):
+        run_start = None
+        for x, module in enumerate(row + (0,)):
+            if module and run_start is None:
+                run_start = x
+            elif not module and run_start is not None:
+                ops.append(f"{run_start * magnification} {y * magnification} "
+                           f"{(x - run_start) * magnification} {magnification} re")
+                run_start = None
+    ops.append('f')
+    return '\n'.join(ops).encode('ascii'), len(matrix) * magnification
+
+
+class FieldPainter:
+    """
+    Operadores PDF de cada campo do template, no espaço de dots (y para baixo).
+    Com um PDFWriter, cada QR Code que aparece mais de uma vez no documento
+    (qr_counts) vira um form XObject gravado uma vez - as cópias de um item e
+    os campos repetidos da página usam o mesmo; QR único vai direto na página.
+    `page_forms` guarda os forms usados na página atual
+    """
+
+    def __init__(self, pdf=None, qr_counts=None):
+        self.pdf = pdf
+        self.qr_counts = qr_counts
+        self.qr_forms = {}
+        self.page_forms = {}
+
+    def paint(self, field, data):
+        data = decode_field_hex(data, field.hex_indicator)
+        kind = field.kind
+        if kind == 'box':
+            return self._box(field)
+        if kind == 'text':
+            return self._text(field, data)
+        if kind in ('code128', 'ean13'):
+            module_width, height, interpretation = field.params
+            encode = encode_code128 if kind == 'code128' else encode_ean13
+            modules, readable = encode(data)
+            return self._barcode(field, modules, module_width, height,
+                                 readable if interpretation else None)
+        if kind == 'qr' and data:
+            return self._qr(field, data)
+        return b''
+
+    def _qr(self, field, data):
+        (magnification,) = field.params
+        path, size = _qr_path(data, magnification)
+        top = field.y - size if field.typeset else field.y
+        position = b'q 1 0 0 1 %s %s cm' % (_num(field.x).encode(), _num(top).encode())
+        key = (data, magnification)
+        if self.pdf is None or (self.qr_counts is not None and self.qr_counts[key] <= 1):
+            return b'%s\n%s\nQ' % (position, path)
+
+        form = self.qr_forms.get(key)
+        if form is None:
+            form_id = self.pdf.reserve()
+            self.pdf.write_stream(form_id, b'/Type /XObject /Subtype /Form /BBox [0 0 %d %d]'
+                                  % (size, size), path)
+            form = self.qr_forms[key] = (b'QR%d' % len(self.qr_forms), form_id)
+        self.page_forms[form[0]] = form[1]
+        return b'%s /%s Do Q' % (position, form[0])
+
+    @staticmethod
+    def _box(field):
+        width, height, thickness, _ = field.params
+        thickness = max(1, thickness)
+        width, height = max(width, thickness), max(height, thickness)
+        top = field.y - height if field.typeset else field.y
+        outer = f"{field.x} {top} {width} {height} re"
+        if width > 2 * thickness and height > 2 * thickness:
+            # Moldura: retângulo externo menos o interno (par-ímpar)
+            inner = (f"{field.x + thickness} {top + thickness} "
+                     f"{width - 2 * thickness} {height - 2 * thickness} re")
+            return f"{outer}\n{inner}\nf*".encode('ascii')
+        return f"{outer}\nf".encode('ascii')
+
+    @staticmethod
+    def _show(text, x, baseline, height, width):
+        """Texto com a altura da fonte ZPL e largura proporcional (escala horizontal)"""
+        return b'BT /F1 %s Tf %s 0 0 -1 %s %s Tm %s Tj ET' % (
+            _num(height).encode(), _num(width / height).encode(),
+            _num(x).encode(), _num(baseline).encode(), _pdf_string(text))
+
+    def _text(self, field, data):
+        height, width = field.font
+        if field.block is None:
+            lines, block_width, max_lines, spacing, justify = [data], None, 1, 0, 'L'
+        else:
+            block_width, max_lines, spacing, justify = field.block
+            lines = data.replace('\\&', '\n').split('\n')[:max_lines]
+
+        ops = []
+        line_height = height + spacing
+        for index, line in enumerate(lines):
+            x = field.x
+            if block_width:
+                free = block_width - text_width(line, width)
+                if justify == 'C':
+                    x += max(0, free / 2)
+                elif justify == 'R':
+                    x += max(0, free)
+            if field.typeset:
+                baseline = field.y - (max_lines - 1 - index) * line_height
+            else:
+                baseline = field.y + height + index * line_height
+            ops.append(self._show(line, x, baseline, height, width))
+        return b'\n'.join(ops)
+
+    def _barcode(self, field, modules, module_width, height, readable):
+        top = field.y - height if field.typeset else field.y
+        ops = [b'q 1 0 0 1 %s %s cm\n%s\nQ' % (
+            _num(field.x).encode(), _num(top).encode(),
+            _bars_path(modules, module_width, height))]
+        if readable:
+            size = max(10, module_width * 9)
+            bars_width = len(modules) * module_width
+            x = field.x + max(0, (bars_width - text_width(readable, size)) / 2)
+            ops.append(self._show(readable, x, top + height + module_width * 2 + size,
+                                  size, size))
+        return b'\n'.join(ops)
+
+
+class PDFWriter:
+    """Objetos PDF gravados em sequência; xref e trailer no fechamento"""
+
+    def __init__(self, file):
+        self.file = file
+        self.offsets = {}
+        self.position = 0
+        self.next_id = 1
+        self._write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def _write(self, data):
+        self.file.write(data)
+        self.position += len(data)
+
+    def reserve(self):
+        object_id = self.next_id
+        self.next_id += 1
+        return object_id
+
+    def write_object(self, object_id, body):
+        self.offsets[object_id] = self.position
+        self._write(b'%d 0 obj\n%s\nendobj\n' % (object_id, body))
+
+    def write_stream(self, object_id, dictionary, data, compress=True):
+        if compress:
+            data = zlib.compress(data, 6)
+            dictionary += b' /Filter /FlateDecode'
+        self.write_object(object_id, b'<< %s /Length %d >>\nstream\n%s\nendstream'
+                          % (dictionary.strip(), len(data), data))
+
+    def close(self, root_id):
+        xref = self.position
+        count = self.next_id
+        lines = [b'xref\n0 %d\n0000000000 65535 f \n' % count]
+        for object_id in range(1, count):
+            lines.append(b'%010d 00000 n \n' % self.offsets[object_id])
+        self._write(b''.join(lines))
+        self._write(b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+                    % (count, root_id, xref))
+
+
+def qr_counts(data, template):
+    """Ocorrências de cada QR (dado, ampliação) no documento inteiro"""
+    fields = [field for field in template.variable_fields if field.kind == 'qr']
+    counts = Counter()
+    if not fields:
+        return counts
+    for item in data:
+        for copy in range(1, _quantity(item) + 1):
+            values = template_values(item, copy)
+            for field in fields:
+                value = decode_field_hex(template.field_value(field, values), field.hex_indicator)
+                counts[(value, field.params[0])] += 1
+    return counts
+
+
+def write_pdf(data, output_path, template=None):
+    """Gera o PDF de prova das unidades (QTY) dos itens; retorna o nº de páginas"""
+    template = template or read_template()
+    page_width = _num(template.width * SCALE).encode()
+    page_height = _num(template.height * SCALE).encode()
+    # Espaço de dots com y para baixo, como no ZPL
+    to_dots = b'%s 0 0 %s 0 %s cm' % (_num(SCALE).encode(), _num(-SCALE).encode(), page_height)
+
+    with open(output_path, 'wb', buffering=1 << 20) as file:
+        pdf = PDFWriter(file)
+        painter = FieldPainter(pdf, qr_counts(data, template))
+        catalog_id, pages_id, font_id, form_id = (pdf.reserve() for _ in range(4))
+
+        pdf.write_object(font_id, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica '
+                                  b'/Encoding /WinAnsiEncoding >>')
+        static = b'\n'.join(painter.paint(field, field.data or '') for field in template.static_fields)
+        pdf.write_stream(form_id, b'/Type /XObject /Subtype /Form /BBox [0 0 %d %d] '
+                                  b'/Resources << /Font << /F1 %d 0 R >> >>'
+                         % (template.width, template.height, font_id), static)
+        resources = b'/Font << /F1 %d 0 R >> /XObject << /Static %d 0 R' % (font_id, form_id)
+
+        page_ids = []
+        for item in data:
+            for copy in range(1, _quantity(item) + 1):
+                values = template_values(item, copy)
+                painter.page_forms.clear()
+                content = [b'q', to_dots, b'/Static Do']
+                content.extend(painter.paint(field, template.field_value(field, values))
+                               for field in template.variable_fields)
+                content.append(b'Q')
+                forms = b''.join(b' /%s %d 0 R' % form for form in painter.page_forms.items())
+                content_id, page_id = pdf.reserve(), pdf.reserve()
+                pdf.write_stream(content_id, b'', b'\n'.join(content))
+                pdf.write_object(page_id, b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %s %s] '
+                                          b'/Resources << %s%s >> >> /Contents %d 0 R >>'
+                                 % (pages_id, page_width, page_height, resources, forms, content_id))
+                page_ids.append(page_id)
+
+        kids = b' '.join(b'%d 0 R' % page_id for page_id in page_ids)
+        pdf.write_object(pages_id, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(page_ids)))
+        pdf.write_object(catalog_id, b'<< /Type /Catalog /Pages %d 0 R >>' % pages_id)
+        pdf.close(catalog_id)
+    return len(page_ids)
+
+
+def main():
+    """Função principal - PDF de prova a partir de JSON via stdin"""
+    if len(sys.argv) < 3 or sys.argv[1] != 'generate':
+        print(json.dumps({
+            'success': False,
+            'error': 'Uso: python label_pdf.py generate <saida.pdf> < {"data": [...]}'
+        }))
+        return
+
+    try:
+        payload = json.load(sys.stdin)
+        data = payload.get('data') or []
+        start = time.perf_counter()
+        output_path = sys.argv[2]
+        pages = write_pdf(data, output_path)
+        print(json.dumps({
+            'success': True,
+            'pdfPath': output_path,
+            'totalItems': len(data),
+            'totalPages': pages,
+            'bytes': os.path.getsize(output_path),
+            'renderMs': round((time.perf_counter() - start) * 1000, 1),
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        }))
+    except Exception as e:
+        print(json.dumps({
+            'success': False,
+            'error': str(e),
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Geração de previews das etiquetas a partir do template de impressão
+Usa o rasterizador ZPL nativo sobre o mesmo TEMPLATE_LARROUD_ORIGINAL.zpl
+enviado para a impressora, então o preview bate com a etiqueta impressa.
+Os PNGs ficam no cache de previews (preview_cache.py), então repetir o preview
+do mesmo upload não renderiza de novo.
+As unidades de um item só diferem no barcode sequencial: cada face distinta
+(valores sem os campos por unidade) é renderizada uma vez, e cada unidade
+recebe só a sobreposição desses campos (PNG transparente recortado).
+Para a API paginada: `page` devolve só os metadados e as chaves dos PNGs de
+um intervalo de unidades (sem renderizar), e `render` gera no cache o PNG
+completo e a miniatura das unidades do intervalo que ainda faltam; `warm`
+faz o mesmo para a primeira página logo após o upload.
+Pode ser chamado como subprocesso pelo Node.js
+"""
+
+import os
+import sys
+import json
+import time
+import base64
+
+from print_metrics import now, stage_histogram
+from zpl_rasterizer import DPI, load_template, bitmap_to_png, bitmap_to_thumbnail_png
+from preview_cache import DEFAULT_CACHE_DIR, PreviewCache, make_cache_key
+from vpm_parser import parse_vpm
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE_PATH = os.path.join(BASE_DIR, 'backend', 'TEMPLATE_LARROUD_ORIGINAL.zpl')
+
+# Campos que mudam a cada unidade do mesmo item (o resto define a face)
+UNIT_FIELDS = ('BARCODE', 'RFID_DATA_HEX')
+
+THUMB_FACTOR = int(os.environ.get('PREVIEW_THUMB_FACTOR', '4'))
+IMAGE_SIZES = ('full', 'thumb')
+PAGE_SIZE = 24
+WARM_UNITS = int(os.environ.get('PREVIEW_WARM_UNITS', str(PAGE_SIZE)))
+
+COMMANDS = ('generate', 'warm', 'page', 'render')
+
+
+def read_template(template_path=TEMPLATE_PATH):
+    """Lê o template oficial (interpretado e cacheado pelo rasterizador)"""
+    with open(template_path, 'r', encoding='utf-8') as file:
+        return load_template(file.read())
+
+
+def template_values(item, sequence=1):
+    """Valores do template para uma unidade (mesma regra do /api/print-individual)"""
+    style_name = str(item.get('STYLE_NAME') or item.get('NAME') or 'N/A')
+    vpm = str(item.get('VPM') or item.get('SKU') or 'N/A')
+    color = str(item.get('COLOR') or 'N/A')
+    size = str(item.get('SIZE') or 'N/A')
+
+    record = parse_vpm(vpm)
+
+    # PO já extraído no upload, ou extraído do VPM (L264-... -> 264)
+    po_number = str(item.get('PO') or record.po or '0000')
+
+    # Barcode sequencial: barcode + PO + sequencial
+    barcode_source = str(item.get('BARCODE') or record.compact or '00000000')
+    sequential_barcode = f"{barcode_source[:8]}{po_number}{sequence}"
+
+    return {
+        'STYLE_NAME': style_name,
+        'VPM': vpm,
+        'COLOR': color,
+        'SIZE': size,
+        'QR_DATA': vpm,
+        'PO_INFO': f"PO{po_number}",
+        'LOCAL_INFO': f"Local.{record.local_number}",
+        'BARCODE': sequential_barcode,
+        'RFID_DATA_HEX': '',
+    }
+
+
+def render_preview_png(template, item, sequence=1):
+    """PNG (bytes) de uma unidade"""
+    return bitmap_to_png(template.render(template_values(item, sequence)))
+
+
+def face_values(values):
+    """Valores que definem a face (sem os campos por unidade)"""
+    return {name: value for name, value in values.items() if name not in UNIT_FIELDS}
+
+
+def face_key(template, values):
+    """Chave da face no cache (versão do template, valores da face, dpi)"""
+    return make_cache_key(f'{template.version}:face', face_values(values), DPI)
+
+
+def unit_field_groups(template):
+    """(nome, campos) de cada campo por unidade presente no template"""
+    groups = [(name, template.fields_using([name])) for name in UNIT_FIELDS]
+    return [(name, fields) for name, fields in groups if fields]
+
+
+def render_face_png(template, values):
+    """PNG da face: a etiqueta sem os campos por unidade"""
+    exclude = [field for _, fields in unit_field_groups(template) for field in fields]
+    return bitmap_to_png(template.render(values, exclude=exclude))
+
+
+def _data_url(png):
+    return 'data:image/png;base64,' + base64.b64encode(png).decode('ascii')
+
+
+def unit_overlays(template, unit_fields, values):
+    """Sobreposições da unidade: um PNG transparente por campo por unidade"""
+    overlays = []
+    for name, fields in unit_fields:
+        overlay = template.render_overlay(fields, values)
+        if overlay is None:
+            continue
+        x, y, bitmap = overlay
+        overlays.append({
+            'field': name,
+            'x': x,
+            'y': y,
+            'width': int(bitmap.shape[1]),
+            'height': int(bitmap.shape[0]),
+            'image': _data_url(bitmap_to_png(bitmap, transparent=True)),
+        })
+    return overlays
+
+
+def generate_previews(data, template_path=TEMPLATE_PATH, cache=None):
+    """
+    Gera os previews de todas as unidades (QTY) no formato da API
+    Retorna (faces, previews): faces = {faceId: PNG}, e cada preview aponta
+    para a sua face com as sobreposições dos campos por unidade
+    """
+    template = read_template(template_path)
+    cache = cache or PreviewCache()
+    unit_fields = unit_field_groups(template)
+    faces = {}
+    previews = []
+    render = stage_histogram('render')
+
+    for item_index, item in enumerate(data):
+        qty = _quantity(item)
+        for copy in range(1, qty + 1):
+            started = now()
+            values = template_values(item, copy)
+            face_id = face_key(template, values)
+            if face_id not in faces:
+                faces[face_id] = _data_url(cache.get_or_render(
+                    face_id, lambda: render_face_png(template, values)))
+            previews.append(dict(
+                _preview_fields(item, item_index, values, copy, qty),
+                faceId=face_id,
+                overlays=unit_overlays(template, unit_fields, values),
+            ))
+            render.since(started)
+
+    return faces, previews
+
+
+def _preview_fields(item, item_index, values, copy, qty):
+    """Metadados de uma unidade na resposta da API"""
+    return {
+        'id': item.get('VPM') or item.get('SKU') or f"item-{item_index}",
+        'styleName': values['STYLE_NAME'],
+        'vpm': values['VPM'],
+        'color': values['COLOR'],
+        'size': values['SIZE'],
+        'barcode': values['BARCODE'],
+        'ref': str(item.get('REF') or 'N/A'),
+        'qty': item.get('QTY') or 1,
+        'itemIndex': item_index,
+        'copyNumber': copy,
+        'totalCopies': qty,
+    }
+
+
+def image_key(template, values, size):
+    """Chave do PNG da unidade no cache (a miniatura tem resolução própria)"""
+    resolution = DPI if size == 'full' else [DPI, 'thumb', THUMB_FACTOR]
+    return make_cache_key(template.version, values, resolution)
+
+
+def iter_units(data, cursor=0, limit=None):
+    """(unidade, índice do item, item, cópia) a partir da unidade `cursor` (0 = primeira)"""
+    position = 0
+    end = None if limit is None else cursor + limit
+    for item_index, item in enumerate(data):
+        qty = _quantity(item)
+        first = max(cursor - position, 0)
+        for offset in range(first, qty):
+            unit = position + offset
+            if end is not None and unit >= end:
+                return
+            yield unit, item_index, item, offset + 1
+        position += qty
+
+
+def page_units(data, cursor=0, limit=PAGE_SIZE, template_path=TEMPLATE_PATH):
+    """Página de unidades: metadados e chaves dos PNGs, sem renderizar"""
+    template = read_template(template_path)
+    units = []
+    for unit, item_index, item, copy in iter_units(data, cursor, limit):
+        values = template_values(item, copy)
+        units.append(dict(
+            _preview_fields(item, item_index, values, copy, _quantity(item)),
+            unit=unit,
+            **{size: image_key(template, values, size) for size in IMAGE_SIZES},
+        ))
+    total = sum(_quantity(item) for item in data)
+    next_cursor = cursor + len(units)
+    return {
+        'units': units,
+        'cursor': cursor,
+        'nextCursor': next_cursor if next_cursor < total else None,
+        'totalLabels': total,
+    }
+
+
+def render_units(data, cursor=0, limit=PAGE_SIZE, template_path=TEMPLATE_PATH, cache=None):
+    """Gera no cache o PNG completo e a miniatura das unidades que faltam"""
+    template = read_template(template_path)
+    cache = cache or PreviewCache()
+    unit_fields = [field for _, fields in unit_field_groups(template) for field in fields]
+    faces = {}
+    rendered = 0
+    render = stage_histogram('render')
+
+    for _, _, item, copy in iter_units(data, cursor, limit):
+        started = now()
+        values = template_values(item, copy)
+        keys = {size: image_key(template, values, size) for size in IMAGE_SIZES}
+        missing = [size for size, key in keys.items() if key not in cache]
+        if not missing:
+            continue
+        face_id = face_key(template, values)
+        if face_id not in faces:
+            faces[face_id] = template.render(values, exclude=unit_fields)
+        bitmap = template.draw_fields(faces[face_id].copy(), unit_fields, values)
+        for size in missing:
+            png = bitmap_to_png(bitmap) if size == 'full' else bitmap_to_thumbnail_png(bitmap, THUMB_FACTOR)
+            cache.put(keys[size], png)
+        rendered += 1
+        render.since(started)
+
+    return rendered
+
+
+def warm_cache(data, limit=WARM_UNITS, template_path=TEMPLATE_PATH, cache=None):
+    """
+    Deixa no cache o PNG completo e a miniatura das primeiras unidades - as
+    mesmas chaves que a primeira página do preview paginado vai pedir
+    """
+    return render_units(data, 0, limit, template_path, cache)
+
+
+def _quantity(item):
+    try:
+        return max(1, int(item.get('QTY') or 1))
+    except (TypeError, ValueError):
+        return 1
+
+
+def main():
+    """Função principal - API mode (dados JSON via stdin)"""
+    if len(sys.argv) < 2:
+        print(json.dumps({
+            'success': False,
+            'error': 'Comando não especificado',
+            'available_commands': list(COMMANDS)
+        }))
+        return
+
+    command = sys.argv[1]
+    if command not in COMMANDS:
+        print(json.dumps({
+            'success': False,
+            'error': f'Comando desconhecido: {command}',
+            'available_commands': list(COMMANDS)
+        }))
+        return
+
+    try:
+        payload = json.load(sys.stdin)
+        data = payload.get('data') or []
+        start = time.perf_counter()
+        if command in ('page', 'render'):
+            cursor = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+            limit = int(sys.argv[3]) if len(sys.argv) > 3 else PAGE_SIZE
+            if command == 'page':
+                result = dict(page_units(data, cursor, limit), cacheDir=DEFAULT_CACHE_DIR)
+            else:
+                result = {'rendered': render_units(data, cursor, limit)}
+            print(json.dumps({
+                'success': True,
+                **result,
+                'renderMs': round((time.perf_counter() - start) * 1000, 1),
+                'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+            }))
+            return
+
+        if command == 'warm':
+            rendered = warm_cache(data)
+            print(json.dumps({
+                'success': True,
+                'rendered': rendered,
+                'renderMs': round((time.perf_counter() - start) * 1000, 1),
+                'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+            }))
+            return
+
+        faces, previews = generate_previews(data)
+        template = read_template()
+        print(json.dumps({
+            'success': True,
+            'faces': faces,
+            'labelWidth': template.width,
+            'labelHeight': template.height,
+            'distinctFaces': len(faces),
+            'previews': previews,
+            'totalItems': len(data),
+            'totalLabels': len(previews),
+            'previewCount': len(previews),
+            'renderMs': round((time.perf_counter() - start) * 1000, 1),
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        }))
+    except Exception as e:
+        print(json.dumps({
+            'success': False,
+            'error': str(e),
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        }))
+
+
+if __name__ == "__main__":
+    main()
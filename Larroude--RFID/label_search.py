@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Índice de pesquisa das linhas do upload (montado na ingestão)
+Cada campo é gravado codificado por dicionário em arrays numpy (.npy,
+abertos com mmap na consulta): valores distintos, códigos por linha e a
+lista invertida valor -> linhas. Nos campos pesquisáveis (STYLE_NAME, VPM,
+COLOR, SIZE, BARCODE, DESCRIPTION, PO) há ainda os valores em minúsculas
+ordenados (prefixo e filtro exato por busca binária) e um índice de
+trigramas (trigrama -> valores distintos que o contêm). Termos com 3 ou mais
+caracteres são procurados como substring (interseção das listas de
+trigramas, confirmada só nos candidatos); termos mais curtos, como prefixo.
+A consulta devolve só uma página de linhas e o cursor da próxima.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import secrets
+
+import numpy as np
+
+from label_store import StringColumn
+from upload_diff import ROW_FIELDS
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_INDEX_DIR = os.environ.get(
+    'SEARCH_INDEX_DIR', os.path.join(BASE_DIR, 'backend', 'output', 'search'))
+MAX_INDEXES = int(os.environ.get('SEARCH_INDEX_MAX', '20'))
+
+SEARCH_FIELDS = ('STYLE_NAME', 'VPM', 'COLOR', 'SIZE', 'BARCODE', 'DESCRIPTION', 'PO')
+INDEX_VERSION = 1
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Acima de 1/GATHER_FRACTION das linhas a máscara é montada pelos códigos da
+# coluna, não pela lista invertida
+GATHER_FRACTION = 4
+INDEX_ID_RE = re.compile(r'[0-9a-f]{24}')
+
+
+def new_index_id():
+    """
+    Id (opaco) de um novo índice: um por upload, para que outro arquivo com o
+    mesmo nome não substitua o índice que um cliente está consultando
+    """
+    return secrets.token_hex(12)
+
+
+def _encoded(values):
+    """Textos -> array de bytes UTF-8 ('S'), sem perder valores vazios"""
+    encoded = [value.encode('utf-8') for value in values]
+    width = max(map(len, encoded), default=0)
+    return np.array(encoded, dtype=f'S{max(width, 1)}')
+
+
+def _dictionary(column):
+    """(valores distintos, códigos uint32) de uma StringColumn ou lista"""
+    if not isinstance(column, StringColumn):
+        values = column
+        column = StringColumn()
+        column.extend([str(value) for value in values])
+    return column.values, np.frombuffer(column.codes, dtype=np.uint32) \
+        if len(column) else np.zeros(0, dtype=np.uint32)
+
+
+def _postings(codes, count):
+    """Lista invertida valor -> linhas (linhas agrupadas por código + início de cada grupo)"""
+    rows = np.argsort(codes, kind='stable').astype(np.uint32)
+    starts = np.zeros(count + 1, dtype=np.uint64)
+    np.cumsum(np.bincount(codes, minlength=count), out=starts[1:])
+    return rows, starts
+
+
+def _trigrams(lower):
+    """Índice de trigramas (bytes) -> ids dos valores: chaves, inícios, ids"""
+    n = len(lower)
+    width = lower.dtype.itemsize
+    if n == 0 or width < 3:
+        return (np.zeros(0, dtype=np.uint32), np.zeros(1, dtype=np.uint64),
+                np.zeros(0, dtype=np.uint32))
+    raw = lower.view(np.uint8).reshape(n, width).astype(np.uint32)
+    lengths = np.char.str_len(lower)
+    ids = np.arange(n, dtype=np.uint64)
+    pairs = []
+    for j in range(width - 2):
+        present = lengths >= j + 3
+        if not present.any():
+            break
+        grams = (raw[present, j] << 16) | (raw[present, j + 1] << 8) | raw[present, j + 2]
+        pairs.append((grams.astype(np.uint64) << np.uint64(32)) | ids[present])
+    # (trigrama << 32 | id) ordenado: agrupa por trigrama com os ids em ordem
+    pairs = np.concatenate(pairs)
+    pairs.sort()
+    distinct = np.ones(len(pairs), dtype=bool)
+    distinct[1:] = pairs[1:] != pairs[:-1]
+    pairs = pairs[distinct]
+    grams = (pairs >> np.uint64(32)).astype(np.uint32)
+    first = np.ones(len(grams), dtype=bool)
+    first[1:] = grams[1:] != grams[:-1]
+    boundaries = np.flatnonzero(first)
+    starts = np.append(boundaries, len(grams)).astype(np.uint64)
+    return grams[boundaries], starts, (pairs & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+
+
+def build_index(index, columns, index_dir=DEFAULT_INDEX_DIR):
+    """
+    Grava o índice das colunas do upload ({campo: StringColumn | lista}, ver
+    ItemColumns.row_columns) substituindo o anterior do mesmo id
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    target = os.path.join(index_dir, index)
+    building = f'{target}.{os.getpid()}.tmp'
+    os.makedirs(building, exist_ok=True)
+
+    rows = 0
+    for field in ROW_FIELDS:
+        values, codes = _dictionary(columns[field])
+        rows = len(codes)
+        arrays = {'values': _encoded(values), 'codes': codes}
+        if field in SEARCH_FIELDS:
+            lower = _encoded([value.lower() for value in values])
+            arrays['lower'] = lower
+            arrays['order'] = np.argsort(lower, kind='stable').astype(np.uint32)
+            arrays['rows'], arrays['starts'] = _postings(codes, len(values))
+            arrays['gram_keys'], arrays['gram_starts'], arrays['gram_ids'] = _trigrams(lower)
+        for name, array in arrays.items():
+            np.save(os.path.join(building, f'{field}.{name}.npy'), array)
+
+    with open(os.path.join(building, 'meta.json'), 'w', encoding='utf-8') as file:
+        json.dump({'version': INDEX_VERSION, 'rows': rows, 'fields': list(ROW_FIELDS),
+                   'searchFields': list(SEARCH_FIELDS)}, file)
+
+    # Troca o diretório inteiro (consultas em andamento terminam no índice antigo)
+    previous = f'{target}.{os.getpid()}.old'
+    if os.path.exists(target):
+        os.replace(target, previous)
+    os.replace(building, target)
+    shutil.rmtree(previous, ignore_errors=True)
+    _prune(index_dir)
+    return {'searchId': index, 'rows': rows}
+
+
+def _prune(index_dir):
+    """Mantém só os MAX_INDEXES índices montados mais recentemente"""
+    entries = [entry for entry in os.scandir(index_dir)
+               if entry.is_dir() and INDEX_ID_RE.fullmatch(entry.name)]
+    if len(entries) <= MAX_INDEXES:
+        return
+    entries.sort(key=lambda entry: entry.stat().st_mtime)
+    for entry in entries[:len(entries) - MAX_INDEXES]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+
+class SearchIndex:
+    """Índice gravado por build_index, aberto sob demanda (mmap)"""
+
+    def __init__(self, index, index_dir=DEFAULT_INDEX_DIR):
+        if not INDEX_ID_RE.fullmatch(str(index)):
+            raise ValueError(f'Id de pesquisa inválido: {index}')
+        self.path = os.path.join(index_dir, index)
+        try:
+            with open(os.path.join(self.path, 'meta.json'), 'r', encoding='utf-8') as file:
+                meta = json.load(file)
+        except OSError:
+            raise FileNotFoundError('Índice de pesquisa não encontrado (envie o arquivo novamente)')
+        if meta.get('version') != INDEX_VERSION:
+            raise FileNotFoundError('Índice de pesquisa desatualizado (envie o arquivo novamente)')
+        self.rows = meta['rows']
+        self.fields = tuple(meta['fields'])
+        self._arrays = {}
+
+    def array(self, field, name):
+        key = (field, name)
+        if key not in self._arrays:
+            self._arrays[key] = np.load(os.path.join(self.path, f'{field}.{name}.npy'),
+                                        mmap_mode='r')
+        return self._arrays[key]
+
+    # --- Valores distintos ---
+
+    def _prefix_ids(self, field, prefix):
+        """Ids dos valores que começam com o prefixo (busca binária nos valores ordenados)"""
+        lower, order = self.array(field, 'lower'), self.array(field, 'order')
+        if len(prefix) > lower.dtype.itemsize:
+            return np.zeros(0, dtype=np.uint32)
+        start = np.searchsorted(lower, prefix, side='left', sorter=order)
+        # Maior texto com o prefixo < prefixo + 0xFF... (bytes UTF-8 nunca valem 0xFF)
+        end = np.searchsorted(lower, prefix + b'\xff' * (lower.dtype.itemsize - len(prefix)),
+                              side='right', sorter=order)
+        return np.asarray(order[start:end])
+
+    def _exact_ids(self, field, value):
+        lower, order = self.array(field, 'lower'), self.array(field, 'order')
+        start = np.searchsorted(lower, value, side='left', sorter=order)
+        end = np.searchsorted(lower, value, side='right', sorter=order)
+        return np.asarray(order[start:end])
+
+    def _substring_ids(self, field, term):
+        """Ids dos valores que contêm o termo (trigramas + confirmação nos candidatos)"""
+        keys = self.array(field, 'gram_keys')
+        starts, ids = self.array(field, 'gram_starts'), self.array(field, 'gram_ids')
+        grams = {(term[j] << 16) | (term[j + 1] << 8) | term[j + 2] for j in range(len(term) - 2)}
+        lists = []
+        for gram in grams:
+            position = np.searchsorted(keys, gram)
+            if position >= len(keys) or keys[position] != gram:
+                return np.zeros(0, dtype=np.uint32)
+            lists.append((int(starts[position + 1] - starts[position]), position))
+        # Parte da lista mais curta; as demais (ordenadas) só são sondadas por busca binária
+        lists.sort()
+        candidates = None
+        for _, position in lists:
+            posting = ids[int(starts[position]):int(starts[position + 1])]
+            if candidates is None:
+                candidates = np.asarray(posting)
+            else:
+                found = np.minimum(np.searchsorted(posting, candidates), len(posting) - 1)
+                candidates = candidates[posting[found] == candidates]
+            if not len(candidates):
+                return candidates
+        if len(term) > 3:
+            lower = self.array(field, 'lower')
+            candidates = candidates[np.char.find(lower[candidates], term) >= 0]
+        return candidates
+
+    # --- Linhas ---
+
+    def _mark_rows(self, mask, field, ids):
+        """Marca na máscara as linhas cujo valor do campo está em ids"""
+        if not len(ids):
+            return
+        rows, starts = self.array(field, 'rows'), self.array(field, 'starts')
+        first = starts[ids].astype(np.int64)
+        counts = starts[ids + 1].astype(np.int64) - first
+        total = int(counts.sum())
+        if total > self.rows // GATHER_FRACTION:
+            # Muitas linhas: mais barato percorrer os códigos da coluna
+            matches = np.zeros(len(self.array(field, 'values')), dtype=bool)
+            matches[ids] = True
+            mask |= matches[self.array(field, 'codes')]
+            return
+        # Concatena os trechos da lista invertida (posições de cada linha em rows)
+        offsets = np.cumsum(counts) - counts
+        positions = np.repeat(first - offsets, counts) + np.arange(total)
+        mask[rows[positions]] = True
+
+    def _term_rows(self, term, fields):
+        mask = np.zeros(self.rows, dtype=bool)
+        for field in fields:
+            ids = self._substring_ids(field, term) if len(term) >= 3 \
+                else self._prefix_ids(field, term)
+            self._mark_rows(mask, field, ids)
+        return mask
+
+    def row(self, number):
+        item = {field: self.array(field, 'values')[self.array(field, 'codes')[number]]
+                .decode('utf-8') for field in self.fields}
+        item['QTY'] = int(item['QTY']) if item['QTY'].isdigit() else item['QTY']
+        return dict(item, row=int(number))
+
+    def search(self, query='', filters=None, cursor=0, limit=PAGE_SIZE, fields=SEARCH_FIELDS):
+        """
+        Página de linhas que contêm todos os termos da consulta (em qualquer
+        um dos campos) e batem com os filtros exatos {campo: valor}. cursor =
+        número da linha a partir da qual continuar (nextCursor da página anterior)
+        """
+        started = time.perf_counter()
+        terms = [term.encode('utf-8') for term in dict.fromkeys(str(query or '').lower().split())]
+        filters = {field: str(value) for field, value in (filters or {}).items() if value not in (None, '')}
+        for field in list(filters) + list(fields):
+            if field not in SEARCH_FIELDS:
+                raise ValueError(f'Campo sem índice: {field} (use {", ".join(SEARCH_FIELDS)})')
+        cursor = max(0, int(cursor or 0))
+        limit = min(MAX_PAGE_SIZE, max(1, int(limit or PAGE_SIZE)))
+
+        mask = None
+        for term in terms:
+            rows = self._term_rows(term, fields)
+            mask = rows if mask is None else mask & rows
+        for field, value in filters.items():
+            rows = np.zeros(self.rows, dtype=bool)
+            self._mark_rows(rows, field, self._exact_ids(field, value.lower().encode('utf-8')))
+            mask = rows if mask is None else mask & rows
+
+        if mask is None:
+            total = self.rows
+            page = np.arange(cursor, min(cursor + limit + 1, total))
+        else:
+            hits = np.flatnonzero(mask)
+            total = len(hits)
+            position = np.searchsorted(hits, cursor)
+            page = hits[position:position + limit + 1]
+        next_cursor = int(page[limit]) if len(page) > limit else None
+        items = [self.row(number) for number in page[:limit]]
+        return {
+            'items': items,
+            'total': total,
+            'totalRows': self.rows,
+            'cursor': cursor,
+            'nextCursor': next_cursor,
+            'searchMs': round((time.perf_counter() - started) * 1000, 2),
+        }
+
+
+def main():
+    """Função principal - consulta paginada (JSON via stdin: {q, filters, cursor, limit})"""
+    if len(sys.argv) < 3 or sys.argv[1] != 'query':
+        print(json.dumps({
+            'success': False,
+            'error': 'Uso: python label_search.py query <searchId> '
+                     '< {"q": "...", "filters": {"COLOR": "..."}, "cursor": 0, "limit": 50}'
+        }))
+        return
+
+    try:
+        text = sys.stdin.read()
+        payload = json.loads(text) if text.strip() else {}
+        result = SearchIndex(sys.argv[2]).search(
+            payload.get('q', ''), payload.get('filters'),
+            payload.get('cursor', 0), payload.get('limit', PAGE_SIZE))
+        print(json.dumps({
+            'success': True,
+            **result,
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        }))
+    except Exception as e:
+        print(json.dumps({
+            'success': False,
+            'error': str(e),
+            'errorStatus': _error_status(e),
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        }))
+
+
+def _error_status(error):
+    """Status HTTP da falha: índice inexistente/expirado (404), consulta inválida (400)"""
+    if isinstance(error, FileNotFoundError):
+        return 404
+    if isinstance(error, (ValueError, TypeError)):
+        return 400
+    return None
+
+
+if __name__ == "__main__":
+    main()
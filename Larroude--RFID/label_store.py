@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Armazenamento compacto das etiquetas da fila
+Colunas paralelas em arrays tipados: campos texto (STYLE NAME, VPM, COLOR,
+SIZE, barcode, PO) codificados por dicionário e inteiros para sequencial e QTY.
+Cada linha é uma visão (LabelRow) sem cópia dos dados, acessível como o dict
+usado antes (label['style_name']).
+"""
+
+import sys
+import json
+from array import array
+
+STRING_FIELDS = ('style_name', 'vpm', 'color', 'size', 'barcode', 'po')
+INT_FIELDS = ('sequence', 'qty')
+FIELDS = STRING_FIELDS + INT_FIELDS
+
+
+class StringColumn:
+    """Coluna de texto codificada por dicionário (valores distintos + códigos)"""
+
+    __slots__ = ('values', 'codes', '_index')
+
+    def __init__(self):
+        self.values = []
+        self.codes = array('I')
+        self._index = {}
+
+    def encode(self, value):
+        """Código do valor (entra no dicionário se for novo)"""
+        code = self._index.get(value)
+        if code is None:
+            code = len(self.values)
+            self._index[value] = code
+            self.values.append(value)
+        return code
+
+    def append(self, value):
+        self.codes.append(self.encode(value))
+
+    def extend(self, values):
+        """Adiciona vários valores; só os distintos novos passam pelo dicionário"""
+        index = self._index
+        for value in dict.fromkeys(values):
+            if value not in index:
+                index[value] = len(self.values)
+                self.values.append(value)
+        self.codes.extend(map(index.__getitem__, values))
+
+    def __getitem__(self, index):
+        return self.values[self.codes[index]]
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def nbytes(self):
+        return (self.codes.itemsize * len(self.codes)
+                + sum(sys.getsizeof(value) for value in self.values))
+
+
+class LabelRow:
+    """Visão de uma etiqueta do LabelStore (sem cópia)"""
+
+    __slots__ = ('_store', 'index')
+
+    def __init__(self, store, index):
+        self._store = store
+        self.index = index
+
+    def __getitem__(self, field):
+        return self._store.get(self.index, field)
+
+    def __getattr__(self, field):
+        if field in FIELDS:
+            return self._store.get(self.index, field)
+        raise AttributeError(field)
+
+    def get(self, field, default=None):
+        return self._store.get(self.index, field) if field in FIELDS else default
+
+    def keys(self):
+        return FIELDS
+
+    def as_dict(self):
+        return {field: self._store.get(self.index, field) for field in FIELDS}
+
+    def __repr__(self):
+        return f"LabelRow({self.index}, {self.as_dict()!r})"
+
+
+class LabelStore:
+    """Fila de etiquetas em colunas paralelas"""
+
+    __slots__ = ('_strings', '_ints')
+
+    def __init__(self):
+        self._strings = {field: StringColumn() for field in STRING_FIELDS}
+        self._ints = {field: array('I') for field in INT_FIELDS}
+
+    def append(self, style_name, vpm, color, size, barcode='', po='', sequence=1, qty=1):
+        """Adiciona uma etiqueta e retorna o índice"""
+        strings = self._strings
+        strings['style_name'].append(style_name)
+        strings['vpm'].append(vpm)
+        strings['color'].append(color)
+        strings['size'].append(size)
+        strings['barcode'].append(barcode)
+        strings['po'].append(po)
+        self._ints['sequence'].append(sequence)
+        self._ints['qty'].append(qty)
+        return len(self) - 1
+
+    def extend_items(self, data):
+        """Expande itens da API (com QTY) em uma etiqueta por unidade"""
+        for item in data:
+            try:
+                qty = max(1, int(item.get('QTY') or 1))
+            except (TypeError, ValueError):
+                qty = 1
+            fields = (
+                str(item.get('STYLE_NAME') or item.get('NAME') or 'N/A'),
+                str(item.get('VPM') or item.get('SKU') or 'N/A'),
+                str(item.get('COLOR') or 'N/A'),
+                str(item.get('SIZE') or 'N/A'),
+                str(item.get('BARCODE') or ''),
+                str(item.get('PO') or ''),
+            )
+            for sequence in range(1, qty + 1):
+                self.append(*fields, sequence=sequence, qty=qty)
+        return self
+
+    def get(self, index, field):
+        column = self._strings.get(field)
+        if column is not None:
+            return column[index]
+        return self._ints[field][index]
+
+    def column(self, field):
+        """Coluna inteira (StringColumn ou array de inteiros)"""
+        column = self._strings.get(field)
+        return column if column is not None else self._ints[field]
+
+    def __len__(self):
+        return len(self._ints['sequence'])
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('índice de etiqueta fora do intervalo')
+        return LabelRow(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield LabelRow(self, index)
+
+    @property
+    def nbytes(self):
+        """Memória aproximada das colunas (códigos + valores distintos)"""
+        return (sum(column.nbytes for column in self._strings.values())
+                + sum(column.itemsize * len(column) for column in self._ints.values()))
+
+
+def main():
+    """Função principal - resumo da fila a partir de JSON via stdin"""
+    try:
+        payload = json.load(sys.stdin)
+        store = LabelStore().extend_items(payload.get('data') or [])
+        print(json.dumps({
+            'success': True,
+            'totalLabels': len(store),
+            'distinct': {field: len(store.column(field).values) for field in STRING_FIELDS},
+            'nbytes': store.nbytes,
+            'bytesPerLabel': round(store.nbytes / len(store), 1) if len(store) else 0
+        }))
+    except Exception as e:
+        print(json.dumps({
+            'success': False,
+            'error': str(e)
+        }))
+
+
+if __name__ == "__main__":
+    main()
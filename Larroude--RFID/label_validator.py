@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Validação prévia (pre-flight) de um lote inteiro antes da impressão
+Todas as regras são aplicadas de uma vez sobre colunas: cada regex é compilado
+uma vez e varre a coluna concatenada, comprimentos e sequenciais são calculados
+com NumPy. Um lote com erro é rejeitado antes de a impressora consumir etiquetas.
+Pode ser chamado como subprocesso pelo Node.js
+"""
+
+import os
+import re
+import sys
+import json
+import time
+
+import numpy as np
+
+from print_metrics import span
+from vpm_parser import parse_vpm
+
+RFID_LENGTH = 24           # ^RFW,H,2,12 grava 12 bytes = 24 caracteres
+MIN_BARCODE_DIGITS = 12
+MIN_VPM_PARTS = 5
+MAX_REPORTED_ERRORS = 1000
+# EPC repetido só bloqueia o lote com a flag: o sequencial não tem largura fixa
+# no EPC (a cópia 1 e a cópia 10 do mesmo item coincidem) e, por enquanto, o
+# caso é só aviso para não rejeitar POs normais com QTY >= 10
+STRICT_RFID = os.environ.get('LABEL_VALIDATOR_STRICT_RFID', '0') == '1'
+
+
+
+def _line_scanner(valid):
+    """
+    Regex que percorre a coluna (uma linha por registro) pulando de uma vez as
+    linhas válidas; cada casamento termina numa linha inválida (grupo 1)
+    """
+    return re.compile(r'(?:%s\n)*+(?:([^\n]*)\n|\Z)' % valid)
+
+
+_VALID_BARCODE = _line_scanner(r'[0-9]{%d,}' % MIN_BARCODE_DIGITS)
+_VALID_VPM = _line_scanner(r'(?:[^-\n]*+-){%d}[^\n]*+' % (MIN_VPM_PARTS - 1))
+_VALID_RFID_NUMERIC = _line_scanner(r'[0-9]*+')
+_VALID_RFID_ALNUM = _line_scanner(r'[A-Za-z0-9]*+')
+_NON_DIGIT = re.compile(r'[^0-9]')
+
+RULE_MESSAGES = {
+    'qty': 'QTY deve ser um número inteiro maior que zero',
+    'vpm': f'VPM malformado (esperado {MIN_VPM_PARTS} partes: PO-ESTILO-TAMANHO-COR-LOCAL)',
+    'barcode': f'Barcode deve ter pelo menos {MIN_BARCODE_DIGITS} dígitos',
+    'rfid_caracteres': 'Dados RFID devem conter apenas números (formato ZebraDesigner)',
+    'rfid_caracteres_alnum': 'Dados RFID contêm caracteres inválidos (apenas A-Z, a-z, 0-9 permitidos)',
+    'rfid_tamanho': f'Dados RFID muito longos (máximo {RFID_LENGTH} caracteres)',
+    'rfid_duplicado': 'Dados RFID repetidos no lote',
+    'barcode_duplicado': 'Barcode sequencial repetido no lote',
+}
+
+
+class LabelColumns:
+    """Colunas derivadas do lote (mesma regra do /api/print-individual)"""
+
+    def __init__(self, data):
+        self.vpm = [str(item.get('VPM') or item.get('SKU') or 'N/A') for item in data]
+        records = [parse_vpm(vpm) for vpm in self.vpm]
+        self.po = [str(item.get('PO') or record.po or '0000') for item, record in zip(data, records)]
+        self.barcode = [str(item.get('BARCODE') or record.compact or '00000000')
+                        for item, record in zip(data, records)]
+        self.rfid_prefix = [barcode[:12].zfill(12) for barcode in self.barcode]
+        self.po_digits = [po if po.isdigit() else _NON_DIGIT.sub('', po or '0000') for po in self.po]
+        self.qty = _quantities(data)
+
+    def __len__(self):
+        return len(self.vpm)
+
+
+def invalid_rows(scanner, column):
+    """Índices das linhas inválidas numa única varredura da coluna"""
+    if not column:
+        return np.empty(0, dtype=np.int64)
+    joined = '\n'.join(column) + '\n'
+    if joined.count('\n') != len(column):
+        # Quebras de linha dentro dos valores deslocariam os índices
+        column = [value.replace('\n', ' ') for value in column]
+        joined = '\n'.join(column) + '\n'
+
+    starts = np.fromiter((m.start(1) for m in scanner.finditer(joined) if m.group(1) is not None),
+                         dtype=np.int64)
+    if len(starts) == 0:
+        return starts
+    lengths = np.fromiter(map(len, column), dtype=np.int64, count=len(column))
+    line_starts = np.concatenate(([0], np.cumsum(lengths + 1)[:-1]))
+    return np.searchsorted(line_starts, starts, side='right') - 1
+
+
+def _digit_count(values):
+    """Quantidade de dígitos decimais de inteiros positivos"""
+    return np.searchsorted(10 ** np.arange(19, dtype=np.int64), values, side='right')
+
+
+def _expand_units(rows, qty):
+    """(linha, sequencial) de cada unidade das linhas indicadas"""
+    counts = qty[rows]
+    unit_rows = np.repeat(rows, counts)
+    offsets = np.repeat(np.cumsum(counts) - counts, counts)
+    seq = np.arange(len(unit_rows), dtype=np.int64) - offsets + 1
+    return unit_rows, seq
+
+
+def _factorize(strings):
+    """Código inteiro de cada string (codificação por dicionário)"""
+    if not strings:
+        return np.empty(0, dtype=np.int64)
+    return np.unique(np.array(strings), return_inverse=True)[1].astype(np.int64)
+
+
+def duplicate_units(keys, unit_rows, seq):
+    """
+    Pares de unidades com a mesma chave (colunas em `keys`, da menos para a mais significativa)
+    As unidades chegam em ordem de linha/cópia e a ordenação é estável, então a
+    primeira de cada grupo é a original.
+    Retorna (linha, cópia, linha_original, cópia_original) para cada repetição.
+    """
+    if len(unit_rows) == 0:
+        return []
+    if len(keys) == 1:
+        order = np.argsort(keys[0], kind='stable')
+    else:
+        order = np.lexsort(keys)
+    same = np.ones(len(order) - 1, dtype=bool)
+    for key in keys:
+        sorted_key = key[order]
+        same &= sorted_key[1:] == sorted_key[:-1]
+    positions = np.flatnonzero(same) + 1
+    if len(positions) == 0:
+        return []
+
+    # Primeira ocorrência de cada grupo de repetidos
+    run_start = np.flatnonzero(np.concatenate(([True], ~same)))
+    first = run_start[np.searchsorted(run_start, positions, side='right') - 1]
+    dup, orig = order[positions], order[first]
+    return list(zip(unit_rows[dup].tolist(), seq[dup].tolist(),
+                    unit_rows[orig].tolist(), seq[orig].tolist()))
+
+
+def rfid_content(columns, row, sequence):
+    """Dados RFID de uma unidade (generateZebraDesignerFormat)"""
+    return f"{columns.rfid_prefix[row]}{columns.po_digits[row]}{sequence}".ljust(RFID_LENGTH, '0')
+
+
+def sequential_barcode(columns, row, sequence):
+    return f"{columns.barcode[row][:8]}{columns.po[row]}{sequence}"
+
+
+def validate_batch(data, rfid_charset='numeric', check_barcode=True,
+                   max_errors=MAX_REPORTED_ERRORS, strict_rfid=STRICT_RFID):
+    """
+    Valida o lote inteiro e retorna o relatório completo de erros
+    rfid_charset: 'numeric' (formato ZebraDesigner do Node) ou 'alphanumeric'
+    check_barcode: exige barcode com pelo menos 12 dígitos (EAN do template)
+    strict_rfid: EPC repetido no lote é erro (senão, aviso)
+    """
+    columns = LabelColumns(data)
+    n = len(columns)
+    counts, errors = {}, []
+    warning_counts, warnings = {}, []
+
+    def report(rule, rows, copies=None, details=None, warning=False):
+        target = warnings if warning else errors
+        target_counts = warning_counts if warning else counts
+        target_counts[rule] = target_counts.get(rule, 0) + len(rows)
+        for i, row in enumerate(rows[:max(0, max_errors - len(target))]):
+            row = int(row)
+            error = {
+                'row': row,
+                'copy': copies[i] if copies is not None else None,
+                'vpm': columns.vpm[row],
+                'rule': rule,
+                'message': RULE_MESSAGES[rule],
+            }
+            if details is not None:
+                error.update(details[i])
+            target.append(error)
+
+    report('qty', invalid_quantities(data))
+    report('vpm', invalid_rows(_VALID_VPM, columns.vpm))
+    if check_barcode:
+        report('barcode', invalid_rows(_VALID_BARCODE, columns.barcode))
+
+    rfid_rule = 'rfid_caracteres' if rfid_charset == 'numeric' else 'rfid_caracteres_alnum'
+    rfid_scanner = _VALID_RFID_NUMERIC if rfid_charset == 'numeric' else _VALID_RFID_ALNUM
+    bad_chars = invalid_rows(rfid_scanner, columns.rfid_prefix)
+    report(rfid_rule, bad_chars)
+
+    # Tamanho do RFID na maior cópia: 12 + PO + dígitos do sequencial
+    po_len = np.fromiter(map(len, columns.po_digits), dtype=np.int64, count=n)
+    rfid_len = 12 + po_len + _digit_count(columns.qty)
+    too_long = np.flatnonzero(rfid_len > RFID_LENGTH)
+    report('rfid_tamanho', too_long,
+           details=[{'length': int(rfid_len[row])} for row in too_long[:max_errors]])
+
+    # Sequenciais repetidos entre todas as unidades do lote
+    ok = np.ones(n, dtype=bool)
+    ok[bad_chars] = False
+    ok[too_long] = False
+    rows = np.flatnonzero(ok)
+    unit_rows, seq = _expand_units(rows, columns.qty)
+    seq_len = _digit_count(seq)
+    po_value = np.array([int(p) if p and len(p) <= 12 else 0 for p in columns.po_digits],
+                        dtype=np.int64)
+
+    # RFID: prefixo de 12 + (PO + sequencial completado com zeros) de largura fixa
+    rest_len = po_len[unit_rows] + seq_len
+    rfid_value = (po_value[unit_rows] * 10 ** seq_len + seq) * 10 ** (RFID_LENGTH - 12 - rest_len)
+    rfid_key = _factorize(columns.rfid_prefix)[unit_rows] * 10 ** (RFID_LENGTH - 12) + rfid_value
+    rfid_dups = duplicate_units((rfid_key,), unit_rows, seq)
+    report('rfid_duplicado', [d[0] for d in rfid_dups], [d[1] for d in rfid_dups],
+           [{'value': rfid_content(columns, d[0], d[1]), 'duplicateOf': {'row': d[2], 'copy': d[3]}}
+            for d in rfid_dups[:max_errors]], warning=not strict_rfid)
+
+    # Barcode sequencial: barcode[:8] + PO + sequencial (largura variável)
+    # Só aviso: UPCs do mesmo prefixo GS1 repetem os 8 primeiros dígitos
+    if n:
+        numeric_po = np.fromiter(map(str.isdigit, columns.po), dtype=bool, count=n) & (po_len <= 10)
+        prefix = [barcode[:8] for barcode in columns.barcode]
+        for row in np.flatnonzero(~numeric_po).tolist():
+            # PO com letras: entra no grupo em vez de no valor numérico
+            prefix[row] += '\x00' + columns.po[row]
+        barcode_group = _factorize(prefix)[unit_rows]
+        tail_po = np.where(numeric_po, po_value, 0)[unit_rows]
+        tail_len = np.where(numeric_po, po_len, 0)[unit_rows]
+        barcode_dups = duplicate_units((tail_po * 10 ** seq_len + seq, tail_len + seq_len,
+                                        barcode_group), unit_rows, seq)
+        report('barcode_duplicado', [d[0] for d in barcode_dups], [d[1] for d in barcode_dups],
+               [{'value': sequential_barcode(columns, d[0], d[1]),
+                 'duplicateOf': {'row': d[2], 'copy': d[3]}}
+                for d in barcode_dups[:max_errors]], warning=True)
+
+    error_count = sum(counts.values())
+    return {
+        'valid': error_count == 0,
+        'totalRows': n,
+        'totalLabels': int(columns.qty.sum()),
+        'errorCount': error_count,
+        'errorsByRule': counts,
+        'errors': errors,
+        'warningCount': sum(warning_counts.values()),
+        'warningsByRule': warning_counts,
+        'warnings': warnings,
+        'truncated': error_count > len(errors),
+    }
+
+
+def _quantities(data):
+    """Coluna QTY (mínimo 1); caminho rápido quando todos já são inteiros"""
+    raw = [item.get('QTY') for item in data]
+    try:
+        return np.maximum(np.array(raw, dtype=np.int64), 1) if raw else np.empty(0, dtype=np.int64)
+    except (TypeError, ValueError):
+        return np.fromiter((_quantity(item) for item in data), dtype=np.int64, count=len(data))
+
+
+def _quantity(item):
+    try:
+        return max(1, int(item.get('QTY') or 1))
+    except (TypeError, ValueError):
+        return 1
+
+
+def invalid_quantities(data):
+    """
+    Linhas com QTY informado que não é inteiro positivo. A impressão (Node) e
+    previews/exportações leem QTY assim vazio ou inválido como 1; rejeitar
+    aqui garante que o lote aprovado imprime o mesmo que foi visto
+    """
+    raw = [item.get('QTY') for item in data]
+    if not raw:
+        return np.empty(0, dtype=np.int64)
+    values = np.asarray(raw)
+    if values.dtype.kind in 'iu':
+        return np.flatnonzero(values < 1)
+    return np.array([row for row, value in enumerate(raw) if not _valid_quantity(value)], dtype=np.int64)
+
+
+def _valid_quantity(value):
+    if value is None or value == '':
+        return True
+    if isinstance(value, float):
+        return value.is_integer() and value >= 1
+    try:
+        return int(str(value).strip()) >= 1
+    except ValueError:
+        return False
+
+
+def main():
+    """Função principal - API mode (dados JSON via stdin)"""
+    if len(sys.argv) < 2 or sys.argv[1] != 'validate':
+        print(json.dumps({
+            'success': False,
+            'error': 'Comando não especificado' if len(sys.argv) < 2 else f'Comando desconhecido: {sys.argv[1]}',
+            'available_commands': ['validate']
+        }))
+        return
+
+    try:
+        payload = json.load(sys.stdin)
+        start = time.perf_counter()
+        with span('validate'):
+            result = validate_batch(payload.get('data') or [],
+                                    rfid_charset=payload.get('rfidCharset', 'numeric'),
+                                    check_barcode=payload.get('checkBarcode', True),
+                                    strict_rfid=payload.get('strictRfid', STRICT_RFID))
+        print(json.dumps({
+            'success': True,
+            **result,
+            'validateMs': round((time.perf_counter() - start) * 1000, 1),
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        }))
+    except Exception as e:
+        print(json.dumps({
+            'success': False,
+            'error': str(e),
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        }))
+
+
+if __name__ == "__main__":
+    main()
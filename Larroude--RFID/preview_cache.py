@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Cache de previews endereçado por conteúdo
+PNGs gravados em disco com chave = hash(versão do template, valores, dpi) e
+índice LRU em memória limitado por bytes; os mais antigos são removidos
+quando o orçamento estoura. O aquecimento após o upload roda num
+subprocesso separado (label_preview.py warm).
+"""
+
+import os
+import sys
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_DIR = os.environ.get(
+    'PREVIEW_CACHE_DIR', os.path.join(BASE_DIR, 'backend', 'output', 'previews'))
+DEFAULT_MAX_BYTES = int(float(os.environ.get('PREVIEW_CACHE_MAX_MB', '256')) * 1024 * 1024)
+
+
+def make_cache_key(template_version, values, dpi):
+    """Chave do preview: hash estável de (versão do template, valores, dpi)"""
+    payload = json.dumps([template_version, values, dpi], sort_keys=True,
+                         ensure_ascii=False, separators=(',', ':'))
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class PreviewCache:
+    """Cache de PNGs em disco com índice LRU em memória"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._index = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + '.png')
+
+    def _load_index(self):
+        """Reconstrói o índice a partir do disco (ordem = último acesso)"""
+        entries = []
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith('.png'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+        entries.sort()
+        for _, key, size in entries:
+            self._index[key] = size
+            self.total_bytes += size
+        self._evict()
+
+    def get(self, key):
+        """PNG em cache ou None"""
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as file:
+                data = file.read()
+            # mtime guarda a recência para a próxima reconstrução do índice
+            os.utime(path)
+        except FileNotFoundError:
+            # Removido por outro processo
+            with self._lock:
+                self.total_bytes -= self._index.pop(key, 0)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, key, png):
+        """Grava o PNG (escrita atômica) e aplica o orçamento de bytes"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as file:
+            file.write(png)
+        os.replace(temp_path, path)
+        with self._lock:
+            self.total_bytes += len(png) - self._index.pop(key, 0)
+            self._index[key] = len(png)
+            self._evict()
+
+    def get_or_render(self, key, render):
+        """Retorna o PNG do cache ou renderiza com `render()` e guarda"""
+        png = self.get(key)
+        if png is None:
+            png = render()
+            self.put(key, png)
+        return png
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._index
+
+    def _evict(self):
+        """Remove os itens menos usados até caber no orçamento (chamar com lock)"""
+        while self.total_bytes > self.max_bytes and self._index:
+            key, size = self._index.popitem(last=False)
+            self.total_bytes -= size
+            self.evictions += 1
+            try:
+                os.unlink(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            keys = list(self._index)
+            self._index.clear()
+            self.total_bytes = 0
+        for key in keys:
+            try:
+                os.unlink(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._index),
+                'total_bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+def main():
+    """Função principal - manutenção do cache"""
+    if len(sys.argv) < 2:
+        print(json.dumps({
+            'success': False,
+            'error': 'Comando não especificado',
+            'available_commands': ['stats', 'clear']
+        }))
+        return
+
+    command = sys.argv[1]
+    cache = PreviewCache()
+    if command == 'stats':
+        print(json.dumps({'success': True, **cache.stats()}))
+    elif command == 'clear':
+        cache.clear()
+        print(json.dumps({'success': True, 'message': 'Cache de previews limpo'}))
+    else:
+        print(json.dumps({
+            'success': False,
+            'error': f'Comando desconhecido: {command}',
+            'available_commands': ['stats', 'clear']
+        }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Registro (ledger) das etiquetas enviadas à impressora
+Arquivo binário só de acréscimo, com registros de tamanho fixo (data/hora,
+impressora, PO, sequencial, barcode, EPC, status), e dois índices secundários
+mapeados em memória (EPC e barcode): tabelas hash de endereçamento aberto cujo
+slot guarda o número do registro. A consulta custa alguns microssegundos e
+devolve todas as ocorrências da chave (EPC repetido = tag gravado duas vezes).
+Os acréscimos são agrupados (group commit): um write + fsync por lote, e só
+depois os índices avançam. O desfecho conhecido depois do envio (impressa,
+cancelada no buffer, removida do spooler, sem confirmação) entra como novo
+registro da mesma chave e substitui o status do último envio dela na
+consulta. Se o processo cair no meio, o ledger é a fonte da verdade: registro
+incompleto é descartado e os índices completam o que falta ao abrir. Um
+gravador por vez (o backend serializa as chamadas).
+"""
+
+import os
+import sys
+import json
+import time
+import mmap
+import struct
+import hashlib
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_LEDGER_PATH = os.environ.get(
+    'PRINT_LEDGER_PATH', os.path.join(BASE_DIR, 'backend', 'output', 'ledger', 'prints.ledger'))
+GROUP_COMMIT_RECORDS = int(os.environ.get('PRINT_LEDGER_GROUP', '256'))
+GROUP_COMMIT_SECONDS = float(os.environ.get('PRINT_LEDGER_GROUP_SECONDS', '0.05'))
+
+LEDGER_MAGIC = b'LPL1'
+LEDGER_HEADER = struct.Struct('<4sI56x')          # magic, tamanho do registro
+INDEX_MAGIC = b'LPI1'
+INDEX_HEADER = struct.Struct('<4s4sQQ8x')         # magic, campo, capacidade, registros indexados
+SLOT = struct.Struct('<Q')                        # número do registro + 1 (0 = vazio)
+
+# timestamp (ms), sequencial, status, impressora, PO, barcode, EPC -> 128 bytes
+RECORD = struct.Struct('<qIB3x32s16s32s32s')
+FIELD_OFFSETS = {'barcode': 64, 'epc': 96}
+FIELD_SIZE = 32
+INDEXED_FIELDS = ('epc', 'barcode')
+
+STATUSES = ('sent', 'encoded', 'face', 'failed', 'printed', 'cancelled', 'purged', 'unconfirmed')
+OUTCOMES = ('printed', 'cancelled', 'purged', 'unconfirmed')   # atualizam o envio anterior
+NOT_PRINTED = ('cancelled', 'purged')
+MIN_CAPACITY = 1024
+
+
+def _text(value, size):
+    return str(value if value is not None else '').encode('utf-8')[:size]
+
+
+def _key(value):
+    return _text(value, FIELD_SIZE).ljust(FIELD_SIZE, b'\0')
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'little')
+
+
+def pack_record(record):
+    """Dicionário -> 128 bytes"""
+    status = record.get('status') or 'sent'
+    if status not in STATUSES:
+        raise ValueError(f'Status inválido: {status} (use {", ".join(STATUSES)})')
+    timestamp = record.get('timestamp')
+    return RECORD.pack(
+        int(timestamp if timestamp is not None else time.time() * 1000),
+        int(record.get('sequence') or 0),
+        STATUSES.index(status),
+        _text(record.get('printer'), 32),
+        _text(record.get('po'), 16),
+        _text(record.get('barcode'), FIELD_SIZE),
+        _text(record.get('epc'), FIELD_SIZE),
+    )
+
+
+def unpack_record(data, offset=0):
+    """128 bytes -> dicionário"""
+    timestamp, sequence, status, printer, po, barcode, epc = RECORD.unpack_from(data, offset)
+
+    def text(value):
+        return value.rstrip(b'\0').decode('utf-8', 'replace')
+
+    return {
+        'timestamp': timestamp,
+        'sequence': sequence,
+        'status': STATUSES[status] if status < len(STATUSES) else str(status),
+        'printer': text(printer),
+        'po': text(po),
+        'barcode': text(barcode),
+        'epc': text(epc),
+    }
+
+
+class LedgerIndex:
+    """Tabela hash (sondagem linear) mapeada em memória: chave -> registros"""
+
+    def __init__(self, path, field, ledger):
+        self.path = path
+        self.field = field
+        self.offset = FIELD_OFFSETS[field]
+        self.ledger = ledger
+        if not os.path.exists(path) or os.path.getsize(path) < INDEX_HEADER.size:
+            self._create(MIN_CAPACITY)
+        self._open()
+        magic, field_name, self.capacity, self.indexed = INDEX_HEADER.unpack_from(self._map, 0)
+        if magic != INDEX_MAGIC or field_name.rstrip(b'\0') != field.encode()[:4] \
+                or os.path.getsize(path) != INDEX_HEADER.size + self.capacity * SLOT.size:
+            self.close()
+            self._create(MIN_CAPACITY)
+            self._open()
+            self.capacity, self.indexed = MIN_CAPACITY, 0
+
+    def _create(self, capacity, indexed=0):
+        with open(self.path, 'wb') as file:
+            file.write(INDEX_HEADER.pack(INDEX_MAGIC, self.field.encode()[:4], capacity, indexed))
+            file.truncate(INDEX_HEADER.size + capacity * SLOT.size)
+
+    def _open(self):
+        self._file = open(self.path, 'r+b')
+        self._map = mmap.mmap(self._file.fileno(), 0)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def _slots(self, key):
+        """Posições da sequência de sondagem da chave"""
+        mask = self.capacity - 1
+        position = _hash(key) & mask
+        while True:
+            yield INDEX_HEADER.size + position * SLOT.size
+            position = (position + 1) & mask
+
+    def _insert(self, key, number):
+        for slot in self._slots(key):
+            if not SLOT.unpack_from(self._map, slot)[0]:
+                SLOT.pack_into(self._map, slot, number + 1)
+                return
+
+    def lookup(self, key):
+        """Números dos registros cuja chave confere, em ordem de gravação"""
+        numbers = []
+        total = self.ledger.count
+        for slot in self._slots(key):
+            entry = SLOT.unpack_from(self._map, slot)[0]
+            if not entry:
+                break
+            number = entry - 1
+            if number < total and self.ledger.field_bytes(number, self.offset) == key:
+                numbers.append(number)
+        return sorted(numbers)
+
+    def _grow(self, capacity):
+        """Dobra a tabela e reinsere as entradas (a chave vem do ledger)"""
+        numbers = [SLOT.unpack_from(self._map, INDEX_HEADER.size + i * SLOT.size)[0] - 1
+                   for i in range(self.capacity)]
+        self.close()
+        self._create(capacity, self.indexed)
+        self._open()
+        self.capacity = capacity
+        for number in numbers:
+            if number >= 0:
+                self._insert(self.ledger.field_bytes(number, self.offset), number)
+
+    def catch_up(self, flush=True):
+        """Indexa os registros do ledger ainda não indexados"""
+        total = self.ledger.count
+        if self.indexed >= total:
+            return
+        if total * 2 > self.capacity:
+            capacity = self.capacity
+            while total * 2 > capacity:
+                capacity *= 2
+            self._grow(capacity)
+        for number in range(self.indexed, total):
+            key = self.ledger.field_bytes(number, self.offset)
+            if key.strip(b'\0'):
+                self._insert(key, number)
+        self.indexed = total
+        INDEX_HEADER.pack_into(self._map, 0, INDEX_MAGIC, self.field.encode()[:4],
+                               self.capacity, self.indexed)
+        if flush:
+            self._map.flush()
+
+
+class PrintLedger:
+    """Ledger das impressões com índices por EPC e por barcode"""
+
+    def __init__(self, path=DEFAULT_LEDGER_PATH, group_records=GROUP_COMMIT_RECORDS,
+                 group_seconds=GROUP_COMMIT_SECONDS):
+        self.path = path
+        self.group_records = group_records
+        self.group_seconds = group_seconds
+        self._pending = []
+        self._pending_since = None
+        self._map = None
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if not os.path.exists(path) or os.path.getsize(path) < LEDGER_HEADER.size:
+            with open(path, 'wb') as file:
+                file.write(LEDGER_HEADER.pack(LEDGER_MAGIC, RECORD.size))
+        self._file = open(path, 'r+b')
+        magic, record_size = LEDGER_HEADER.unpack(self._file.read(LEDGER_HEADER.size))
+        if magic != LEDGER_MAGIC or record_size != RECORD.size:
+            self._file.close()
+            raise ValueError(f'Arquivo não é um ledger de impressão: {path}')
+
+        # Registro incompleto (queda no meio da escrita) é descartado
+        size = os.path.getsize(path)
+        whole = LEDGER_HEADER.size + (size - LEDGER_HEADER.size) // RECORD.size * RECORD.size
+        if whole != size:
+            self._file.truncate(whole)
+        self._remap()
+
+        self.indexes = {field: LedgerIndex(f'{path}.{field}.idx', field, self)
+                        for field in INDEXED_FIELDS}
+        for index in self.indexes.values():
+            index.catch_up()
+
+    def _remap(self):
+        if self._map is not None:
+            self._map.close()
+        self._file.seek(0, os.SEEK_END)
+        size = self._file.tell()
+        self.count = (size - LEDGER_HEADER.size) // RECORD.size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def field_bytes(self, number, offset):
+        start = LEDGER_HEADER.size + number * RECORD.size + offset
+        return self._map[start:start + FIELD_SIZE]
+
+    def record(self, number):
+        return unpack_record(self._map, LEDGER_HEADER.size + number * RECORD.size)
+
+    # --- Gravação ---
+
+    def append(self, record):
+        """Enfileira um registro; grava quando o lote enche ou envelhece"""
+        self._pending.append(pack_record(record))
+        if self._pending_since is None:
+            self._pending_since = time.monotonic()
+        if len(self._pending) >= self.group_records \
+                or time.monotonic() - self._pending_since >= self.group_seconds:
+            self.commit()
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def commit(self):
+        """Group commit: um write + fsync para o lote, depois os índices"""
+        if not self._pending:
+            return 0
+        committed = len(self._pending)
+        self._file.seek(0, os.SEEK_END)
+        self._file.write(b''.join(self._pending))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = []
+        self._pending_since = None
+        self._remap()
+        for index in self.indexes.values():
+            index.catch_up()
+        return committed
+
+    # --- Consulta ---
+
+    def lookup(self, field, value):
+        """
+        Envios com o EPC/barcode informado, com o status final de cada um (os
+        registros de desfecho ficam em 'updates' do envio que atualizam)
+        """
+        if field not in self.indexes:
+            raise ValueError(f'Campo sem índice: {field} (use {", ".join(INDEXED_FIELDS)})')
+        sends = []
+        for number in self.indexes[field].lookup(_key(value)):
+            record = dict(self.record(number), record=number)
+            if record['status'] in OUTCOMES and sends:
+                sends[-1]['status'] = record['status']
+                sends[-1].setdefault('updates', []).append(record)
+            else:
+                sends.append(record)
+        return sends
+
+    def close(self):
+        self.commit()
+        for index in self.indexes.values():
+            index.close()
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    """Função principal - grava ou consulta o ledger"""
+    args = sys.argv[1:]
+    if not args or args[0] not in ('append', 'lookup', 'stats') \
+            or (args[0] == 'lookup' and len(args) < 3):
+        print(json.dumps({
+            'success': False,
+            'error': 'Uso: python print_ledger.py append < {"records": [...]} | '
+                     'lookup epc|barcode <valor> | stats'
+        }))
+        return
+
+    try:
+        with PrintLedger() as ledger:
+            if args[0] == 'append':
+                payload = json.load(sys.stdin)
+                records = payload.get('records', []) if isinstance(payload, dict) else payload
+                ledger.extend(records)
+                ledger.commit()
+                result = {'appended': len(records), 'totalRecords': ledger.count}
+            elif args[0] == 'lookup':
+                started = time.perf_counter()
+                records = ledger.lookup(args[1], args[2])
+                printed = [record for record in records if record['status'] not in NOT_PRINTED]
+                result = {
+                    'records': records,
+                    'duplicate': len(printed) > 1,
+                    'lookupUs': round((time.perf_counter() - started) * 1e6, 1)
+                }
+            else:
+                result = {'totalRecords': ledger.count, 'path': ledger.path}
+        print(json.dumps({
+            'success': True,
+            **result,
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        }))
+    except Exception as e:
+        print(json.dumps({
+            'success': False,
+            'error': str(e),
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        }))
+
+
+if __name__ == "__main__":
+    main()
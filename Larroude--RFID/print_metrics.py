@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+Latência por etapa do fluxo de impressão (sempre ligada)
+Cada etapa - ingestão, renderização, validação, espera na fila, envio ao
+spooler, aceite pela impressora e verificação RFID - é medida com o relógio
+monotônico (perf_counter_ns) e registrada num histograma por etapa e por
+impressora. O histograma é log-linear no estilo HDR: 64 sub-faixas por
+potência de 2 (erro relativo < 1,6%), contagens num array fixo, registro sem
+alocação (bem abaixo de 1 µs por medição).
+Cada processo grava o que mediu ao terminar (um arquivo por processo em
+METRICS_DIR); a leitura soma esses arquivos no acumulado e exporta em JSON
+(percentis por etapa, etapa que limita etiquetas/hora) ou no formato texto do
+Prometheus.
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_METRICS_DIR = os.environ.get(
+    'METRICS_DIR', os.path.join(BASE_DIR, 'backend', 'output', 'metrics'))
+
+STAGES = ('ingest', 'render', 'validate', 'queue_wait', 'spool', 'printer_accepted', 'rfid_verified')
+# Etapas medidas por etiqueta (as demais são por lote)
+LABEL_STAGES = ('render', 'spool', 'printer_accepted', 'rfid_verified')
+
+SUB_BITS = 7
+SUB_BUCKETS = 1 << SUB_BITS            # valores < 128 ns têm faixa própria
+HALF_BITS = SUB_BITS - 1
+BUCKET_COUNT = ((64 - SUB_BITS) << HALF_BITS) + SUB_BUCKETS
+
+# Limites (segundos) exportados ao Prometheus
+EXPORT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                  0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+MERGED_FILE = 'merged.json'
+LOCK_FILE = 'metrics.lock'
+LOCK_TIMEOUT = 2.0
+LOCK_STALE = 30.0
+
+now = time.perf_counter_ns
+
+
+def bucket_index(value):
+    """Faixa do valor (ns): exata abaixo de 128, depois 64 sub-faixas por potência de 2"""
+    if value < SUB_BUCKETS:
+        return value if value > 0 else 0
+    shift = value.bit_length() - SUB_BITS
+    return (shift << HALF_BITS) + (value >> shift)
+
+
+def bucket_range(index):
+    """(menor, maior) valor em ns da faixa"""
+    if index < SUB_BUCKETS:
+        return index, index
+    shift = (index >> HALF_BITS) - 1
+    sub = index - (shift << HALF_BITS)
+    return sub << shift, ((sub + 1) << shift) - 1
+
+
+class Histogram:
+    """
+    Histograma log-linear de durações em nanossegundos. O registro só
+    incrementa a faixa e a soma; contagem, mínimo e máximo saem das faixas
+    """
+
+    __slots__ = ('counts', 'total')
+
+    def __init__(self):
+        self.counts = [0] * BUCKET_COUNT
+        self.total = 0
+
+    def record(self, value):
+        if value < SUB_BUCKETS:
+            self.counts[value if value > 0 else 0] += 1
+        else:
+            shift = value.bit_length() - SUB_BITS
+            self.counts[(shift << HALF_BITS) + (value >> shift)] += 1
+        self.total += value
+
+    def since(self, started_ns):
+        """Registra o tempo desde started_ns (obtido com now())"""
+        value = now() - started_ns
+        if value < SUB_BUCKETS:
+            self.counts[value if value > 0 else 0] += 1
+        else:
+            shift = value.bit_length() - SUB_BITS
+            self.counts[(shift << HALF_BITS) + (value >> shift)] += 1
+        self.total += value
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    @property
+    def min(self):
+        index = next((index for index, count in enumerate(self.counts) if count), None)
+        return bucket_range(index)[0] if index is not None else 0
+
+    @property
+    def max(self):
+        index = next((index for index in range(BUCKET_COUNT - 1, -1, -1) if self.counts[index]), None)
+        return bucket_range(index)[1] if index is not None else 0
+
+    def merge(self, other):
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.total += other.total
+
+    def quantile(self, q):
+        """Valor (ns) do quantil q (0..1): meio da faixa onde ele cai"""
+        total = self.count
+        if not total:
+            return 0
+        target = max(1, int(q * total + 0.5))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                low, high = bucket_range(index)
+                return (low + high) // 2
+        return self.max
+
+    def cumulative(self, limits_ns):
+        """Contagens acumuladas até cada limite (buckets do Prometheus)"""
+        result = []
+        seen = 0
+        index = 0
+        for limit in limits_ns:
+            while index < BUCKET_COUNT and bucket_range(index)[1] <= limit:
+                seen += self.counts[index]
+                index += 1
+            result.append(seen)
+        return result
+
+    def to_dict(self):
+        return {
+            'counts': {str(index): count for index, count in enumerate(self.counts) if count},
+            'sum': self.total,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        for index, count in data.get('counts', {}).items():
+            histogram.counts[int(index)] += int(count)
+        histogram.total = int(data.get('sum', 0))
+        return histogram
+
+
+class Span:
+    """Mede o bloco `with` e registra a duração no histograma da etapa"""
+
+    __slots__ = ('histogram', 'started')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = now()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.since(self.started)
+
+
+class Recorder:
+    """Histogramas do processo por (etapa, impressora)"""
+
+    def __init__(self):
+        self.histograms = {}
+
+    def histogram(self, stage, printer=''):
+        """
+        Histograma da etapa/impressora. Em laços, pegue-o uma vez e use
+        histogram.since(inicio) - é o caminho mais curto por medição
+        """
+        histogram = self.histograms.get((stage, printer))
+        if histogram is None:
+            histogram = self.histograms[(stage, printer)] = Histogram()
+        return histogram
+
+    def record(self, stage, elapsed_ns, printer=''):
+        self.histogram(stage, printer).record(elapsed_ns)
+
+    def since(self, stage, started_ns, printer=''):
+        """Registra o tempo desde started_ns (obtido com now())"""
+        self.histogram(stage, printer).since(started_ns)
+
+    def span(self, stage, printer=''):
+        return Span(self.histogram(stage, printer))
+
+    def discard(self):
+        """Descarta as medições ainda não gravadas (ex.: dados sintéticos de benchmark)"""
+        self.histograms = {}
+
+    def flush(self, metrics_dir=DEFAULT_METRICS_DIR):
+        """Grava as medições do processo em um arquivo próprio e zera"""
+        if not self.histograms:
+            return None
+        entries = [dict(histogram.to_dict(), stage=stage, printer=printer)
+                   for (stage, printer), histogram in self.histograms.items()]
+        self.histograms = {}
+        os.makedirs(metrics_dir, exist_ok=True)
+        path = os.path.join(metrics_dir, f'{os.getpid()}-{time.time_ns()}.json')
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump({'histograms': entries}, file)
+        os.replace(tmp_path, path)
+        return path
+
+
+_recorder = Recorder()
+stage_histogram = _recorder.histogram
+record = _recorder.record
+since = _recorder.since
+span = _recorder.span
+discard = _recorder.discard
+
+
+def _flush_at_exit():
+    try:
+        _recorder.flush()
+    except OSError:
+        pass
+
+
+atexit.register(_flush_at_exit)
+
+
+# --- Leitura (soma dos arquivos dos processos) ---
+
+class _DirectoryLock:
+    """Trava simples por arquivo (O_EXCL) para a consolidação"""
+
+    def __init__(self, metrics_dir):
+        self.path = os.path.join(metrics_dir, LOCK_FILE)
+
+    def __enter__(self):
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while True:
+            try:
+                os.close(os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return self
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.path) > LOCK_STALE:
+                        os.remove(self.path)
+                        continue
+                except OSError:
+                    continue
+                if time.monotonic() >= deadline:
+                    raise TimeoutError('Métricas em consolidação por outro processo')
+                time.sleep(0.01)
+
+    def __exit__(self, *exc):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def _read_entries(path):
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file).get('histograms', [])
+
+
+def load_histograms(metrics_dir=DEFAULT_METRICS_DIR):
+    """
+    Consolida os arquivos dos processos no acumulado (merged.json) e devolve
+    {(etapa, impressora): Histogram}
+    """
+    _recorder.flush(metrics_dir)
+    os.makedirs(metrics_dir, exist_ok=True)
+    histograms = {}
+
+    def fold(entries):
+        for entry in entries:
+            key = (entry['stage'], entry.get('printer', ''))
+            incoming = Histogram.from_dict(entry)
+            if key in histograms:
+                histograms[key].merge(incoming)
+            else:
+                histograms[key] = incoming
+
+    with _DirectoryLock(metrics_dir):
+        merged_path = os.path.join(metrics_dir, MERGED_FILE)
+        if os.path.exists(merged_path):
+            fold(_read_entries(merged_path))
+        pending = [entry.path for entry in os.scandir(metrics_dir)
+                   if entry.name.endswith('.json') and entry.name != MERGED_FILE]
+        for path in pending:
+            try:
+                fold(_read_entries(path))
+            except (OSError, ValueError):
+                continue
+        if pending:
+            tmp_path = f'{merged_path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump({'histograms': [dict(histogram.to_dict(), stage=stage, printer=printer)
+                                          for (stage, printer), histogram in histograms.items()]}, file)
+            os.replace(tmp_path, merged_path)
+            for path in pending:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+    return histograms
+
+
+def reset(metrics_dir=DEFAULT_METRICS_DIR):
+    """Apaga o acumulado e as medições pendentes"""
+    if not os.path.isdir(metrics_dir):
+        return
+    with _DirectoryLock(metrics_dir):
+        for entry in os.scandir(metrics_dir):
+            if entry.name.endswith('.json'):
+                os.remove(entry.path)
+
+
+def snapshot(histograms):
+    """Resumo JSON: percentis em ms por etapa/impressora e a etapa que limita cada impressora"""
+    def ms(value):
+        return round(value / 1e6, 3)
+
+    stages = {}
+    bottlenecks = {}
+    for (stage, printer), histogram in sorted(histograms.items()):
+        mean = histogram.total / histogram.count if histogram.count else 0
+        stages.setdefault(stage, {})[printer] = {
+            'count': histogram.count,
+            'meanMs': ms(mean),
+            'minMs': ms(histogram.min),
+            'p50Ms': ms(histogram.quantile(0.5)),
+            'p90Ms': ms(histogram.quantile(0.9)),
+            'p99Ms': ms(histogram.quantile(0.99)),
+            'p999Ms': ms(histogram.quantile(0.999)),
+            'maxMs': ms(histogram.max),
+            'labelsPerHour': round(3600e9 / mean) if stage in LABEL_STAGES and mean else None,
+        }
+        if stage in LABEL_STAGES and mean:
+            current = bottlenecks.get(printer)
+            if current is None or mean > current[1]:
+                bottlenecks[printer] = (stage, mean)
+    return {
+        'stages': stages,
+        'bottleneck': {printer: {'stage': stage, 'labelsPerHour': round(3600e9 / mean)}
+                       for printer, (stage, mean) in bottlenecks.items()},
+    }
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus(histograms):
+    """Formato texto do Prometheus (histograma em segundos)"""
+    name = 'label_stage_duration_seconds'
+    lines = [f'# HELP {name} Duração de cada etapa do fluxo de impressão',
+             f'# TYPE {name} histogram']
+    limits_ns = [int(limit * 1e9) for limit in EXPORT_BUCKETS]
+    for (stage, printer), histogram in sorted(histograms.items()):
+        labels = f'stage="{_label(stage)}",printer="{_label(printer)}"'
+        for limit, count in zip(EXPORT_BUCKETS, histogram.cumulative(limits_ns)):
+            lines.append(f'{name}_bucket{{{labels},le="{limit:g}"}} {count}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+        lines.append(f'{name}_sum{{{labels}}} {histogram.total / 1e9:.9f}')
+        lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+    return '\n'.join(lines) + '\n'
+
+
+def main():
+    """Função principal - exporta ou registra medições"""
+    commands = ('snapshot', 'prometheus', 'record', 'reset')
+    if len(sys.argv) < 2 or sys.argv[1] not in commands:
+        print(json.dumps({
+            'success': False,
+            'error': 'Uso: python print_metrics.py snapshot | prometheus | reset | '
+                     'record < {"spans": [{"stage": "spool", "printer": "...", "ms": 12.5}]}',
+            'available_commands': list(commands)
+        }))
+        return
+
+    try:
+        command = sys.argv[1]
+        if command == 'record':
+            payload = json.load(sys.stdin)
+            spans = payload.get('spans', []) if isinstance(payload, dict) else payload
+            for entry in spans:
+                if entry.get('stage') not in STAGES:
+                    raise ValueError(f'Etapa inválida: {entry.get("stage")} (use {", ".join(STAGES)})')
+                record(entry['stage'], int(float(entry['ms']) * 1e6), str(entry.get('printer') or ''))
+            _recorder.flush()
+            result = {'recorded': len(spans)}
+        elif command == 'reset':
+            reset()
+            result = {}
+        elif command == 'snapshot':
+            result = snapshot(load_histograms())
+        else:
+            result = {'text': prometheus(load_histograms())}
+        print(json.dumps({
+            'success': True,
+            **result,
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        }))
+    except Exception as e:
+        print(json.dumps({
+            'success': False,
+            'error': str(e),
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Conciliação dos contadores da impressora com o que o host enviou
+Antes e depois de cada lote (ex.: um PO) lê os contadores da impressora pelo
+canal bidirecional - etiquetas impressas (SGD odometer.total_label_count),
+tags RFID válidos e anulados (odometer.rfid.valid_resettable/void_resettable)
+e o odômetro de comprimento do ~HQOD - e compara as diferenças com o registro
+por etiqueta do que o host mandou naquele lote. Etiquetas faltando ou sobrando
+e tags anulados (VOID) ficam sinalizados no relatório.
+O registro do lote é um JSON Lines gravado à medida que as etiquetas saem
+(início, um envio por linha, fim com o relatório): sobrevive a uma queda e
+permite refazer a conciliação depois. O backend acrescenta as linhas de envio
+direto no arquivo devolvido pelo 'begin' (journal); um desfecho posterior da
+mesma etiqueta (ex.: cancelada no buffer) é uma nova linha que substitui a
+anterior.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+
+from label_preview import TEMPLATE_PATH, template_values
+from print_metrics import now, stage_histogram
+from printer_link import open_link
+from rfid_reprint import fill_template, iter_units, unit_epc
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_RECONCILE_DIR = os.environ.get(
+    'RECONCILE_DIR', os.path.join(BASE_DIR, 'backend', 'output', 'reconcile'))
+
+COUNTERS = {
+    'labels': 'odometer.total_label_count',
+    'rfidValid': 'odometer.rfid.valid_resettable',
+    'rfidVoid': 'odometer.rfid.void_resettable',
+}
+ODOMETER_RE = re.compile(r'TOTAL NONRESETTABLE:\s*([\d.]+)')
+NOT_SENT = ('failed', 'cancelled', 'purged')   # não chegaram a imprimir
+
+
+def _number(value):
+    """Contador numérico (None se a impressora não conhece a variável: '?')"""
+    match = re.search(r'\d+', value or '')
+    return int(match.group()) if match else None
+
+
+def read_counters(link):
+    """Leitura dos contadores da impressora (após esvaziar o buffer)"""
+    link.wait_idle()
+    counters = {name: _number(link.sgd_get(variable)) for name, variable in COUNTERS.items()}
+    match = ODOMETER_RE.search(link.query('~HQOD'))
+    counters['odometer'] = float(match.group(1)) if match else None
+    counters['readAt'] = time.strftime('%Y-%m-%d %H:%M:%S')
+    return counters
+
+
+def latest_sends(sends):
+    """Uma entrada por etiqueta (barcode + EPC): a última linha vale"""
+    latest = {}
+    for position, send in enumerate(sends):
+        key = (send.get('barcode'), send.get('epc')) if send.get('barcode') else position
+        latest[key] = send
+    return list(latest.values())
+
+
+def reconcile(before, after, sends):
+    """Compara as diferenças dos contadores com os envios do host"""
+    sent = [send for send in sends if send.get('status', 'sent') not in NOT_SENT]
+    expected_labels = len(sent)
+    expected_tags = sum(1 for send in sent if send.get('encode', True))
+
+    def delta(name):
+        if before.get(name) is None or after.get(name) is None:
+            return None
+        return after[name] - before[name]
+
+    deltas = {name: delta(name) for name in ('labels', 'rfidValid', 'rfidVoid', 'odometer')}
+    flags = []
+    missing = extra = 0
+    if deltas['labels'] is None:
+        flags.append('Contador de etiquetas indisponível na impressora')
+    else:
+        missing = max(expected_labels - deltas['labels'], 0)
+        extra = max(deltas['labels'] - expected_labels, 0)
+        if missing:
+            flags.append(f'{missing} etiqueta(s) enviada(s) e não impressa(s)')
+        if extra:
+            flags.append(f'{extra} etiqueta(s) impressa(s) a mais do que o enviado')
+
+    if deltas['rfidValid'] is not None and deltas['rfidValid'] != expected_tags:
+        flags.append(f'Tags gravados: {deltas["rfidValid"]} (esperado {expected_tags})')
+    if deltas['rfidVoid']:
+        flags.append(f'{deltas["rfidVoid"]} tag(s) anulado(s) (VOID)')
+
+    return {
+        'sent': expected_labels,
+        'encodesSent': expected_tags,
+        'failedSends': len(sends) - len(sent),
+        'delta': deltas,
+        'missingLabels': missing,
+        'extraLabels': extra,
+        'ok': not flags,
+        'flags': flags,
+    }
+
+
+class ReconcileJob:
+    """Lote conciliado: contadores antes/depois e registro de cada envio"""
+
+    def __init__(self, batch_id, directory=DEFAULT_RECONCILE_DIR):
+        self.batch_id = re.sub(r'[^\w.-]', '_', str(batch_id))
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f'{self.batch_id}.jsonl')
+
+    def _write(self, entry):
+        with open(self.path, 'a', encoding='utf-8') as file:
+            file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def entries(self):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, 'r', encoding='utf-8') as file:
+            return [json.loads(line) for line in file if line.strip()]
+
+    def begin(self, link):
+        """Novo lote: descarta registro anterior com o mesmo id e lê os contadores"""
+        counters = read_counters(link)
+        with open(self.path, 'w', encoding='utf-8') as file:
+            file.write(json.dumps({'type': 'begin', 'batch': self.batch_id, 'counters': counters}) + '\n')
+        return counters
+
+    def record_send(self, send):
+        """Envio de uma etiqueta (barcode, EPC, encode, status)"""
+        self._write(dict(send, type='send'))
+
+    def end(self, link, sends=()):
+        """Fim do lote: grava envios pendentes, lê os contadores e concilia"""
+        for send in sends:
+            self.record_send(send)
+        entries = self.entries()
+        begin = next((entry for entry in entries if entry['type'] == 'begin'), None)
+        if begin is None:
+            raise ValueError(f'Lote {self.batch_id} sem leitura inicial dos contadores')
+
+        after = read_counters(link)
+        report = reconcile(begin['counters'], after,
+                           latest_sends(entry for entry in entries if entry['type'] == 'send'))
+        report.update(batch=self.batch_id, before=begin['counters'], after=after)
+        self._write({'type': 'end', 'counters': after, 'report': report})
+        return report
+
+
+def print_batch(link, data, batch_id, template_path=TEMPLATE_PATH):
+    """Imprime o lote pelo canal bidirecional, registrando e conciliando"""
+    with open(template_path, 'r', encoding='utf-8') as file:
+        template_text = file.read()
+
+    job = ReconcileJob(batch_id)
+    job.begin(link)
+    spooled = stage_histogram('spool', link.name)
+    for unit, _, item, sequence in iter_units(data):
+        values = template_values(item, sequence)
+        epc = unit_epc(item, sequence)
+        started = now()
+        link.send(fill_template(template_text, dict(values, RFID_DATA_HEX=epc)))
+        spooled.since(started)
+        job.record_send({'unit': unit, 'barcode': values['BARCODE'], 'epc': epc,
+                         'encode': True, 'status': 'sent'})
+    return job.end(link)
+
+
+def main():
+    """Função principal - início/fim de lote ou impressão conciliada"""
+    args = sys.argv[1:]
+    if len(args) < 3 or args[0] not in ('begin', 'end', 'print'):
+        print(json.dumps({
+            'success': False,
+            'error': 'Uso: python print_reconcile.py begin|end|print <endereço> <lote> '
+                     '(end: {"sends": [...]} no stdin; print: {"data": [...]})'
+        }))
+        return
+
+    try:
+        command, address, batch_id = args[:3]
+        payload = {}
+        if command != 'begin':
+            text = sys.stdin.read()
+            payload = json.loads(text) if text.strip() else {}
+
+        with open_link(address) as link:
+            if command == 'begin':
+                job = ReconcileJob(batch_id)
+                result = {'batch': batch_id, 'counters': job.begin(link), 'journal': job.path}
+            elif command == 'end':
+                result = {'report': ReconcileJob(batch_id).end(link, payload.get('sends', []))}
+            else:
+                result = {'report': print_batch(link, payload.get('data', []), batch_id)}
+        print(json.dumps({
+            'success': True,
+            **result,
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        }))
+    except Exception as e:
+        print(json.dumps({
+            'success': False,
+            'error': str(e),
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        }))
+
+
+if __name__ == "__main__":
+    main()
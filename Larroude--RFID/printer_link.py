@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+Canal bidirecional com a impressora Zebra (envio de ZPL e consultas)
+Diferente do spooler do Windows (só envia), o canal lê as respostas da
+impressora: variáveis SGD (! U1 getvar) e comandos de status (~HS, ~HQ),
+necessários para ler o tag RFID sob a antena ou os contadores.
+Endereço: 'host', 'host:porta' ou 'tcp://host:porta' (porta padrão 9100), ou
+serial: 'serial://COM3', 'serial:///dev/ttyUSB0', 'COM3' ou '/dev/ttyUSB0',
+com a velocidade opcional após '@' (ex.: 'serial://COM3@115200').
+Na serial a velocidade configurada na impressora (comm.baud) é descoberta uma
+vez e guardada por porta; o envio usa controle de fluxo por hardware
+(RTS/CTS) e blocos grandes, esperando a fila de saída esvaziar antes de
+passar do limite - a memória usada não cresce com o tamanho do lote.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import socket
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PORT = 9100
+DEFAULT_TIMEOUT = 5.0
+DEFAULT_ADDRESS = os.environ.get('PRINTER_ADDRESS', '')
+
+# Serial (pyserial)
+SERIAL_BAUD_RATES = (115200, 57600, 38400, 19200, 9600)
+SERIAL_FLOW = os.environ.get('SERIAL_FLOW', 'rtscts')
+SERIAL_FLOWS = ('rtscts', 'dsrdtr', 'xonxoff', 'none')
+SERIAL_CHUNK = int(os.environ.get('SERIAL_CHUNK', '4096'))
+SERIAL_HIGH_WATER = int(os.environ.get('SERIAL_HIGH_WATER', '16384'))  # bytes na fila de saída do SO
+SERIAL_PROBE_TIMEOUT = 0.5
+DEFAULT_BAUD_CACHE = os.environ.get(
+    'SERIAL_BAUD_CACHE', os.path.join(BASE_DIR, 'backend', 'output', 'serial_baud.json'))
+SERIAL_ADDRESS_RE = re.compile(r'(?i)^(serial://|com\d+\b|/dev/)')
+
+STX, ETX = b'\x02', b'\x03'
+
+
+class PrinterLinkError(Exception):
+    """Falha de comunicação com a impressora (conexão ou resposta)"""
+
+
+class PrinterLink:
+    """Base dos canais: envio, leitura de respostas e comandos SGD"""
+
+    name = ''
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT):
+        self.timeout = timeout
+        self._buffer = bytearray()
+
+    # --- Transporte (implementado pelas subclasses) ---
+
+    def write(self, data):
+        raise NotImplementedError
+
+    def _read_some(self, timeout):
+        """Bytes disponíveis (b'' se nada chegou dentro do timeout)"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- Respostas ---
+
+    def discard_input(self):
+        """Descarta respostas antigas antes de uma nova consulta"""
+        self._buffer.clear()
+        while self._read_some(0):
+            pass
+
+    def read_until(self, done, timeout=None):
+        """
+        Lê até done(buffer) devolver o tamanho da resposta completa; retorna
+        esses bytes e mantém o excedente para a próxima leitura
+        """
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        while True:
+            size = done(self._buffer)
+            if size:
+                response = bytes(self._buffer[:size])
+                del self._buffer[:size]
+                return response
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise PrinterLinkError('Impressora não respondeu dentro do tempo limite')
+            self._buffer += self._read_some(remaining)
+
+    def send(self, zpl):
+        """Envia ZPL/comandos (str ou bytes) sem esperar resposta"""
+        self.write(zpl.encode('utf-8') if isinstance(zpl, str) else zpl)
+
+    def send_stream(self, chunks):
+        """Envia um lote em partes (iterável de str/bytes) sem montá-lo inteiro na memória"""
+        for chunk in chunks:
+            self.send(chunk)
+
+    def query(self, command, frames=1, timeout=None):
+        """
+        Envia um comando de status (~HS, ~HQ...) e retorna o texto de `frames`
+        blocos STX...ETX da resposta
+        """
+        self.discard_input()
+        self.send(command)
+
+        def framed(buffer):
+            end = 0
+            for _ in range(frames):
+                end = buffer.find(ETX, end)
+                if end < 0:
+                    return 0
+                end += 1
+            return end
+
+        response = self.read_until(framed, timeout)
+        return response.replace(STX, b'').replace(ETX, b'\n').decode('ascii', 'replace')
+
+    def host_status(self, timeout=None):
+        """Status do ~HS (três blocos): papel, pausa, formatos no buffer, etiquetas restantes"""
+        response = self.query('~HS', frames=3, timeout=timeout)
+        lines = [line.strip() for line in response.split('\n') if line.strip()]
+        first = [field.strip() for field in lines[0].split(',')]
+        second = [field.strip() for field in lines[1].split(',')]
+        return {
+            'paperOut': first[1] == '1',
+            'paused': first[2] == '1',
+            'formatsInBuffer': int(first[4]),
+            'headUp': second[2] == '1',
+            'ribbonOut': second[3] == '1',
+            'labelWaiting': second[7] == '1',
+            'labelsRemaining': int(second[8]),
+        }
+
+    def wait_idle(self, timeout=30.0, interval=0.05):
+        """
+        Espera a impressora terminar o que recebeu (buffer vazio, nenhuma
+        etiqueta restante). Falha se faltar papel, a cabeça estiver aberta ou
+        a impressora estiver pausada
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            status = self.host_status()
+            if status['paperOut'] or status['headUp'] or status['paused']:
+                problems = [name for name in ('paperOut', 'headUp', 'paused') if status[name]]
+                raise PrinterLinkError(f'Impressora parada: {", ".join(problems)}')
+            if not status['formatsInBuffer'] and not status['labelsRemaining']:
+                return status
+            if time.monotonic() >= deadline:
+                raise PrinterLinkError('Impressora não terminou a impressão dentro do tempo limite')
+            time.sleep(interval)
+
+    def cancel_formats(self, timeout=3.0, interval=0.05):
+        """
+        Descarta tudo o que está no buffer da impressora (~JA) e diz quantos
+        formatos foram descartados: pausa (~PP, a etiqueta em curso termina),
+        conta os formatos no ~HS, cancela e retoma (~PS)
+        """
+        self.send('~PP')
+        deadline = time.monotonic() + timeout
+        status = self.host_status()
+        while not status['paused'] and time.monotonic() < deadline:
+            time.sleep(interval)
+            status = self.host_status()
+        self.send('~JA')
+        self.send('~PS')
+        return {'formatsCancelled': status['formatsInBuffer'], 'paused': status['paused']}
+
+    # --- SGD ---
+
+    def sgd_get(self, name, timeout=None):
+        """Valor de uma variável SGD (resposta vem entre aspas)"""
+        self.discard_input()
+        self.send(f'! U1 getvar "{name}"\r\n')
+
+        def quoted(buffer):
+            start = buffer.find(b'"')
+            end = buffer.find(b'"', start + 1) if start >= 0 else -1
+            return end + 1 if end >= 0 else 0
+
+        response = self.read_until(quoted, timeout).decode('utf-8', 'replace')
+        return response[response.index('"') + 1:-1]
+
+    def sgd_set(self, name, value):
+        self.send(f'! U1 setvar "{name}" "{value}"\r\n')
+
+    def sgd_do(self, name, value=''):
+        self.send(f'! U1 do "{name}" "{value}"\r\n')
+
+
+class TCPPrinterLink(PrinterLink):
+    """Canal TCP (porta RAW 9100 das Zebra em rede)"""
+
+    def __init__(self, host, port=DEFAULT_PORT, timeout=DEFAULT_TIMEOUT):
+        super().__init__(timeout)
+        self.host = host
+        self.port = port
+        self.name = f'{host}:{port}'
+        try:
+            self._socket = socket.create_connection((host, port), timeout=timeout)
+        except OSError as e:
+            raise PrinterLinkError(f'Não foi possível conectar a {host}:{port}: {e}') from e
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def write(self, data):
+        try:
+            self._socket.sendall(data)
+        except OSError as e:
+            raise PrinterLinkError(f'Falha ao enviar para {self.host}:{self.port}: {e}') from e
+
+    def _read_some(self, timeout):
+        self._socket.settimeout(timeout if timeout > 0 else 0.0)
+        try:
+            data = self._socket.recv(65536)
+        except (socket.timeout, BlockingIOError):
+            return b''
+        except OSError as e:
+            raise PrinterLinkError(f'Falha ao ler de {self.host}:{self.port}: {e}') from e
+        if not data:
+            raise PrinterLinkError(f'Conexão encerrada pela impressora {self.host}:{self.port}')
+        return data
+
+    def close(self):
+        self._socket.close()
+
+
+def load_baud_cache(path=DEFAULT_BAUD_CACHE):
+    """Velocidades já descobertas {porta: baud}"""
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            cache = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def save_baud(port, baud, path=DEFAULT_BAUD_CACHE):
+    cache = load_baud_cache(path)
+    if cache.get(port) == baud:
+        return
+    cache[port] = baud
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(cache, file, indent=2)
+    os.replace(tmp_path, path)
+
+
+class SerialPrinterLink(PrinterLink):
+    """
+    Canal serial (pyserial). Sem baud informado, usa o que está no cache da
+    porta ou descobre perguntando comm.baud em cada velocidade até a
+    impressora responder
+    """
+
+    def __init__(self, port, baud=None, flow=SERIAL_FLOW, timeout=DEFAULT_TIMEOUT,
+                 cache_path=DEFAULT_BAUD_CACHE):
+        try:
+            import serial
+        except ImportError as e:
+            raise PrinterLinkError('pyserial não instalado (pip install pyserial)') from e
+        if flow not in SERIAL_FLOWS:
+            raise ValueError(f'Controle de fluxo inválido: {flow} (use {", ".join(SERIAL_FLOWS)})')
+        super().__init__(timeout)
+        self.port = port
+        self.name = port
+        self.flow = flow
+        self._errors = (serial.SerialException, OSError)
+        self._write_timeout = serial.SerialTimeoutException
+        try:
+            self._serial = serial.Serial(
+                port, baudrate=baud or SERIAL_BAUD_RATES[-1], timeout=0, write_timeout=timeout,
+                rtscts=flow == 'rtscts', dsrdtr=flow == 'dsrdtr', xonxoff=flow == 'xonxoff')
+        except (serial.SerialException, OSError, ValueError) as e:
+            raise PrinterLinkError(f'Não foi possível abrir a porta {port}: {e}') from e
+        try:
+            self.baud = int(baud) if baud else self.probe_baud(cache_path)
+        except PrinterLinkError:
+            self._serial.close()
+            raise
+
+    def probe_baud(self, cache_path=DEFAULT_BAUD_CACHE):
+        """Velocidade em que a impressora responde (a do cache primeiro) e grava no cache"""
+        cached = load_baud_cache(cache_path).get(self.port)
+        rates = [cached] if cached in SERIAL_BAUD_RATES else []
+        rates += [rate for rate in SERIAL_BAUD_RATES if rate not in rates]
+        for rate in rates:
+            self._serial.baudrate = rate
+            try:
+                self.send('\r\n')
+                value = self.sgd_get('comm.baud', timeout=SERIAL_PROBE_TIMEOUT)
+            except PrinterLinkError:
+                continue
+            if value.strip() == str(rate):
+                save_baud(self.port, rate, cache_path)
+                return rate
+        raise PrinterLinkError(f'Impressora não respondeu em {self.port} em nenhuma velocidade '
+                               f'({", ".join(map(str, SERIAL_BAUD_RATES))})')
+
+    def _wait_output_room(self):
+        """Backpressure: espera a fila de saída do SO baixar do limite"""
+        deadline = time.monotonic() + self.timeout
+        pause = min(0.05, SERIAL_CHUNK * 10 / self._serial.baudrate)
+        while self._serial.out_waiting > SERIAL_HIGH_WATER:
+            if time.monotonic() >= deadline:
+                raise PrinterLinkError(f'Impressora não está recebendo dados em {self.port} '
+                                       '(buffer cheio ou CTS baixo)')
+            time.sleep(pause)
+
+    def write(self, data):
+        view = memoryview(data)
+        try:
+            for start in range(0, len(view), SERIAL_CHUNK):
+                self._wait_output_room()
+                self._serial.write(view[start:start + SERIAL_CHUNK])
+        except self._write_timeout as e:
+            raise PrinterLinkError(f'Impressora não aceitou os dados em {self.port} '
+                                   f'(buffer cheio ou CTS baixo): {e}') from e
+        except self._errors as e:
+            raise PrinterLinkError(f'Falha ao enviar para {self.port}: {e}') from e
+
+    def drain(self):
+        """Espera tudo o que foi enviado sair pela linha"""
+        try:
+            self._serial.flush()
+        except self._errors as e:
+            raise PrinterLinkError(f'Falha ao enviar para {self.port}: {e}') from e
+
+    def _read_some(self, timeout):
+        timeout = timeout if timeout > 0 else 0
+        try:
+            if self._serial.timeout != timeout:
+                self._serial.timeout = timeout
+            data = self._serial.read(1)
+            waiting = self._serial.in_waiting if data else 0
+            if waiting:
+                data += self._serial.read(waiting)
+        except self._errors as e:
+            raise PrinterLinkError(f'Falha ao ler de {self.port}: {e}') from e
+        return data
+
+    def close(self):
+        try:
+            self.drain()
+        finally:
+            self._serial.close()
+
+
+def open_link(address=None, timeout=DEFAULT_TIMEOUT):
+    """Abre o canal para o endereço TCP ou serial (ver o início do módulo)"""
+    address = address or DEFAULT_ADDRESS
+    if not address:
+        raise PrinterLinkError('Endereço da impressora não informado (PRINTER_ADDRESS)')
+    if SERIAL_ADDRESS_RE.match(address):
+        port, _, baud = address[len('serial://'):].rpartition('@') \
+            if address.lower().startswith('serial://') else address.rpartition('@')
+        if not port:
+            port, baud = baud, ''
+        return SerialPrinterLink(port, int(baud) if baud else None, timeout=timeout)
+    if address.startswith('tcp://'):
+        address = address[len('tcp://'):]
+    host, _, port = address.rpartition(':') if ':' in address else (address, '', '')
+    return TCPPrinterLink(host, int(port) if port else DEFAULT_PORT, timeout)
+
+
+def main():
+    """Função principal - consulta SGD/status em uma impressora"""
+    if len(sys.argv) < 3 or sys.argv[1] not in ('getvar', 'query', 'probe', 'cancel') \
+            or (sys.argv[1] not in ('probe', 'cancel') and len(sys.argv) < 4):
+        print(json.dumps({
+            'success': False,
+            'error': 'Uso: python printer_link.py getvar <endereço> <variável> | '
+                     'query <endereço> <comando> [blocos] | probe <porta serial> | cancel <endereço>'
+        }))
+        return
+
+    try:
+        with open_link(sys.argv[2]) as link:
+            if sys.argv[1] == 'probe':
+                result = {'port': getattr(link, 'port', None), 'baud': getattr(link, 'baud', None)}
+            elif sys.argv[1] == 'cancel':
+                result = link.cancel_formats()
+            elif sys.argv[1] == 'getvar':
+                result = {'value': link.sgd_get(sys.argv[3])}
+            else:
+                frames = int(sys.argv[4]) if len(sys.argv) > 4 else 1
+                result = {'response': link.query(sys.argv[3], frames)}
+        print(json.dumps({
+            'success': True,
+            **result,
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        }))
+    except Exception as e:
+        print(json.dumps({
+            'success': False,
+            'error': str(e),
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        }))
+
+
+if __name__ == "__main__":
+    main()
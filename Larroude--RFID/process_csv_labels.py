@@ -9,8 +9,12 @@ import os
 import subprocess
 import tempfile
 import time
-import csv
-import win32print
+
+from csv_reader import CSVFile
+from label_store import LabelStore
+from label_validator import validate_batch
+from rfid_encode import plan_encode
+from vpm_parser import parse_vpm
 
 def string_to_hex(text):
     """Converte string para hexadecimal (mesmo algoritmo do Node.js)"""
@@ -47,24 +51,23 @@ def load_csv_data():
     """Carrega dados do arquivo exemplo.csv"""
     print("📂 Carregando dados do arquivo exemplo.csv...")
     
-    labels = []
+    labels = LabelStore()
     try:
-        with open('exemplo.csv', 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                labels.append({
-                    'style_name': row['STYLE_NAME'],
-                    'vpm': row['VPM'],
-                    'color': row['COLOR'],
-                    'size': row['SIZE']
-                })
+        with CSVFile('exemplo.csv') as table:
+            for row in table.iter_records():
+                labels.append(
+                    style_name=row['STYLE_NAME'],
+                    vpm=row['VPM'],
+                    color=row['COLOR'],
+                    size=row['SIZE']
+                )
         
         print(f"✅ {len(labels)} etiquetas carregadas do CSV")
         return labels
         
     except Exception as e:
         print(f"❌ Erro ao carregar CSV: {e}")
-        return []
+        return LabelStore()
 
 def generate_zebra_designer_format(barcode, po_number, sequence, target_length=24):
     """Gera dados RFID no formato ZebraDesigner (Barcode + PO + Sequencial + Zeros)"""
@@ -103,11 +106,11 @@ def generate_zpl_for_label(label_data, rfid_data=None, sequence=1):
     print(f"📋 Python CSV: Gerando etiqueta para {style_name}")
     
     # Extrair PO do VPM (formato: L458-JASM-11.0-SILV-1885)
-    vpm_parts = vpm.split('-')
-    po_number = vpm_parts[0].replace('L', '') if vpm_parts else '0000'
+    record = parse_vpm(vpm)
+    po_number = record.po or '0000'
     
     # Gerar código de barras
-    barcode = vpm.replace('-', '')[:12]
+    barcode = record.compact[:12]
     
     # Gerar dados RFID no formato ZebraDesigner (se não fornecido dados customizados)
     if rfid_data:
@@ -124,6 +127,9 @@ def generate_zpl_for_label(label_data, rfid_data=None, sequence=1):
     
     print(f"📡 Python CSV: RFID string direta (formato ZebraDesigner): {rfid_content}")
     
+    # Só as operações de RF que o perfil do tag exige (PC só se o tamanho do EPC mudar)
+    rfid_commands = '\n'.join(plan_encode(rfid_content))
+
     # ZPL base fornecido pelo usuário
     zpl = f"""CT~~CD,~CC^~CT~
 ^XA
@@ -151,8 +157,7 @@ def generate_zpl_for_label(label_data, rfid_data=None, sequence=1):
 ^LS0
 ^BY2,3,37^FT287,169^BCN,,Y,N
 ^FH\\^FD>;{vpm}>64^FS
-^RFW,H,1,2,1^FD3000^FS
-^RFW,H,2,12,1^FD{rfid_content}^FS
+{rfid_commands}
 ^FO50,50^A0N,30,30^FD{style_name}^FS
 ^FO50,90^A0N,25,25^FD{color}^FS
 ^FO50,130^A0N,25,25^FDSize: {size}^FS
@@ -209,6 +214,14 @@ def print_all_labels():
     for i, label in enumerate(labels, 1):
         print(f"  {i}. {label['style_name']} - {label['color']} - Size {label['size']}")
     
+    # Validação prévia do lote inteiro, antes de a impressora consumir etiquetas
+    report = validate_batch([{'VPM': label['vpm']} for label in labels],
+                            rfid_charset='alphanumeric', check_barcode=False)
+    if not report['valid']:
+        print(f"\n❌ Lote reprovado na validação: {report['errorCount']} erro(s)")
+        for error in report['errors'][:20]:
+            print(f"  {error['row'] + 1}. {error['vpm']}: {error['message']}")
+        return
     print(f"\n🖨️ Iniciando impressão de {len(labels)} etiquetas...")
     
     success_count = 0
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Cadastro de produtos (aba Sheet1 - banco de dados de referência)
+A aba é compilada uma vez num índice hash em disco, com arrays de tamanho fixo
+que são mapeados com mmap e consultados direto no arquivo. O índice guarda o
+hash da aba e só é reconstruído quando ela muda; uploads seguintes (inclusive
+CSV, sem Sheet1) reutilizam o último índice. Chaves: SKU/VPM e UPC/barcode.
+"""
+
+import os
+import sys
+import json
+import mmap
+import time
+import zlib
+import struct
+from array import array
+from collections import namedtuple
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_INDEX_PATH = os.environ.get(
+    'PRODUCT_MASTER_PATH', os.path.join(BASE_DIR, 'backend', 'output', 'product_master.idx'))
+
+REFERENCE_SHEET = 'sheet1'
+
+# Colunas aceitas no cabeçalho da aba de referência (comparação sem caixa)
+KEY_COLUMNS = ('SKU', 'VPM', 'VARIANT SKU', 'UPC', 'BARCODE')
+VALUE_COLUMNS = {
+    'color': ('COLOR NAME', 'COLOR', 'COR'),
+    'style_name': ('STYLE NAME', 'STYLE_NAME', 'NAME', 'STYLE'),
+    'ref': ('REF',),
+}
+
+# magic, versão, hash da aba (hex), nº strings, nº registros, nº slots, bytes de texto
+HEADER = struct.Struct('<4sH2x40sIIII')
+MAGIC = b'LPMX'
+VERSION = 1
+RECORD_WIDTH = 3    # color, style_name, ref (ids de string)
+
+ProductInfo = namedtuple('ProductInfo', ('color', 'style_name', 'ref'))
+
+
+def normalize_key(key):
+    """Chave de busca: texto sem espaços nas pontas, em maiúsculas"""
+    return str(key).strip().upper()
+
+
+class MasterLayout:
+    """Posições das colunas de chave e de valor no cabeçalho da aba"""
+
+    __slots__ = ('keys', 'values')
+
+    def __init__(self, header):
+        index = {}
+        for position, name in enumerate(header):
+            index.setdefault(str(name).strip().upper(), position)
+        self.keys = [index[name] for name in KEY_COLUMNS if name in index]
+        self.values = []
+        for field in ProductInfo._fields:
+            position = next((index[name] for name in VALUE_COLUMNS[field] if name in index), None)
+            self.values.append(position)
+
+
+def _cell(values, position):
+    if position is None or position >= len(values):
+        return ''
+    return values[position].strip()
+
+
+def build_index(rows, sheet_hash, path=DEFAULT_INDEX_PATH):
+    """
+    Compila as linhas da aba (a primeira é o cabeçalho) no arquivo de índice.
+    Layout: cabeçalho, offsets das strings, registros, slots (endereçamento
+    aberto, CRC32 da chave) e o texto UTF-8 - tudo alinhado em 4 bytes.
+    """
+    strings = {}
+    blob = bytearray()
+    offsets = array('I', [0])
+
+    def intern(text):
+        string_id = strings.get(text)
+        if string_id is None:
+            string_id = strings[text] = len(offsets) - 1
+            blob.extend(text.encode('utf-8'))
+            offsets.append(len(blob))
+        return string_id
+
+    layout = None
+    record_ids = {}
+    records = array('I')
+    keys = {}
+    for values in rows:
+        if layout is None:
+            layout = MasterLayout(values)
+            if not layout.keys:
+                raise ValueError('Aba de referência sem coluna de chave. Esperado: '
+                                 + ', '.join(KEY_COLUMNS))
+            continue
+        info = tuple(_cell(values, position) for position in layout.values)
+        if not any(info):
+            continue
+        record_id = record_ids.get(info)
+        if record_id is None:
+            record_id = record_ids[info] = len(record_ids)
+            records.extend(intern(text) for text in info)
+        for position in layout.keys:
+            key = normalize_key(_cell(values, position))
+            if key:
+                # Primeira ocorrência da chave prevalece
+                keys.setdefault(key, record_id)
+
+    # Tabela com fator de carga <= 0.5 (potência de 2)
+    n_slots = 8
+    while n_slots < 2 * len(keys):
+        n_slots *= 2
+    mask = n_slots - 1
+    slots = array('I', bytes(8 * n_slots))
+    for key, record_id in keys.items():
+        key_id = intern(key)
+        slot = zlib.crc32(key.encode('utf-8')) & mask
+        while slots[2 * slot]:
+            slot = (slot + 1) & mask
+        slots[2 * slot] = key_id + 1
+        slots[2 * slot + 1] = record_id
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, sheet_hash.encode('ascii'),
+                               len(offsets) - 1, len(records) // RECORD_WIDTH,
+                               n_slots, len(blob)))
+        offsets.tofile(file)
+        records.tofile(file)
+        slots.tofile(file)
+        file.write(blob)
+    os.replace(tmp_path, path)
+    return len(keys)
+
+
+class ProductMaster:
+    """Índice do cadastro mapeado em memória (somente leitura)"""
+
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = path
+        with open(path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            (magic, version, sheet_hash, n_strings, n_records,
+             n_slots, blob_size) = HEADER.unpack_from(self._mmap, 0)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f'Índice de cadastro inválido: {path}')
+            self.sheet_hash = sheet_hash.decode('ascii')
+            self.record_count = n_records
+            view = memoryview(self._mmap)
+            position = HEADER.size
+            sections = []
+            for count in (n_strings + 1, n_records * RECORD_WIDTH, n_slots * 2):
+                sections.append(view[position:position + 4 * count].cast('I'))
+                position += 4 * count
+            self._offsets, self._records, self._slots = sections
+            self._blob_start = position
+            self._views = sections + [view]
+        except Exception:
+            self._views = []
+            self._mmap.close()
+            raise
+        self._mask = n_slots - 1
+        self._infos = {}
+
+    def close(self):
+        for view in self._views:
+            view.release()
+        self._views = []
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return sum(1 for slot in self._slots[::2] if slot)
+
+    def _string(self, string_id):
+        start = self._blob_start
+        return self._mmap[start + self._offsets[string_id]:start + self._offsets[string_id + 1]]
+
+    def _find(self, encoded):
+        """Id do registro da chave (sondagem linear) ou -1"""
+        slots, offsets, data = self._slots, self._offsets, self._mmap
+        start, mask, size = self._blob_start, self._mask, len(encoded)
+        slot = zlib.crc32(encoded) & mask
+        while True:
+            key_id = slots[2 * slot]
+            if not key_id:
+                return -1
+            begin = start + offsets[key_id - 1]
+            end = start + offsets[key_id]
+            if end - begin == size and data[begin:end] == encoded:
+                return slots[2 * slot + 1]
+            slot = (slot + 1) & mask
+
+    def _info(self, record_id):
+        info = self._infos.get(record_id)
+        if info is None:
+            base = record_id * RECORD_WIDTH
+            info = self._infos[record_id] = ProductInfo(
+                *(self._string(self._records[base + i]).decode('utf-8') for i in range(RECORD_WIDTH)))
+        return info
+
+    def lookup(self, *keys):
+        """ProductInfo da primeira chave encontrada (SKU, UPC...) ou None"""
+        for key in keys:
+            if not key:
+                continue
+            record_id = self._find(normalize_key(key).encode('utf-8'))
+            if record_id >= 0:
+                return self._info(record_id)
+        return None
+
+
+def open_index(path=DEFAULT_INDEX_PATH):
+    """Índice existente ou None (ausente/corrompido)"""
+    try:
+        return ProductMaster(path)
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def reference_sheet_name(workbook):
+    """Nome real da aba de referência na pasta de trabalho, se existir"""
+    return next((name for name in workbook.sheet_names if name.lower() == REFERENCE_SHEET), None)
+
+
+def ensure_index(workbook, path=DEFAULT_INDEX_PATH):
+    """
+    Índice do cadastro para a pasta de trabalho: reutiliza o arquivo se o hash
+    da aba de referência não mudou, senão recompila. Sem a aba, usa o último
+    índice gerado (ou None).
+    """
+    name = reference_sheet_name(workbook)
+    master = open_index(path)
+    if name is None:
+        return master
+
+    sheet_hash = workbook.sheet_hash(name)
+    if master is not None:
+        if master.sheet_hash == sheet_hash:
+            return master
+        master.close()
+    build_index((values for _, values in workbook.iter_rows([name], all_strings=True)),
+                sheet_hash, path)
+    return ProductMaster(path)
+
+
+def main():
+    """Função principal - API mode"""
+    commands = ['build', 'lookup']
+    if len(sys.argv) < 3 or sys.argv[1] not in commands:
+        print(json.dumps({
+            'success': False,
+            'error': 'Uso: python product_master.py build <arquivo.xlsx> | lookup <chave> [...]',
+            'available_commands': commands
+        }))
+        return
+
+    try:
+        if sys.argv[1] == 'build':
+            from xlsx_reader import XLSXWorkbook
+
+            start = time.perf_counter()
+            with XLSXWorkbook(sys.argv[2]) as workbook:
+                master = ensure_index(workbook)
+            if master is None:
+                raise ValueError('Arquivo sem aba de referência (Sheet1)')
+            with master:
+                result = {'keys': len(master), 'records': master.record_count,
+                          'sheetHash': master.sheet_hash}
+            result['buildMs'] = round((time.perf_counter() - start) * 1000, 1)
+        else:
+            master = open_index()
+            if master is None:
+                raise ValueError('Índice de cadastro ainda não foi gerado')
+            with master:
+                result = {'products': {key: (info._asdict() if info else None)
+                                       for key in sys.argv[2:]
+                                       for info in [master.lookup(key)]}}
+        print(json.dumps({
+            'success': True,
+            **result,
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        }))
+    except Exception as e:
+        print(json.dumps({
+            'success': False,
+            'error': str(e),
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        }))
+
+
+if __name__ == "__main__":
+    main()
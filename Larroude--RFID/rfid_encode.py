@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Planejador da gravação RFID de cada etiqueta (comandos ^RFR/^RFW)
+Emite só as operações de RF que o perfil do tag exige: a leitura prévia do
+TID só com verificação ligada, o PC (tamanho do EPC) só quando o EPC gravado
+tem tamanho diferente do que o inlay já traz de fábrica, e PC + EPC numa
+escrita só quando o inlay aceita BlockWrite. Cada operação evitada economiza
+uma ida e volta de RF por etiqueta. Espelho do backend/rfid-encode-planner.js.
+"""
+
+import os
+import sys
+import json
+
+EPC_BANK = 1
+TID_BANK = 2
+PC_WORD = 1          # palavra do PC no banco EPC (0 = CRC)
+EPC_START_WORD = 2   # início do EPC no banco EPC
+
+# Padrões sobrescritos pelas variáveis RFID_* (mesmas do backend Node)
+DEFAULT_TAG_PROFILE = {
+    'epc_bytes': int(os.environ.get('RFID_EPC_BYTES', '12')),                  # EPC gravado (12 bytes = 96 bits)
+    'factory_epc_bytes': int(os.environ.get('RFID_FACTORY_EPC_BYTES', '12')),  # tamanho que o PC do inlay já indica
+    'block_write': os.environ.get('RFID_BLOCK_WRITE') == '1',  # inlay aceita BlockWrite (PC + EPC numa operação)
+    'verify': os.environ.get('RFID_VERIFY') == '1',            # lê o TID antes de gravar (verificação)
+}
+
+PRE_READ = f'^RFR,H,0,12,{TID_BANK}^FS'
+
+
+def tag_profile(**overrides):
+    """Perfil do tag com os valores padrão completados"""
+    profile = dict(DEFAULT_TAG_PROFILE)
+    profile.update((key, value) for key, value in overrides.items() if value is not None)
+    epc_bytes = int(profile['epc_bytes'])
+    if epc_bytes % 2 or not 2 <= epc_bytes <= 62:
+        raise ValueError(f'Tamanho de EPC inválido: {epc_bytes} bytes (par, de 2 a 62)')
+    profile['epc_bytes'] = epc_bytes
+    profile['factory_epc_bytes'] = int(profile['factory_epc_bytes'])
+    return profile
+
+
+def pc_word(epc_bytes):
+    """PC com o tamanho do EPC em palavras nos bits 15-11 (12 bytes -> 3000)"""
+    return format((epc_bytes // 2) << 11, '04X')
+
+
+def label_epc(barcode, po_number, sequence, length=24):
+    """
+    EPC da unidade no formato ZebraDesigner: barcode (12) + PO (só dígitos) +
+    sequencial, completado com zeros (mesma regra do RFIDUtils do backend Node)
+    """
+    barcode = str(barcode or '000000000000')[:12].zfill(12)
+    po_digits = ''.join(filter(str.isdigit, str(po_number or '0000')))
+    return f"{barcode}{po_digits}{sequence or 1}".ljust(length, '0')
+
+
+def plan_encode(epc, profile=None):
+    """Lista mínima de comandos ZPL para gravar o EPC conforme o perfil"""
+    profile = profile or tag_profile()
+    epc_bytes = profile['epc_bytes']
+    commands = []
+    if profile['verify']:
+        commands.append(PRE_READ)
+
+    if epc_bytes == profile['factory_epc_bytes']:
+        commands.append(f'^RFW,H,{EPC_START_WORD},{epc_bytes},{EPC_BANK}^FD{epc}^FS')
+    elif profile['block_write']:
+        commands.append(f'^RFW,H,{PC_WORD},{epc_bytes + 2},{EPC_BANK}'
+                        f'^FD{pc_word(epc_bytes)}{epc}^FS')
+    else:
+        commands.append(f'^RFW,H,{PC_WORD},2,{EPC_BANK}^FD{pc_word(epc_bytes)}^FS')
+        commands.append(f'^RFW,H,{EPC_START_WORD},{epc_bytes},{EPC_BANK}^FD{epc}^FS')
+    return commands
+
+
+def main():
+    """Função principal - plano de gravação de um EPC"""
+    args = sys.argv[1:]
+    if len(args) < 2 or args[0] != 'plan':
+        print(json.dumps({
+            'success': False,
+            'error': 'Uso: python rfid_encode.py plan <epc> [--epc-bytes N] '
+                     '[--factory-epc-bytes N] [--block-write] [--verify]'
+        }))
+        return
+
+    try:
+        options = {}
+        rest = args[2:]
+        for index, arg in enumerate(rest):
+            if arg == '--verify':
+                options['verify'] = True
+            elif arg == '--block-write':
+                options['block_write'] = True
+            elif arg in ('--epc-bytes', '--factory-epc-bytes'):
+                options[arg[2:].replace('-', '_')] = int(rest[index + 1])
+        profile = tag_profile(**options)
+        commands = plan_encode(args[1], profile)
+        print(json.dumps({
+            'success': True,
+            'profile': profile,
+            'commands': commands,
+            'rfOperations': len(commands)
+        }))
+    except Exception as e:
+        print(json.dumps({
+            'success': False,
+            'error': str(e)
+        }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Reimpressão que respeita tags já gravados
+Antes de cada etiqueta lê o EPC do inlay sob a antena (SGD rfid.tag.read.*,
+sem avançar etiqueta) e compara com o EPC esperado para a unidade, recalculado
+dos dados da linha e do sequencial. Se já confere, imprime só a face (sem
+^RFW): não regrava o tag nem gasta a ida e volta de RF. Se não confere (tag
+virgem, outro EPC ou leitura sem resposta), imprime a etiqueta completa.
+Entrada (stdin): {"data": [...]} - os mesmos itens do /api/print-individual.
+"""
+
+import re
+import sys
+import json
+import time
+
+from label_preview import TEMPLATE_PATH, template_values
+from print_metrics import now, stage_histogram
+from printer_link import PrinterLinkError, open_link
+from rfid_encode import label_epc
+from vpm_parser import parse_vpm
+from zpl_rasterizer import PLACEHOLDER_RE
+
+RF_COMMAND_RE = re.compile(r'\^RF[RW][^^]*\^FD[^^]*\^FS\r?\n?')
+RF_WRITE_SIZE_RE = re.compile(r'\^RFW,H,\d*,(\d+)')
+HEX_RUN_RE = re.compile(r'[0-9A-Fa-f]+')
+
+
+def unit_epc(item, sequence):
+    """EPC esperado da unidade (mesma origem do /api/print-individual)"""
+    vpm = str(item.get('VPM') or item.get('SKU') or 'N/A')
+    record = parse_vpm(vpm)
+    po_number = str(item.get('PO') or record.po or '0000')
+    barcode_source = str(item.get('BARCODE') or record.compact or '00000000')
+    return label_epc(barcode_source[:12], po_number, sequence)
+
+
+def fill_template(template_text, values):
+    return PLACEHOLDER_RE.sub(lambda match: values.get(match.group(1), ''), template_text)
+
+
+def face_template(template_text):
+    """Template sem os comandos de RF (só a impressão da face)"""
+    return RF_COMMAND_RE.sub('', template_text)
+
+
+def written_hex_length(template_text):
+    """Quantos dígitos hex o ^RFW do template grava (o restante do EPC não vai ao tag)"""
+    match = RF_WRITE_SIZE_RE.search(template_text)
+    return int(match.group(1)) * 2 if match and match.group(1) else None
+
+
+def read_tag_epc(link):
+    """EPC do tag sob a antena em hex maiúsculo (None se não houver leitura)"""
+    link.sgd_set('rfid.tag.read.content', 'epc')
+    link.sgd_do('rfid.tag.read.execute')
+    result = link.sgd_get('rfid.tag.read.result_line1')
+    runs = [run for run in HEX_RUN_RE.findall(result) if len(run) >= 4 and len(run) % 2 == 0]
+    return max(runs, key=len).upper() if runs else None
+
+
+def iter_units(data):
+    """(unidade global 1..N, índice do item, item, sequencial) na ordem de impressão"""
+    unit = 0
+    for index, item in enumerate(data):
+        try:
+            quantity = int(item.get('QTY') or 1)
+        except (TypeError, ValueError):
+            quantity = 1
+        for sequence in range(1, max(quantity, 1) + 1):
+            unit += 1
+            yield unit, index, item, sequence
+
+
+def reprint_range(link, data, start=1, end=None, template_path=TEMPLATE_PATH):
+    """
+    Reimprime as unidades start..end (numeração global, 1 = primeira unidade
+    do primeiro item). Espera cada etiqueta sair antes de ler o próximo tag.
+    """
+    with open(template_path, 'r', encoding='utf-8') as file:
+        template_text = file.read()
+    face_text = face_template(template_text)
+    compare_length = written_hex_length(template_text)
+
+    verified = stage_histogram('rfid_verified', link.name)
+    spooled = stage_histogram('spool', link.name)
+    accepted = stage_histogram('printer_accepted', link.name)
+
+    results = []
+    for unit, index, item, sequence in iter_units(data):
+        if unit < start:
+            continue
+        if end is not None and unit > end:
+            break
+
+        expected = unit_epc(item, sequence)
+        started = now()
+        try:
+            tag_epc = read_tag_epc(link)
+            verified.since(started)
+        except PrinterLinkError:
+            tag_epc = None
+
+        length = compare_length or len(expected)
+        matches = tag_epc is not None and tag_epc[:length] == expected[:length].upper()
+
+        values = dict(template_values(item, sequence), RFID_DATA_HEX=expected)
+        started = now()
+        link.send(fill_template(face_text if matches else template_text, values))
+        spooled.since(started)
+        link.wait_idle()
+        accepted.since(started)
+
+        results.append({
+            'unit': unit,
+            'item': index,
+            'sequence': sequence,
+            'po': values['PO_INFO'][len('PO'):],
+            'barcode': values['BARCODE'],
+            'expectedEpc': expected,
+            'tagEpc': tag_epc,
+            'action': 'face' if matches else 'encode',
+        })
+    return results
+
+
+def main():
+    """Função principal - reimpressão de um intervalo de unidades"""
+    if len(sys.argv) < 4:
+        print(json.dumps({
+            'success': False,
+            'error': 'Uso: python rfid_reprint.py <endereço> <início> <fim> < {"data": [...]}'
+        }))
+        return
+
+    try:
+        payload = json.load(sys.stdin)
+        data = payload.get('data', []) if isinstance(payload, dict) else payload
+        start, end = int(sys.argv[2]), int(sys.argv[3])
+        with open_link(sys.argv[1]) as link:
+            results = reprint_range(link, data, start, end)
+        face_only = sum(1 for result in results if result['action'] == 'face')
+        print(json.dumps({
+            'success': True,
+            'units': results,
+            'totalUnits': len(results),
+            'faceOnly': face_only,
+            'encoded': len(results) - face_only,
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        }))
+    except Exception as e:
+        print(json.dumps({
+            'success': False,
+            'error': str(e),
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        }))
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,8 @@ import requests
 import json
 import time
 
+from vpm_parser import parse_vpm
+
 def test_po_extraction():
     """Testa se o sistema está extraindo PO corretamente"""
     print("📊 Testando extração de PO do arquivo...")
@@ -31,8 +33,7 @@ def test_po_extraction():
     
     print("📝 Dados de teste:")
     for i, item in enumerate(sample_data, 1):
-        vmp_parts = item["SKU"].split('-')
-        po_extracted = vmp_parts[0].replace('L', '') if vmp_parts else '0000'
+        po_extracted = parse_vpm(item["SKU"]).po or '0000'
         
         print(f"   {i}. {item['NAME']}")
         print(f"      SKU: {item['SKU']}")
@@ -50,8 +51,7 @@ def simulate_sequential_barcodes(data):
     all_labels = []
     
     for item in data:
-        vmp_parts = item["SKU"].split('-')
-        po_number = vmp_parts[0].replace('L', '') if vmp_parts else '0000'
+        po_number = parse_vpm(item["SKU"]).po or '0000'
         base_barcode = item["BARCODE"][:8]  # Primeiros 8 dígitos
         qty = int(item["QTY"])
         
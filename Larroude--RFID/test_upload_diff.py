@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Teste do diff entre uploads da mesma sessão (upload_diff.py)
+Roda sem impressora: python test_upload_diff.py (ou pytest test_upload_diff.py)
+"""
+
+import tempfile
+
+from upload_diff import UploadSession, hash_strings, item_columns
+
+
+def make_items(count):
+    return [{
+        'STYLE_NAME': 'SANDÁLIA TESTE',
+        'VPM': f'L{index:06d}-TESTE-PRETO-35',
+        'COLOR': 'PRETO',
+        'SIZE': '35',
+        'BARCODE': f'{7890000000000 + index}',
+        'DESCRIPTION': 'SANDALIA COURO',
+        'REF': 'REF-1',
+        'PO': 'PO-100',
+        'QTY': '1'
+    } for index in range(count)]
+
+
+def diff_twice(before, after):
+    with tempfile.TemporaryDirectory() as session_dir:
+        session = UploadSession('teste', session_dir=session_dir)
+        session.update(item_columns(before))
+        return session.update(item_columns(after))
+
+
+def test_hash_does_not_depend_on_column_width():
+    """O hash de um texto é o mesmo com ou sem um texto mais longo na coluna"""
+    alone = hash_strings(['ABC'])[0]
+    padded = hash_strings(['ABC', 'UM TEXTO BEM MAIS LONGO'])[0]
+    assert alone == padded
+
+
+def test_longer_description_changes_only_its_row():
+    """Uma DESCRIPTION mais longa altera só a própria linha"""
+    before = make_items(2000)
+    after = make_items(2000)
+    after[10]['DESCRIPTION'] = 'SANDALIA COURO COM DESCRICAO BEM MAIS LONGA'
+    diff = diff_twice(before, after)
+    assert diff['changed'] == 1
+    assert diff['added'] == 0 and diff['removed'] == 0
+    assert diff['rows'] == [10]
+
+
+def test_longer_vpm_adds_and_removes_only_its_row():
+    """Um VPM mais longo (chave da linha) vira uma linha nova e uma removida"""
+    before = make_items(2000)
+    after = make_items(2000)
+    after[5]['VPM'] = 'L000005-TESTE-PRETO-35-EDICAO-ESPECIAL'
+    diff = diff_twice(before, after)
+    assert diff['added'] == 1 and diff['removed'] == 1
+    assert diff['changed'] == 0
+    assert diff['rows'] == [5]
+
+
+def test_same_upload_is_unchanged():
+    items = make_items(500)
+    diff = diff_twice(items, items)
+    assert diff['unchanged'] == 500
+    assert diff['rows'] == []
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Diferença entre uploads da mesma sessão (re-upload da planilha de um PO)
+Cada linha normalizada vira (chave, impressão digital): chave = VPM + barcode
+(+ ocorrência, para linhas repetidas) e impressão = hash de todos os campos,
+calculados coluna a coluna com numpy. O índice da sessão anterior fica em
+disco em dois arrays de 64 bits; o diff aponta linhas novas, alteradas e
+removidas, e só elas precisam ser renderizadas de novo - o resto reaproveita
+o cache de previews.
+"""
+
+import os
+import sys
+import json
+import time
+import struct
+import hashlib
+
+import numpy as np
+
+from label_store import StringColumn
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SESSION_DIR = os.environ.get(
+    'UPLOAD_SESSION_DIR', os.path.join(BASE_DIR, 'backend', 'output', 'sessions'))
+MAX_SESSIONS = int(os.environ.get('UPLOAD_SESSION_MAX', '200'))
+
+ROW_FIELDS = ('STYLE_NAME', 'VPM', 'COLOR', 'SIZE', 'BARCODE', 'DESCRIPTION', 'REF', 'PO', 'QTY')
+
+HEADER = struct.Struct('<4sI')
+MAGIC = b'LUS2'
+
+_OFFSET = np.uint64(0xCBF29CE484222325)
+_PRIME = np.uint64(0x100000001B3)
+_MIX_1 = np.uint64(0xFF51AFD7ED558CCD)
+_MIX_2 = np.uint64(0xC4CEB9FE1A85EC53)
+_OCCURRENCE = np.uint64(0x9E3779B97F4A7C15)
+_SHIFT = np.uint64(33)
+
+
+def _mix(h):
+    """Finalizador de 64 bits (murmur3): espalha os bits do hash"""
+    h = (h ^ (h >> _SHIFT)) * _MIX_1
+    h = (h ^ (h >> _SHIFT)) * _MIX_2
+    return h ^ (h >> _SHIFT)
+
+
+def hash_strings(values):
+    """
+    Hash de 64 bits de cada texto, vetorizado (FNV-1a sobre os code points).
+    O array numpy tem a largura do maior texto; o preenchimento (code point 0)
+    fica fora do hash, senão o hash de um valor mudaria com a largura da coluna
+    """
+    n = len(values)
+    h = np.full(n, _OFFSET, dtype=np.uint64)
+    if not n:
+        return h
+    text = np.array(values, dtype=str)
+    width = text.dtype.itemsize // 4
+    chars = text.view(np.uint32).reshape(n, width)
+    for j in range(width):
+        code = chars[:, j]
+        h = np.where(code != 0, (h ^ code.astype(np.uint64)) * _PRIME, h)
+    return _mix(h)
+
+
+def _column_hashes(column):
+    """Hash por linha de uma coluna (StringColumn: só os valores distintos são hasheados)"""
+    if isinstance(column, StringColumn):
+        codes = np.frombuffer(column.codes, dtype=np.uint32) if len(column) else []
+        return hash_strings(column.values)[codes]
+    return hash_strings([str(value) for value in column])
+
+
+def row_fingerprints(columns):
+    """(chaves, impressões) de 64 bits por linha a partir de {campo: StringColumn | lista}"""
+    hashes = {field: _column_hashes(columns[field]) for field in ROW_FIELDS}
+    n = len(hashes['VPM'])
+    fingerprints = np.zeros(n, dtype=np.uint64)
+    for field in ROW_FIELDS:
+        fingerprints = _mix(fingerprints * _PRIME ^ hashes[field])
+    identity = _mix(hashes['VPM'] * _PRIME ^ hashes['BARCODE'])
+
+    # Ocorrência da mesma identidade (linhas repetidas) = posição dentro do grupo
+    order = np.argsort(identity, kind='stable')
+    ordered = identity[order]
+    starts = np.ones(n, dtype=bool)
+    starts[1:] = ordered[1:] != ordered[:-1]
+    group_start = np.maximum.accumulate(np.where(starts, np.arange(n), 0))
+    occurrence = np.empty(n, dtype=np.uint64)
+    occurrence[order] = np.arange(n) - group_start
+    return _mix(identity ^ occurrence * _OCCURRENCE), fingerprints
+
+
+def item_columns(data):
+    """Colunas {campo: lista} a partir de itens da API"""
+    return {field: [str(item.get(field, '')) for item in data] for field in ROW_FIELDS}
+
+
+class UploadSession:
+    """Índice de impressões do último upload de uma sessão"""
+
+    def __init__(self, session_id, session_dir=DEFAULT_SESSION_DIR):
+        self.session_id = str(session_id)
+        self.session_dir = session_dir
+        name = hashlib.blake2b(self.session_id.encode('utf-8'), digest_size=12).hexdigest()
+        self.path = os.path.join(session_dir, name + '.fp')
+
+    def load(self):
+        """(chaves, impressões) do upload anterior, ou None na primeira vez"""
+        try:
+            with open(self.path, 'rb') as file:
+                magic, count = HEADER.unpack(file.read(HEADER.size))
+                keys = np.fromfile(file, dtype='<u8', count=count)
+                fingerprints = np.fromfile(file, dtype='<u8', count=count)
+        except (OSError, struct.error):
+            return None
+        if magic != MAGIC or len(fingerprints) != count:
+            return None
+        return keys, fingerprints
+
+    def save(self, keys, fingerprints):
+        os.makedirs(self.session_dir, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, len(keys)))
+            file.write(keys.astype('<u8').tobytes())
+            file.write(fingerprints.astype('<u8').tobytes())
+        os.replace(tmp_path, self.path)
+        self._prune()
+
+    def _prune(self):
+        """Mantém só as MAX_SESSIONS sessões usadas mais recentemente"""
+        entries = [entry for entry in os.scandir(self.session_dir) if entry.name.endswith('.fp')]
+        if len(entries) <= MAX_SESSIONS:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - MAX_SESSIONS]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def update(self, columns):
+        """
+        Compara o upload ({campo: coluna}, ver item_columns) com o anterior da
+        sessão e grava o novo índice. Retorna {firstUpload, added, changed,
+        removed, unchanged, rows}, onde rows são os índices (no upload atual)
+        das linhas novas ou alteradas
+        """
+        keys, fingerprints = row_fingerprints(columns)
+        previous = self.load()
+        self.save(keys, fingerprints)
+
+        n = len(keys)
+        if previous is None:
+            return {'firstUpload': True, 'added': n, 'changed': 0,
+                    'removed': 0, 'unchanged': 0, 'rows': list(range(n))}
+
+        old_keys, old_fingerprints = previous
+        found = changed = np.zeros(n, dtype=bool)
+        if len(old_keys):
+            order = np.argsort(old_keys)
+            old_keys, old_fingerprints = old_keys[order], old_fingerprints[order]
+            position = np.minimum(np.searchsorted(old_keys, keys), len(old_keys) - 1)
+            found = old_keys[position] == keys
+            changed = found & (old_fingerprints[position] != fingerprints)
+        added = n - int(found.sum())
+        changed_count = int(changed.sum())
+        return {
+            'firstUpload': False,
+            'added': added,
+            'changed': changed_count,
+            'removed': len(old_keys) - int(found.sum()),
+            'unchanged': n - added - changed_count,
+            'rows': np.flatnonzero(~found | changed).tolist(),
+        }
+
+
+def main():
+    """Função principal - diff de itens (JSON via stdin) contra a sessão"""
+    if len(sys.argv) < 2:
+        print(json.dumps({
+            'success': False,
+            'error': 'Uso: python upload_diff.py <sessão> < {"data": [...]}'
+        }))
+        return
+
+    try:
+        payload = json.load(sys.stdin)
+        start = time.perf_counter()
+        diff = UploadSession(sys.argv[1]).update(item_columns(payload.get('data') or []))
+        print(json.dumps({
+            'success': True,
+            'diff': diff,
+            'diffMs': round((time.perf_counter() - start) * 1000, 1),
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        }))
+    except Exception as e:
+        print(json.dumps({
+            'success': False,
+            'error': str(e),
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        }))
+
+
+if __name__ == "__main__":
+    main()
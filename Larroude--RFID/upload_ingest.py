@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Ingestão dos arquivos de upload (planilhas XLSX e CSV de etiquetas)
+Identifica o layout de cada aba/arquivo uma vez pelo cabeçalho - padrão
+(NAME/DESCRIPTION/SKU/BARCODE/REF) ou alternativo (Variant SKU/UPC) - e mapeia
+as linhas em colunas tipadas à medida que são lidas. A aba Sheet1 (banco de
+dados de referência) não é lida linha a linha: vira o índice do cadastro
+(product_master), usado para cor, nome do estilo e REF.
+Pode ser chamado como subprocesso pelo Node.js
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import zipfile
+from array import array
+from operator import itemgetter
+
+from csv_reader import CHUNK_ROWS, CSVFile
+from label_search import build_index, new_index_id
+from label_store import StringColumn
+from print_metrics import span
+from product_master import REFERENCE_SHEET, ensure_index, open_index
+from upload_diff import UploadSession
+from vpm_parser import parse_vpm
+from xlsx_reader import XLSXWorkbook
+
+REQUIRED_COLUMNS = ('NAME', 'DESCRIPTION', 'SKU', 'BARCODE', 'REF')
+ALTERNATIVE_COLUMNS = ('Variant SKU', 'UPC')
+ITEM_FIELDS = ('STYLE_NAME', 'VPM', 'COLOR', 'SIZE', 'BARCODE', 'DESCRIPTION', 'REF', 'PO')
+DERIVED_FIELDS = ('STYLE_NAME', 'VPM', 'COLOR', 'SIZE', 'DESCRIPTION', 'REF', 'PO')
+
+# Códigos de cor do VPM -> nome (quando o produto não está no cadastro)
+COLOR_MAP = {
+    'WHIT': 'WHITE',
+    'BLCK': 'BLACK',
+    'BRWN': 'BROWN',
+    'NAVY': 'NAVY',
+    'NUDE': 'NUDE',
+    'SILV': 'SILVER',
+    'GOLD': 'GOLD',
+    'BEIG': 'BEIGE'
+}
+
+_LEADING_INT = re.compile(r'\s*([+-]?\d+)')
+
+
+def parse_int(value):
+    """Inteiro no início do texto (mesma regra do parseInt do JS) ou None"""
+    match = _LEADING_INT.match(str(value))
+    return int(match.group(1)) if match else None
+
+
+def parse_qty(value):
+    return max(parse_int(value) or 1, 1)
+
+
+def memo_map(func, values, memo):
+    """func aplicada a cada valor distinto uma única vez; o mapeamento roda em C"""
+    for value in set(values).difference(memo):
+        memo[value] = func(value)
+    return list(map(memo.__getitem__, values))
+
+
+class UploadLayout:
+    """Mapeamento do cabeçalho de uma aba, resolvido uma única vez"""
+
+    __slots__ = ('kind', 'positions')
+
+    def __init__(self, header):
+        header = [str(name).strip() for name in header]
+        index = {}
+        for position, name in enumerate(header):
+            index.setdefault(name, position)
+
+        if all(name in index for name in REQUIRED_COLUMNS):
+            self.kind = 'standard'
+            names = REQUIRED_COLUMNS + ('QTY',)
+        elif all(name in index for name in ALTERNATIVE_COLUMNS):
+            self.kind = 'alternative'
+            names = ALTERNATIVE_COLUMNS
+        else:
+            self.kind = None
+            names = ()
+        self.positions = {name: index[name] for name in names if name in index}
+
+    def columns(self, rows):
+        """column(nome) -> valores da coluna no bloco de linhas, sem espaços nas pontas"""
+        width = max(self.positions.values()) + 1
+        if min(map(len, rows)) < width:
+            rows = [row if len(row) >= width else row + [''] * (width - len(row)) for row in rows]
+
+        def column(name):
+            position = self.positions.get(name)
+            if position is None:
+                return [''] * len(rows)
+            return list(map(str.strip, map(itemgetter(position), rows)))
+        return column
+
+
+class ItemColumns:
+    """
+    Itens do upload em colunas tipadas: texto codificado por dicionário, QTY
+    inteiro e BARCODE como lista (é praticamente único por linha)
+    """
+
+    def __init__(self, master=None):
+        self.columns = {field: StringColumn() for field in DERIVED_FIELDS}
+        self.columns['BARCODE'] = []
+        self.qty = array('I')
+        self.master = master
+        self.enriched = 0
+        self._memo = {'qty': {}, 'vpm': {}, 'product': {}, 'standard': {}, 'alternative': {}}
+
+    def __len__(self):
+        return len(self.qty)
+
+    def _products(self, skus, barcodes):
+        """Produto do cadastro por SKU e, na falta, por UPC/barcode (ou None)"""
+        master = self.master
+        if master is None:
+            return [None] * len(skus)
+        products = memo_map(master.lookup, skus, self._memo['product'])
+        if None in products:
+            products = [product if product is not None else master.lookup(barcode)
+                        for product, barcode in zip(products, barcodes)]
+        return products
+
+    @staticmethod
+    def _derive(kind, key):
+        """Campos derivados de uma combinação distinta (mesma regra do /api/upload-excel)"""
+        if kind == 'standard':
+            name, sku, description, ref, product = key
+        else:
+            sku, product = key
+            name = parse_vpm(sku).style_code
+            description = f"Produto {name}"
+            ref = sku.split('-')[0]
+
+        record = parse_vpm(sku)
+        color = None
+        if product is not None:
+            # Cadastro prevalece sobre o que é derivado do SKU; NAME/REF da planilha são mantidos
+            if kind != 'standard' or not name:
+                name = product.style_name or name
+                if kind != 'standard':
+                    description = f"Produto {name}"
+            if kind != 'standard' or not ref:
+                ref = product.ref or ref
+            color = product.color
+        if not color:
+            last_word = description.split(' ')[-1] if description else ''
+            color = COLOR_MAP.get(record.color_code) or last_word or record.color_code or 'N/A'
+        return (name, record.raw, color, record.size or 'N/A', description, ref,
+                record.po or '0000')
+
+    def extend_rows(self, layout, rows):
+        """
+        Normaliza um bloco de linhas coluna a coluna. A derivação roda uma vez
+        por combinação distinta (um lote tem poucas centenas de SKUs)
+        """
+        if not rows or layout is None or not layout.kind:
+            return
+        column = layout.columns(rows)
+        if layout.kind == 'standard':
+            skus, barcodes = column('SKU'), column('BARCODE')
+            products = self._products(skus, barcodes)
+            keys = zip(column('NAME'), skus, column('DESCRIPTION'), column('REF'), products)
+            qtys = memo_map(parse_qty, column('QTY'), self._memo['qty'])
+        else:
+            skus, barcodes = column('Variant SKU'), column('UPC')
+            products = self._products(skus, barcodes)
+            keys = zip(skus, products)
+            qtys = [1] * len(rows)
+        columns = self.columns
+
+        def encode(key):
+            values = self._derive(layout.kind, key)
+            return tuple(columns[field].encode(value) for field, value in zip(DERIVED_FIELDS, values))
+
+        # Códigos de dicionário de cada combinação distinta, repetidos por linha
+        codes = memo_map(encode, list(keys), self._memo[layout.kind])
+        self.enriched += len(products) - products.count(None)
+
+        for position, field in enumerate(DERIVED_FIELDS):
+            columns[field].codes.extend(map(itemgetter(position), codes))
+        columns['BARCODE'].extend(barcodes)
+        self.qty.extend(qtys)
+
+    def row_columns(self):
+        """Colunas por campo da API (QTY como texto), para o diff de uploads"""
+        return {**self.columns, 'QTY': [str(qty) for qty in self.qty]}
+
+    def to_items(self):
+        """Itens no formato da API"""
+        columns = [(field, self.columns[field]) for field in ITEM_FIELDS]
+        items = []
+        for index, qty in enumerate(self.qty):
+            item = {field: column[index] for field, column in columns}
+            item['QTY'] = qty
+            items.append(item)
+        return items
+
+
+def load_master(workbook):
+    """Índice do cadastro para o upload; sem ele a cor volta à regra do SKU"""
+    try:
+        return ensure_index(workbook)
+    except (OSError, ValueError) as e:
+        print(f"Aviso: cadastro de produtos indisponível: {e}", file=sys.stderr)
+        return None
+
+
+def read_workbook(path):
+    """Lê as abas de etiquetas de um XLSX em streaming (Sheet1 só alimenta o cadastro)"""
+    with XLSXWorkbook(path) as workbook:
+        items = ItemColumns(load_master(workbook))
+        names = [name for name in workbook.sheet_names if name.lower() != REFERENCE_SHEET]
+        layouts = {}
+        rows = dict.fromkeys(names, 0)
+        chunk, chunk_layout = [], None
+        try:
+            for sheet, values in workbook.iter_rows(names):
+                layout = layouts.get(sheet)
+                if layout is None:
+                    # Primeira linha com conteúdo = cabeçalho
+                    layouts[sheet] = UploadLayout(values)
+                    continue
+                if any(values):
+                    rows[sheet] += 1
+                    if layout.kind:
+                        # Blocos de linhas de uma mesma aba
+                        if layout is not chunk_layout or len(chunk) >= CHUNK_ROWS:
+                            items.extend_rows(chunk_layout, chunk)
+                            chunk, chunk_layout = [], layout
+                        chunk.append(values)
+            items.extend_rows(chunk_layout, chunk)
+        finally:
+            if items.master is not None:
+                items.master.close()
+                items.master = None
+    sheets = [{'name': name, 'layout': layouts[name].kind if name in layouts else None,
+               'rows': rows[name]} for name in names]
+    return items, sheets
+
+
+def read_csv(path):
+    """Lê um CSV em blocos; o cadastro usado é o último índice gerado"""
+    with CSVFile(path) as table:
+        items = ItemColumns(open_index())
+        layout = UploadLayout(table.header or [])
+        rows = 0
+        try:
+            for chunk in table.iter_chunks():
+                rows += len(chunk)
+                items.extend_rows(layout, chunk)
+        finally:
+            if items.master is not None:
+                items.master.close()
+                items.master = None
+    name = os.path.basename(path)
+    return items, [{'name': name, 'layout': layout.kind, 'rows': rows, 'encoding': table.encoding}]
+
+
+def ingest_error(sheets, file_format='xlsx'):
+    """Mensagem quando nenhuma linha válida foi lida"""
+    if not any(sheet['rows'] for sheet in sheets):
+        if file_format == 'csv':
+            return 'Arquivo CSV deve ter pelo menos cabeçalho e uma linha de dados'
+        return 'Arquivo está vazio'
+    return ('Nenhuma aba com colunas válidas encontrada. Esperado: '
+            f"{', '.join(REQUIRED_COLUMNS)} ou {', '.join(ALTERNATIVE_COLUMNS)}")
+
+
+def main():
+    """Função principal - API mode"""
+    readers = {'xlsx': read_workbook, 'csv': read_csv}
+    if len(sys.argv) < 3 or sys.argv[1] not in readers:
+        print(json.dumps({
+            'success': False,
+            'error': 'Uso: python upload_ingest.py xlsx|csv <arquivo> [--session <id>]',
+            'available_commands': list(readers)
+        }))
+        return
+
+    file_format = sys.argv[1]
+    session = sys.argv[sys.argv.index('--session') + 1] if '--session' in sys.argv[3:-1] else None
+    try:
+        start = time.perf_counter()
+        with span('ingest'):
+            items, sheets = readers[file_format](sys.argv[2])
+        data = items.to_items()
+        if not data:
+            print(json.dumps({
+                'success': False,
+                'error': ingest_error(sheets, file_format),
+                'sheets': sheets
+            }))
+            return
+        # Re-upload da mesma sessão: só as linhas novas/alteradas precisam ser renderizadas
+        columns = items.row_columns()
+        diff = UploadSession(session).update(columns) if session else None
+        # Índice de pesquisa deste upload (a lista do frontend consulta por página);
+        # a sessão (nome do arquivo) só identifica o diff
+        search = build_index(new_index_id(), columns)
+        print(json.dumps({
+            'success': True,
+            'data': data,
+            'totalRecords': len(data),
+            'enrichedRecords': items.enriched,
+            'sheets': sheets,
+            'diff': diff,
+            'searchId': search['searchId'] if search else None,
+            'ingestMs': round((time.perf_counter() - start) * 1000, 1),
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        }))
+    except zipfile.BadZipFile:
+        print(json.dumps({
+            'success': False,
+            'error': 'Arquivo XLSX inválido ou corrompido',
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        }))
+    except Exception as e:
+        print(json.dumps({
+            'success': False,
+            'error': str(e),
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Parser estruturado do VPM (ex.: L458-JASM-11.0-SILV-1885)
+Cada VPM distinto é interpretado uma única vez num registro com __slots__ e
+componentes internados; lotes com milhares de unidades e poucas centenas de
+SKUs compartilham os mesmos registros e strings.
+"""
+
+import sys
+import json
+from functools import lru_cache
+
+VPM_SEPARATOR = '-'
+VPM_PARTS = 5   # PO-ESTILO-TAMANHO-COR-LOCAL
+
+
+class VPM:
+    """Componentes de um VPM (somente leitura, compartilhado pelo cache)"""
+
+    __slots__ = ('raw', 'po', 'style_code', 'size', 'color_code', 'local',
+                 'local_number', 'compact', 'parts_count')
+
+    def __init__(self, raw):
+        parts = raw.split(VPM_SEPARATOR)
+        self.raw = sys.intern(raw)
+        self.parts_count = len(parts)
+
+        parts = [sys.intern(p) for p in parts] + [''] * (VPM_PARTS - len(parts))
+        # PO: primeira parte sem o 'L' (L264 -> 264)
+        self.po = sys.intern(parts[0].replace('L', '', 1))
+        self.style_code = parts[1]
+        self.size = parts[2]
+        self.color_code = parts[3]
+        self.local = parts[4]
+        self.local_number = sys.intern(self.local[:3]) if self.local else '000'
+        # VPM sem separadores (fallback do barcode)
+        self.compact = sys.intern(raw.replace(VPM_SEPARATOR, ''))
+
+    @property
+    def is_complete(self):
+        return self.parts_count >= VPM_PARTS
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f"VPM({self.raw!r})"
+
+
+@lru_cache(maxsize=65536)
+def parse_vpm(vpm):
+    """Registro do VPM, interpretado uma vez por valor distinto"""
+    return VPM(str(vpm or ''))
+
+
+def main():
+    """Função principal - interpreta os VPMs passados na linha de comando"""
+    if len(sys.argv) < 2:
+        print(json.dumps({
+            'success': False,
+            'error': 'Informe ao menos um VPM',
+            'usage': 'python vpm_parser.py L458-JASM-11.0-SILV-1885 [...]'
+        }))
+        return
+
+    print(json.dumps({
+        'success': True,
+        'vpms': [parse_vpm(vpm).as_dict() for vpm in sys.argv[1:]]
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Envio RAW pela fila de impressão do Windows (spooler)
+O pywin32 (win32print/win32api) e o pyserial só são importados no primeiro
+uso: importar este módulo custa só a biblioteca padrão, e os scripts que o
+usam carregam em qualquer sistema - fora do Windows o erro aparece apenas
+quando a fila é de fato acessada. Renderização, validação e exportação não
+passam por aqui.
+Pode ser chamado como subprocesso pelo Node.js (ZPL pelo stdin)
+"""
+
+import re
+import sys
+import json
+import time
+import importlib
+
+DEFAULT_PRINTER = "ZDesigner ZD621R-203dpi ZPL"
+ZEBRA_NAMES = ('zebra', 'zd621r')
+PRINT_QUANTITY_RE = re.compile(r'\^PQ\d+,0,1,Y')
+
+
+class DriverUnavailable(ImportError):
+    """Driver da plataforma ausente (ex.: pywin32 fora do Windows)"""
+
+
+class LazyModule:
+    """Módulo importado no primeiro acesso a um atributo"""
+
+    def __init__(self, name, requirement):
+        self._name = name
+        self._requirement = requirement
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            try:
+                self._module = importlib.import_module(self._name)
+            except ImportError as e:
+                raise DriverUnavailable(
+                    f'{self._name} indisponível ({e}); requer {self._requirement}') from e
+        return self._module
+
+    def __getattr__(self, attribute):
+        return getattr(self._load(), attribute)
+
+
+win32print = LazyModule('win32print', 'pywin32 no Windows')
+win32api = LazyModule('win32api', 'pywin32 no Windows')
+list_ports = LazyModule('serial.tools.list_ports', 'pyserial')
+
+
+def list_printers():
+    """Impressoras locais e conectadas: [{name, server, description}]"""
+    printers = win32print.EnumPrinters(win32print.PRINTER_ENUM_LOCAL | win32print.PRINTER_ENUM_CONNECTIONS)
+    return [{'name': printer[2], 'server': printer[1] or '', 'description': printer[0] or ''}
+            for printer in printers]
+
+
+def zebra_printers():
+    """Nomes das impressoras Zebra instaladas"""
+    return [printer['name'] for printer in list_printers()
+            if any(name in printer['name'].lower() for name in ZEBRA_NAMES)]
+
+
+def printer_info(printer_name=DEFAULT_PRINTER):
+    """Porta, driver, status e fila da impressora"""
+    handle = win32print.OpenPrinter(printer_name)
+    try:
+        info = win32print.GetPrinter(handle, 2)
+    finally:
+        win32print.ClosePrinter(handle)
+    return {
+        'printer_name': info['pPrinterName'],
+        'port': info['pPortName'],
+        'driver': info['pDriverName'],
+        'status': info['Status'],
+        'jobs_in_queue': info['cJobs'],
+        'online': info['Status'] == 0,
+    }
+
+
+def set_copies(zpl, copies):
+    """Ajusta o ^PQ para o número de cópias (ou o acrescenta antes do ^XZ)"""
+    if copies <= 1:
+        return zpl
+    if '^PQ' not in zpl:
+        return zpl.replace('^XZ', f'^PQ{copies},0,1,Y\n^XZ')
+    return PRINT_QUANTITY_RE.sub(f'^PQ{copies},0,1,Y', zpl)
+
+
+def send_raw(data, printer_name=DEFAULT_PRINTER, doc_name='Python_ZPL_Job'):
+    """Um job RAW com os bytes (sem passar pelo driver gráfico)"""
+    handle = win32print.OpenPrinter(printer_name)
+    try:
+        job_id = win32print.StartDocPrinter(handle, 1, (doc_name, None, 'RAW'))
+        try:
+            win32print.StartPagePrinter(handle)
+            bytes_written = win32print.WritePrinter(handle, data)
+            win32print.EndPagePrinter(handle)
+        finally:
+            win32print.EndDocPrinter(handle)
+        info = win32print.GetPrinter(handle, 2)
+    finally:
+        win32print.ClosePrinter(handle)
+    return {
+        'job_id': job_id,
+        'bytes_written': bytes_written,
+        'jobs_in_queue': info['cJobs'],
+        'printer_status': info['Status'],
+    }
+
+
+def purge_jobs(printer_name=DEFAULT_PRINTER, job_ids=None):
+    """
+    Remove jobs da fila do spooler (todos, ou só os de job_ids) e devolve os
+    ids removidos - os que já saíram para a impressora não estão mais na fila
+    """
+    wanted = None if job_ids is None else set(job_ids)
+    handle = win32print.OpenPrinter(printer_name)
+    try:
+        purged = []
+        for job in win32print.EnumJobs(handle, 0, -1, 1):
+            if wanted is None or job['JobId'] in wanted:
+                win32print.SetJob(handle, job['JobId'], 0, None, win32print.JOB_CONTROL_DELETE)
+                purged.append(job['JobId'])
+    finally:
+        win32print.ClosePrinter(handle)
+    return purged
+
+
+def main():
+    """Função principal - list | info | send (ZPL pelo stdin) | purge"""
+    args = sys.argv[1:]
+    if not args or args[0] not in ('list', 'info', 'send', 'purge'):
+        print(json.dumps({
+            'success': False,
+            'error': 'Uso: python windows_spooler.py list | info [impressora] | '
+                     'send [impressora] [--copies N] [--encoding ascii] < etiqueta.zpl | '
+                     'purge [impressora] [--jobs 12,13]'
+        }))
+        return
+
+    command = args[0]
+    options, positional = {}, []
+    rest = iter(args[1:])
+    for arg in rest:
+        if arg.startswith('--'):
+            options[arg] = next(rest, '')
+        else:
+            positional.append(arg)
+    printer_name = positional[0] if positional else DEFAULT_PRINTER
+    try:
+        if command == 'list':
+            printers = list_printers()
+            result = {'printers': printers, 'count': len(printers)}
+        elif command == 'info':
+            result = printer_info(printer_name)
+        elif command == 'purge':
+            jobs = options.get('--jobs')
+            job_ids = [int(job_id) for job_id in jobs.split(',') if job_id] if jobs is not None else None
+            result = {'purged': purge_jobs(printer_name, job_ids)}
+        else:
+            copies = int(options.get('--copies', 1))
+            encoding = options.get('--encoding', 'ascii')
+            zpl = set_copies(sys.stdin.read(), copies)
+            result = dict(send_raw(zpl.encode(encoding, errors='ignore'), printer_name),
+                          copies_sent=copies)
+        print(json.dumps({
+            'success': True,
+            **result,
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        }))
+    except Exception as e:
+        print(json.dumps({
+            'success': False,
+            'error': str(e),
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Leitor XLSX em streaming (somente biblioteca padrão)
+Percorre o XML das abas linha a linha com expat, sem carregar a planilha
+inteira. Só as abas pedidas são abertas, e da tabela de strings compartilhadas
+só são guardadas as entradas que essas abas usam - a aba de referência
+(Sheet1) não é lida quando não é pedida.
+"""
+
+import re
+import hashlib
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+from xml.parsers import expat
+
+NS_MAIN = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+NS_REL = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+NS_PKG_REL = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+_CELL_REF = re.compile(r'([A-Z]+)')
+
+
+_COLUMNS = {}
+_LOCAL_NAMES = {}
+
+
+def column_index(cell_ref):
+    """Índice (0-based) da coluna de uma referência como 'AB12'"""
+    letters = cell_ref.rstrip('0123456789')
+    index = _COLUMNS.get(letters)
+    if index is None:
+        index = 0
+        for letter in _CELL_REF.match(letters).group(1):
+            index = index * 26 + (ord(letter) - 64)
+        index = _COLUMNS[letters] = index - 1
+    return index
+
+
+def _local_name(tag):
+    """Nome do elemento sem prefixo de namespace (x:row -> row)"""
+    name = _LOCAL_NAMES.get(tag)
+    if name is None:
+        name = _LOCAL_NAMES[tag] = tag.rpartition(':')[2]
+    return name
+
+
+def format_number(text):
+    """Número da célula como texto, sem '.0' em inteiros (barcodes, QTY)"""
+    if 'E' in text or 'e' in text or '.' in text:
+        try:
+            number = float(text)
+        except ValueError:
+            return text
+        if number.is_integer():
+            return str(int(number))
+        return repr(number)
+    return text
+
+
+class XLSXWorkbook:
+    """Pasta de trabalho XLSX aberta para leitura em streaming"""
+
+    def __init__(self, path):
+        self.path = path
+        self._zip = zipfile.ZipFile(path)
+        self.sheets = self._read_sheet_index()
+        self._shared_strings_path = self._find_shared_strings()
+
+    def close(self):
+        self._zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def sheet_names(self):
+        return list(self.sheets)
+
+    def _read_sheet_index(self):
+        """{nome da aba: caminho do XML} na ordem da pasta de trabalho"""
+        rels = ET.fromstring(self._zip.read('xl/_rels/workbook.xml.rels'))
+        targets = {}
+        for rel in rels.iter(NS_PKG_REL + 'Relationship'):
+            target = rel.get('Target')
+            path = target.lstrip('/') if target.startswith('/') else posixpath.join('xl', target)
+            targets[rel.get('Id')] = posixpath.normpath(path)
+
+        workbook = ET.fromstring(self._zip.read('xl/workbook.xml'))
+        return {sheet.get('name'): targets[sheet.get(NS_REL + 'id')]
+                for sheet in workbook.iter(NS_MAIN + 'sheet')}
+
+    def _find_shared_strings(self):
+        names = set(self._zip.namelist())
+        return 'xl/sharedStrings.xml' if 'xl/sharedStrings.xml' in names else None
+
+    def sheet_hash(self, name):
+        """Hash do XML da aba (lido em blocos, sem interpretar)"""
+        digest = hashlib.sha1()
+        with self._zip.open(self.sheets[name]) as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                digest.update(block)
+        if self._shared_strings_path:
+            # Strings compartilhadas mudam sem mexer no XML da aba
+            digest.update(str(self._zip.getinfo(self._shared_strings_path).CRC).encode())
+        return digest.hexdigest()
+
+    # --- Leitura das linhas ---
+
+    def _iter_raw_rows(self, name):
+        """
+        Linhas como lista de (coluna, tipo, valor bruto), lidas com expat em
+        blocos de 64 KB - nenhuma árvore XML é montada
+        """
+        rows = []
+        row = None
+        column = 0
+        cell_type = 'n'
+        value = None
+        in_value = False
+
+        def start(tag, attrs):
+            nonlocal row, column, cell_type, value, in_value
+            tag = _local_name(tag)
+            if tag == 'c':
+                ref = attrs.get('r')
+                if ref:
+                    column = column_index(ref)
+                cell_type = attrs.get('t', 'n')
+                value = None
+            elif tag == 'v' or (tag == 't' and cell_type == 'inlineStr'):
+                in_value = True
+                if value is None:
+                    value = ''
+            elif tag == 'row':
+                row = []
+                column = 0
+            elif tag == 'rPh':
+                in_value = False
+
+        def end(tag):
+            nonlocal column, in_value
+            tag = _local_name(tag)
+            if tag == 'c':
+                if value is not None:
+                    row.append((column, cell_type, value))
+                column += 1
+            elif tag == 'v' or tag == 't':
+                in_value = False
+            elif tag == 'row':
+                rows.append(row)
+
+        def text(data):
+            nonlocal value
+            if in_value:
+                value += data
+
+        for _ in self._parse(self.sheets[name], start, end, text):
+            yield from rows
+            rows.clear()
+
+    def _parse(self, member, start, end, text):
+        """Alimenta o expat em blocos; gera um passo a cada bloco processado"""
+        parser = expat.ParserCreate()
+        parser.buffer_text = True
+        parser.StartElementHandler = start
+        parser.EndElementHandler = end
+        parser.CharacterDataHandler = text
+        with self._zip.open(member) as file:
+            while True:
+                block = file.read(1 << 16)
+                parser.Parse(block, not block)
+                yield
+                if not block:
+                    break
+
+    def _load_shared_strings(self, wanted=None):
+        """Só as strings compartilhadas cujos índices estão em `wanted` (None = todas)"""
+        strings = {}
+        if not self._shared_strings_path or wanted is not None and not wanted:
+            return strings
+        last = max(wanted) if wanted is not None else float('inf')
+        state = {'index': -1, 'parts': None, 'in_text': False, 'phonetic': False}
+
+        def start(tag, attrs):
+            tag = _local_name(tag)
+            if tag == 'si':
+                state['index'] += 1
+                state['parts'] = [] if wanted is None or state['index'] in wanted else None
+            elif tag == 't' and state['parts'] is not None and not state['phonetic']:
+                state['in_text'] = True
+            elif tag == 'rPh':
+                state['phonetic'] = True
+
+        def end(tag):
+            tag = _local_name(tag)
+            if tag == 't':
+                state['in_text'] = False
+            elif tag == 'rPh':
+                state['phonetic'] = False
+            elif tag == 'si' and state['parts'] is not None:
+                strings[state['index']] = ''.join(state['parts'])
+
+        def text(data):
+            if state['in_text']:
+                state['parts'].append(data)
+
+        for _ in self._parse(self._shared_strings_path, start, end, text):
+            if state['index'] > last:
+                break
+        return strings
+
+    def iter_rows(self, names, all_strings=False):
+        """
+        (aba, valores) de cada linha das abas pedidas, com as células em
+        ordem de coluna (lacunas como ''). Por padrão uma primeira passada
+        coleta os índices de strings usados; com all_strings=True a tabela
+        inteira é carregada e as abas são lidas uma vez só (abas que usam
+        quase todas as strings, como a de referência).
+        """
+        if all_strings:
+            shared = self._load_shared_strings()
+        else:
+            wanted = set()
+            for name in names:
+                for cells in self._iter_raw_rows(name):
+                    wanted.update(int(value) for _, cell_type, value in cells if cell_type == 's')
+            shared = self._load_shared_strings(wanted)
+
+        for name in names:
+            for cells in self._iter_raw_rows(name):
+                if not cells:
+                    continue
+                values = [''] * (cells[-1][0] + 1)
+                for column, cell_type, value in cells:
+                    if cell_type == 's':
+                        value = shared.get(int(value), '')
+                    elif cell_type == 'n':
+                        value = format_number(value)
+                    elif cell_type == 'b':
+                        value = 'TRUE' if value == '1' else 'FALSE'
+                    values[column] = value
+                yield name, values
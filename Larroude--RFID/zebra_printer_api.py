@@ -9,10 +9,11 @@ import sys
 import json
 import time
 import subprocess
-import win32print
 import tempfile
 from pathlib import Path
 
+from windows_spooler import zebra_printers
+
 class ZebraPrinterAPI:
     def __init__(self):
         self.printer_name = None
@@ -21,22 +22,13 @@ class ZebraPrinterAPI:
     def detect_printers(self):
         """Detecta impressoras Zebra e retorna JSON"""
         try:
-            printers = win32print.EnumPrinters(win32print.PRINTER_ENUM_LOCAL | win32print.PRINTER_ENUM_CONNECTIONS)
-            
-            zebra_printers = []
-            for printer in printers:
-                printer_name = printer[2]
-                if 'zebra' in printer_name.lower() or 'zd621r' in printer_name.lower():
-                    zebra_printers.append({
-                        'name': printer_name,
-                        'type': 'windows',
-                        'status': 'available'
-                    })
+            printers = [{'name': name, 'type': 'windows', 'status': 'available'}
+                        for name in zebra_printers()]
             
             return {
                 'success': True,
-                'printers': zebra_printers,
-                'count': len(zebra_printers),
+                'printers': printers,
+                'count': len(printers),
                 'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
             }
             
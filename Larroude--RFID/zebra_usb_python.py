@@ -7,11 +7,11 @@ import os
 import sys
 import time
 import subprocess
-import win32print
-import win32api
 import tempfile
 from pathlib import Path
 
+from windows_spooler import zebra_printers
+
 class ZebraUSBPrinter:
     def __init__(self):
         self.printer_name = None
@@ -23,17 +23,12 @@ class ZebraUSBPrinter:
         print("🔍 Detectando impressoras Zebra...")
         
         try:
-            # Listar todas as impressoras do Windows
-            printers = win32print.EnumPrinters(win32print.PRINTER_ENUM_LOCAL | win32print.PRINTER_ENUM_CONNECTIONS)
-            
-            zebra_printers = []
-            for printer in printers:
-                printer_name = printer[2]
-                if 'zebra' in printer_name.lower() or 'zd621r' in printer_name.lower():
-                    zebra_printers.append(printer_name)
-                    print(f"🖨️ Encontrada: {printer_name}")
+            # Impressoras Zebra instaladas no Windows
+            printers = zebra_printers()
+            for printer_name in printers:
+                print(f"🖨️ Encontrada: {printer_name}")
             
-            return zebra_printers
+            return printers
             
         except Exception as e:
             print(f"❌ Erro ao detectar impressoras: {e}")
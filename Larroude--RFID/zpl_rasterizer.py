@@ -0,0 +1,599 @@
+#!/usr/bin/env python3
+"""
+Rasterizador ZPL nativo para previews das etiquetas (203 dpi)
+Interpreta o subconjunto usado nos templates Larroudé (^FO/^FT, ^A0, ^GB,
+^FB, ^BC/^BE, ^BQ) e desenha direto num bitmap NumPy, sem SVG/Sharp.
+A camada estática de cada template é desenhada uma vez e reaproveitada;
+por etiqueta só os campos variáveis (^FN / {PLACEHOLDER}) são redesenhados.
+"""
+
+import re
+import sys
+import json
+import zlib
+import base64
+import struct
+import hashlib
+from functools import lru_cache
+
+import numpy as np
+
+from barcode_encoder import encode_code128, encode_ean13, encode_qr, parse_zpl_qr_data
+
+DPI = 203
+DEFAULT_WIDTH = 812    # 4.00" a 203 dpi
+DEFAULT_HEIGHT = 406   # 2.00" a 203 dpi
+
+PLACEHOLDER_RE = re.compile(r'\{([A-Z0-9_]+)\}')
+
+# Fonte bitmap 5x7 (colunas, bit 0 = linha de cima) para ASCII 32-126
+_FONT_5X7 = (
+    "0000000000", "00005F0000", "0007000700", "147F147F14", "242A7F2A12",
+    "2313086462", "3649562050", "0005030000", "001C224100", "0041221C00",
+    "14083E0814", "08083E0808", "0050300000", "0808080808", "0060600000",
+    "2010080402", "3E5149453E", "00427F4000", "4261514946", "2141454B31",
+    "1814127F10", "2745454539", "3C4A494930", "0171090503", "3649494936",
+    "064949291E", "0036360000", "0056360000", "0814224100", "1414141414",
+    "0041221408", "0201510906", "324979413E", "7E1111117E", "7F49494936",
+    "3E41414122", "7F4141221C", "7F49494941", "7F09090901", "3E4149497A",
+    "7F0808087F", "00417F4100", "2040413F01", "7F08142241", "7F40404040",
+    "7F020C027F", "7F0408107F", "3E4141413E", "7F09090906", "3E4151215E",
+    "7F09192946", "4649494931", "01017F0101", "3F4040403F", "1F2040201F",
+    "3F4038403F", "6314081463", "0708700807", "6151494543", "007F414100",
+    "0204081020", "0041417F00", "0402010204", "4040404040", "0001020400",
+    "2054545478", "7F48444438", "3844444420", "384444487F", "3854545418",
+    "087E090102", "0C5252523E", "7F08040478", "00447D4000", "2040443D00",
+    "7F10284400", "00417F4000", "7C04180478", "7C08040478", "3844444438",
+    "7C14141408", "081414187C", "7C08040408", "4854545420", "043F444020",
+    "3C4040207C", "1C2040201C", "3C4030403C", "4428102844", "0C5050503C",
+    "4464544C44", "0008364100", "00007F0000", "0041360800", "1008081008",
+)
+FONT_COLUMNS = 5
+FONT_ROWS = 7
+
+
+def _build_font():
+    glyphs = {}
+    for offset, hex_columns in enumerate(_FONT_5X7):
+        bitmap = np.zeros((FONT_ROWS, FONT_COLUMNS + 1), dtype=np.uint8)
+        for col in range(FONT_COLUMNS):
+            column_bits = int(hex_columns[col * 2:col * 2 + 2], 16)
+            for row in range(FONT_ROWS):
+                bitmap[row, col] = (column_bits >> row) & 1
+        glyphs[chr(32 + offset)] = bitmap
+    return glyphs
+
+
+_GLYPHS = _build_font()
+
+
+def font_metrics(height, width):
+    """Métricas aproximadas da fonte escalável 0 (CG Triumvirate)"""
+    advance = max(1, int(round(width * 0.55)))
+    cap_height = max(1, int(round(height * 0.75)))
+    return advance, cap_height
+
+
+@lru_cache(maxsize=8192)
+def _scaled_glyph(char, height, width):
+    """Glifo escalado para ^A0N,h,w (cache por caractere/tamanho)"""
+    glyph = _GLYPHS.get(char)
+    if glyph is None:
+        glyph = _GLYPHS['?'] if ord(char) > 32 else _GLYPHS[' ']
+    advance, cap_height = font_metrics(height, width)
+    rows = (np.arange(cap_height) * FONT_ROWS) // cap_height
+    cols = (np.arange(advance) * (FONT_COLUMNS + 1)) // advance
+    scaled = glyph[np.ix_(rows, cols)]
+    scaled.setflags(write=False)
+    return scaled
+
+
+@lru_cache(maxsize=4096)
+def render_text_line(text, height, width):
+    """Linha de texto já rasterizada (altura = cap height)"""
+    if not text:
+        _, cap_height = font_metrics(height, width)
+        return np.zeros((cap_height, 0), dtype=np.uint8)
+    line = np.hstack([_scaled_glyph(char, height, width) for char in text])
+    line.setflags(write=False)
+    return line
+
+
+def text_width(text, height, width):
+    advance, _ = font_metrics(height, width)
+    return advance * len(text)
+
+
+def _rounded_rect_mask(height, width, radius):
+    ys = np.arange(height)[:, None]
+    xs = np.arange(width)[None, :]
+    if radius <= 0:
+        return np.ones((height, width), dtype=bool)
+    dx = np.maximum(np.maximum(radius - xs, xs - (width - 1 - radius)), 0)
+    dy = np.maximum(np.maximum(radius - ys, ys - (height - 1 - radius)), 0)
+    return dx * dx + dy * dy <= radius * radius
+
+
+@lru_cache(maxsize=1024)
+def graphic_box(width, height, thickness, rounding):
+    """Bitmap de um ^GB (moldura ou linha, com cantos arredondados)"""
+    thickness = max(1, thickness)
+    width = max(width, thickness)
+    height = max(height, thickness)
+    if not 0 <= rounding <= 8:
+        # Fora da faixa 0-8 a impressora usa o padrão (sem arredondamento)
+        rounding = 0
+    radius = (min(width, height) * rounding) // 32
+    outer = _rounded_rect_mask(height, width, radius)
+    inner_h = height - 2 * thickness
+    inner_w = width - 2 * thickness
+    if inner_h > 0 and inner_w > 0:
+        inner = _rounded_rect_mask(inner_h, inner_w, max(radius - thickness, 0))
+        outer[thickness:thickness + inner_h, thickness:thickness + inner_w] &= ~inner
+    box = outer.astype(np.uint8)
+    box.setflags(write=False)
+    return box
+
+
+@lru_cache(maxsize=4096)
+def _bars_bitmap(modules, module_width, height):
+    row = np.repeat(np.frombuffer(modules.encode('ascii'), dtype=np.uint8) - 48, module_width)
+    bars = np.broadcast_to(row, (height, row.size)).copy()
+    bars.setflags(write=False)
+    return bars
+
+
+@lru_cache(maxsize=4096)
+def _qr_bitmap(field_data, magnification):
+    ecc, text = parse_zpl_qr_data(field_data)
+    matrix = np.array(encode_qr(text, ecc), dtype=np.uint8)
+    scaled = np.kron(matrix, np.ones((magnification, magnification), dtype=np.uint8))
+    scaled.setflags(write=False)
+    return scaled
+
+
+def decode_field_hex(data, indicator):
+    """Decodifica escapes ^FH (ex.: _41 ou \\41) para os bytes originais"""
+    if not indicator or indicator not in data:
+        return data
+    pattern = re.compile(re.escape(indicator) + r'([0-9A-Fa-f]{2})')
+    return pattern.sub(lambda m: chr(int(m.group(1), 16)), data)
+
+
+def _int(value, default):
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return default
+
+
+class ZPLField:
+    """Um campo ZPL (^FO...^FS) já interpretado"""
+
+    __slots__ = ('kind', 'x', 'y', 'typeset', 'params', 'data', 'number',
+                 'hex_indicator', 'block', 'reverse', 'font')
+
+    def __init__(self):
+        self.kind = None
+        self.x = 0
+        self.y = 0
+        self.typeset = False
+        self.params = ()
+        self.data = None
+        self.number = None
+        self.hex_indicator = None
+        self.block = None
+        self.reverse = False
+        self.font = None
+
+    @property
+    def is_variable(self):
+        if self.number is not None:
+            return True
+        return bool(self.data and PLACEHOLDER_RE.search(self.data))
+
+
+class ZPLTemplate:
+    """Template ZPL interpretado uma vez, com camada estática em cache"""
+
+    def __init__(self, zpl_text):
+        self.source = zpl_text
+        self.version = template_version(zpl_text)
+        self.width = DEFAULT_WIDTH
+        self.height = DEFAULT_HEIGHT
+        self.fields = []
+        self._parse(zpl_text)
+        self.static_fields = [f for f in self.fields if not f.is_variable]
+        self.variable_fields = [f for f in self.fields if f.is_variable]
+        self._static_layer = None
+
+    # --- Interpretação ---
+
+    @staticmethod
+    def _commands(zpl_text):
+        """Quebra o texto em (comando, parâmetros) separando por '^'"""
+        for chunk in zpl_text.split('^')[1:]:
+            if not chunk:
+                continue
+            name = chunk[:2].upper()
+            params = chunk[2:]
+            if name[:1] == 'A':
+                # ^A0N,h,w: o nome da fonte vem colado no comando
+                name, params = 'A', chunk[1:]
+            if name not in ('FD', 'FX', 'FV'):
+                # Comentários ';' e comandos '~' no fim da linha não fazem parte do comando
+                params = re.split(r'[;~\r\n]', params, maxsplit=1)[0].strip()
+            yield name, params
+
+    def _parse(self, zpl_text):
+        home_x = home_y = 0
+        default_font = (30, 30)
+        by_module, by_height = 2, 10
+        field = ZPLField()
+
+        for name, params in self._commands(zpl_text):
+            args = params.split(',') if name not in ('FD', 'FV') else None
+            if name == 'PW':
+                self.width = _int(args[0], self.width)
+            elif name == 'LL':
+                self.height = _int(args[0], self.height)
+            elif name == 'LH':
+                home_x = _int(args[0], 0)
+                home_y = _int(args[1] if len(args) > 1 else 0, 0)
+            elif name == 'CF':
+                height = _int(args[1] if len(args) > 1 else '', default_font[0])
+                width = _int(args[2] if len(args) > 2 else '', height)
+                default_font = (height, width)
+            elif name == 'BY':
+                # A razão (2º parâmetro) só vale para simbologias de 2 larguras
+                by_module = _int(args[0], by_module)
+                if len(args) > 2 and args[2].strip():
+                    by_height = _int(args[2], by_height)
+            elif name in ('FO', 'FT'):
+                field.x = _int(args[0], 0) + home_x
+                field.y = _int(args[1] if len(args) > 1 else 0, 0) + home_y
+                field.typeset = name == 'FT'
+            elif name == 'A':
+                # ^A0N,h,w  (params = "0N,h,w")
+                font_args = params[1:].split(',')
+                height = _int(font_args[1] if len(font_args) > 1 else '', default_font[0])
+                width = _int(font_args[2] if len(font_args) > 2 else '', height)
+                field.font = (height, width)
+            elif name == 'FB':
+                field.block = (
+                    _int(args[0], 0),
+                    max(1, _int(args[1] if len(args) > 1 else 1, 1)),
+                    _int(args[2] if len(args) > 2 else 0, 0),
+                    (args[3].strip().upper() if len(args) > 3 and args[3].strip() else 'L'),
+                )
+            elif name == 'GB':
+                field.kind = 'box'
+                thickness = _int(args[2] if len(args) > 2 else 1, 1)
+                field.params = (
+                    _int(args[0], thickness),
+                    _int(args[1] if len(args) > 1 else thickness, thickness),
+                    thickness,
+                    _int(args[4] if len(args) > 4 else 0, 0),
+                )
+            elif name == 'BC':
+                field.kind = 'code128'
+                field.params = (
+                    by_module,
+                    _int(args[1] if len(args) > 1 else '', by_height),
+                    (args[2].strip().upper() if len(args) > 2 else 'Y') != 'N',
+                )
+            elif name == 'BE':
+                field.kind = 'ean13'
+                field.params = (
+                    by_module,
+                    _int(args[1] if len(args) > 1 else '', by_height),
+                    (args[2].strip().upper() if len(args) > 2 else 'Y') != 'N',
+                )
+            elif name == 'BQ':
+                field.kind = 'qr'
+                field.params = (min(max(_int(args[2] if len(args) > 2 else 2, 2), 1), 10),)
+            elif name.startswith('RF') or name in ('RS', 'HV', 'RB'):
+                field.kind = 'rfid'
+            elif name == 'FH':
+                field.hex_indicator = params[:1] or '_'
+            elif name == 'FN':
+                field.number = _int(re.match(r'\d*', params).group(0), None)
+            elif name in ('FD', 'FV'):
+                field.data = params
+            elif name == 'FR':
+                field.reverse = True
+            elif name == 'FS':
+                if field.kind is None and (field.data is not None or field.number is not None):
+                    field.kind = 'text'
+                if field.kind == 'text' and field.font is None:
+                    field.font = default_font
+                if field.kind not in (None, 'rfid'):
+                    self.fields.append(field)
+                field = ZPLField()
+            elif name == 'XA':
+                field = ZPLField()
+
+    # --- Desenho ---
+
+    @property
+    def static_layer(self):
+        """Bitmap somente com os campos fixos (desenhado uma vez)"""
+        if self._static_layer is None:
+            layer = np.zeros((self.height, self.width), dtype=np.uint8)
+            for field in self.static_fields:
+                self._draw_field(layer, field, field.data or '')
+            layer.setflags(write=False)
+            self._static_layer = layer
+        return self._static_layer
+
+    def render(self, values=None, exclude=()):
+        """
+        Renderiza a etiqueta com os valores informados
+        `values` aceita números de ^FN (int) e nomes de {PLACEHOLDER} (str).
+        Campos em `exclude` não são desenhados (ficam para uma sobreposição).
+        Retorna ndarray uint8 (altura x largura), 1 = ponto preto.
+        """
+        values = values or {}
+        bitmap = self.static_layer.copy()
+        for field in self.variable_fields:
+            if field not in exclude:
+                self._draw_field(bitmap, field, self.field_value(field, values))
+        return bitmap
+
+    def fields_using(self, names):
+        """Campos variáveis que usam algum dos placeholders informados"""
+        names = set(names)
+        return [field for field in self.variable_fields
+                if names.intersection(PLACEHOLDER_RE.findall(field.data or ''))]
+
+    def render_overlay(self, fields, values):
+        """
+        Só os campos informados, recortados na área desenhada:
+        (x, y, bitmap) para sobrepor à face, ou None se nada foi desenhado
+        """
+        bitmap = self.draw_fields(np.zeros((self.height, self.width), dtype=np.uint8),
+                                  fields, values)
+        rows = np.flatnonzero(bitmap.any(axis=1))
+        if not rows.size:
+            return None
+        columns = np.flatnonzero(bitmap.any(axis=0))
+        y0, y1, x0, x1 = rows[0], rows[-1] + 1, columns[0], columns[-1] + 1
+        return int(x0), int(y0), bitmap[y0:y1, x0:x1]
+
+    def draw_fields(self, bitmap, fields, values):
+        """Desenha os campos informados sobre um bitmap existente"""
+        for field in fields:
+            self._draw_field(bitmap, field, self.field_value(field, values or {}))
+        return bitmap
+
+    @staticmethod
+    def field_value(field, values):
+        if field.number is not None:
+            value = values.get(field.number, values.get(str(field.number), field.data))
+            return '' if value is None else str(value)
+        return PLACEHOLDER_RE.sub(
+            lambda m: str(values.get(m.group(1), m.group(0))), field.data or '')
+
+    def _draw_field(self, bitmap, field, data):
+        data = decode_field_hex(data, field.hex_indicator)
+        kind = field.kind
+        if kind == 'box':
+            width, height, thickness, rounding = field.params
+            self._blit(bitmap, graphic_box(width, height, thickness, rounding),
+                       field.x, field.y, field.typeset, field.reverse)
+        elif kind == 'text':
+            self._draw_text(bitmap, field, data)
+        elif kind == 'code128':
+            module_width, height, interpretation = field.params
+            modules, readable = encode_code128(data)
+            self._draw_barcode(bitmap, field, modules, module_width, height,
+                               readable if interpretation else None)
+        elif kind == 'ean13':
+            module_width, height, interpretation = field.params
+            modules, readable = encode_ean13(data)
+            self._draw_barcode(bitmap, field, modules, module_width, height,
+                               readable if interpretation else None)
+        elif kind == 'qr':
+            (magnification,) = field.params
+            if data:
+                self._blit(bitmap, _qr_bitmap(data, magnification),
+                           field.x, field.y, field.typeset, field.reverse)
+
+    def _draw_barcode(self, bitmap, field, modules, module_width, height, readable):
+        bars = _bars_bitmap(modules, module_width, height)
+        top = field.y - height if field.typeset else field.y
+        self._blit(bitmap, bars, field.x, top, False, field.reverse)
+        if readable:
+            font_height = max(10, module_width * 9)
+            font_width = max(8, module_width * 6)
+            line = render_text_line(readable, font_height, font_width)
+            text_x = field.x + max(0, (bars.shape[1] - line.shape[1]) // 2)
+            self._blit(bitmap, line, text_x, top + height + module_width * 2, False, field.reverse)
+
+    def _draw_text(self, bitmap, field, data):
+        height, width = field.font
+        advance, cap_height = font_metrics(height, width)
+
+        if field.block is None:
+            lines = [data]
+            block_width, max_lines, spacing, justify = None, 1, 0, 'L'
+        else:
+            block_width, max_lines, spacing, justify = field.block
+            lines = self._wrap(data, block_width, advance, max_lines)
+
+        line_height = height + spacing
+        for index, line in enumerate(lines):
+            rendered = render_text_line(line, height, width)
+            x = field.x
+            if block_width:
+                free = block_width - rendered.shape[1]
+                if justify == 'C':
+                    x += max(0, free // 2)
+                elif justify == 'R':
+                    x += max(0, free)
+            if field.typeset:
+                # ^FT: y é a linha de base da última linha do bloco
+                baseline = field.y - (max_lines - 1 - index) * line_height
+                top = baseline - cap_height
+            else:
+                top = field.y + (height - cap_height) + index * line_height
+            self._blit(bitmap, rendered, x, top, False, field.reverse)
+
+    @staticmethod
+    def _wrap(text, block_width, advance, max_lines):
+        """Quebra de linha do ^FB (\\& força nova linha)"""
+        per_line = max(1, block_width // advance) if block_width else len(text) or 1
+        lines = []
+        for paragraph in text.replace('\\&', '\n').split('\n'):
+            current = ''
+            for word in paragraph.split(' '):
+                candidate = f"{current} {word}" if current else word
+                if len(candidate) <= per_line:
+                    current = candidate
+                    continue
+                if current:
+                    lines.append(current)
+                while len(word) > per_line:
+                    lines.append(word[:per_line])
+                    word = word[per_line:]
+                current = word
+            lines.append(current)
+        if len(lines) > max_lines:
+            # A impressora sobrepõe o excesso na última linha
+            lines = lines[:max_lines - 1] + [' '.join(lines[max_lines - 1:])]
+        return lines
+
+    def _blit(self, bitmap, sprite, x, y, from_bottom, reverse):
+        height, width = sprite.shape
+        if from_bottom:
+            y -= height
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + width, bitmap.shape[1]), min(y + height, bitmap.shape[0])
+        if x0 >= x1 or y0 >= y1:
+            return
+        region = sprite[y0 - y:y1 - y, x0 - x:x1 - x]
+        if reverse:
+            bitmap[y0:y1, x0:x1] ^= region
+        else:
+            bitmap[y0:y1, x0:x1] |= region
+
+
+_TEMPLATE_CACHE = {}
+_TEMPLATE_CACHE_LIMIT = 32
+
+
+def template_version(zpl_text):
+    """Versão do template = hash do conteúdo"""
+    return hashlib.sha1(zpl_text.encode('utf-8')).hexdigest()
+
+
+def load_template(zpl_text):
+    """Template interpretado e cacheado pelo hash do conteúdo"""
+    key = template_version(zpl_text)
+    template = _TEMPLATE_CACHE.get(key)
+    if template is None:
+        if len(_TEMPLATE_CACHE) >= _TEMPLATE_CACHE_LIMIT:
+            _TEMPLATE_CACHE.pop(next(iter(_TEMPLATE_CACHE)))
+        template = ZPLTemplate(zpl_text)
+        _TEMPLATE_CACHE[key] = template
+    return template
+
+
+def render_zpl(zpl_text, values=None):
+    """Renderiza um ZPL completo (ou template + valores) em bitmap"""
+    return load_template(zpl_text).render(values)
+
+
+def _png_chunk(tag, payload):
+    return (struct.pack('>I', len(payload)) + tag + payload
+            + struct.pack('>I', zlib.crc32(tag + payload) & 0xFFFFFFFF))
+
+
+def bitmap_to_png(bitmap, compress_level=1, transparent=False):
+    """
+    Codifica o bitmap (1 = preto) como PNG monocromático de 1 bit
+    (transparent: fundo branco transparente, para sobreposições)
+    """
+    height, width = bitmap.shape
+    raw = np.zeros((height, (width + 7) // 8 + 1), dtype=np.uint8)
+    # PNG em tons de cinza: bit 1 = branco, então invertemos o bitmap empacotado
+    np.invert(np.packbits(bitmap, axis=1), out=raw[:, 1:])
+
+    header = struct.pack('>IIBBBBB', width, height, 1, 0, 0, 0, 0)
+    transparency = _png_chunk(b'tRNS', struct.pack('>H', 1)) if transparent else b''
+    return (b'\x89PNG\r\n\x1a\n' + _png_chunk(b'IHDR', header) + transparency
+            + _png_chunk(b'IDAT', zlib.compress(raw.tobytes(), compress_level))
+            + _png_chunk(b'IEND', b''))
+
+
+def bitmap_to_thumbnail_png(bitmap, factor=4, compress_level=6):
+    """Miniatura em tons de cinza: média de blocos factor x factor (PNG de 8 bits)"""
+    height, width = bitmap.shape[0] // factor, bitmap.shape[1] // factor
+    blocks = bitmap[:height * factor, :width * factor].reshape(height, factor, width, factor)
+    coverage = blocks.sum(axis=(1, 3), dtype=np.uint16)
+    raw = np.zeros((height, width + 1), dtype=np.uint8)
+    raw[:, 1:] = 255 - (coverage * 255 // (factor * factor)).astype(np.uint8)
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + _png_chunk(b'IHDR', header)
+            + _png_chunk(b'IDAT', zlib.compress(raw.tobytes(), compress_level))
+            + _png_chunk(b'IEND', b''))
+
+
+def render_png_base64(zpl_text, values=None):
+    return base64.b64encode(bitmap_to_png(render_zpl(zpl_text, values))).decode('ascii')
+
+
+def main():
+    """Função principal - API mode (chamado pelo Node.js)"""
+    if len(sys.argv) < 2:
+        print(json.dumps({
+            'success': False,
+            'error': 'Comando não especificado',
+            'available_commands': ['render', 'render-batch']
+        }))
+        return
+
+    command = sys.argv[1]
+    try:
+        if command == 'render':
+            # ZPL completo via arquivo ou stdin ('-')
+            source = sys.argv[2] if len(sys.argv) > 2 else '-'
+            if source == '-':
+                zpl_text = sys.stdin.read()
+            else:
+                with open(source, 'r', encoding='utf-8') as file:
+                    zpl_text = file.read()
+            bitmap = render_zpl(zpl_text)
+            print(json.dumps({
+                'success': True,
+                'width': int(bitmap.shape[1]),
+                'height': int(bitmap.shape[0]),
+                'png_base64': base64.b64encode(bitmap_to_png(bitmap)).decode('ascii')
+            }))
+
+        elif command == 'render-batch':
+            # Template em arquivo + lista JSON de valores no stdin
+            if len(sys.argv) < 3:
+                raise ValueError('Template ZPL não especificado')
+            with open(sys.argv[2], 'r', encoding='utf-8') as file:
+                template = load_template(file.read())
+            rows = json.load(sys.stdin)
+            previews = [
+                base64.b64encode(bitmap_to_png(template.render(values))).decode('ascii')
+                for values in rows
+            ]
+            print(json.dumps({'success': True, 'count': len(previews), 'previews': previews}))
+
+        else:
+            print(json.dumps({
+                'success': False,
+                'error': f'Comando desconhecido: {command}',
+                'available_commands': ['render', 'render-batch']
+            }))
+    except Exception as e:
+        print(json.dumps({'success': False, 'error': str(e)}))
+
+
+if __name__ == "__main__":
+    main()